@@ -1,26 +1,68 @@
 #!/usr/bin/env python3
 
-import subprocess
 import sys
-import json
 import os
 import time
 import threading
-import pyaudio
-from vosk import Model, KaldiRecognizer, SetLogLevel
+import argparse
+from vosk import KaldiRecognizer, SetLogLevel
+from long_file import transcribe_long_file, results_text
+from audio_vad import SilenceSkipper
+from recognition import recognize_stream, combine_text
+from live_capture import BUFFER_SECONDS, RingBuffer, MicrophoneSource, LiveSession
+from dsp_filters import parse_chain
+from audio_io import open_decoder, decoder_report, parse_time, time_window, ReadAhead
+from pipeline import Stage, Pipeline
+from metrics import METRICS
+from channels import transcribe_channels, channel_transcript
+from model_warmup import load_model, ModelLoader, FirstResultClock
 
 class AudioTranscriber:
-    def __init__(self):
+    def __init__(self, warm_up=False):
+        """Start loading the model; warm_up=True prefetches and warms it up first
+
+        The model loads in the background, so input can be probed and
+        decoded meanwhile; the first use of self.model waits for it.
+        """
         SetLogLevel(-1)
+        self.loader = ModelLoader(self.load_model, warm_up)
+        # The first transcription on an unwarmed model pays the cold start
+        self.warm = warm_up
+        self.started = False
+    
+    def load_model(self, warm_up):
+        model, self.load_report = load_model(lang="en-us", warm_up=warm_up)
+        print("✓ Vosk model loaded successfully")
+        print(self.load_report)
+        return model
+    
+    @property
+    def model(self):
+        """The loaded model, waiting for the loader; RuntimeError if it failed
+
+        Not sys.exit: on a batch worker thread that would end only that
+        thread and leave the pipeline waiting for it.
+        """
         try:
-            self.model = Model(lang="en-us")
-            print("✓ Vosk model loaded successfully")
+            return self.loader.result()
         except Exception as e:
-            print(f"✗ Error loading model: {e}")
-            sys.exit(1)
+            raise RuntimeError(f"Error loading model: {e}") from e
     
-    def transcribe_file(self, audio_file_path, output_file=None):
-        """Transcribe an audio file"""
+    def first_result_clock(self):
+        """Clock for the next transcription, counting from startup for the first one"""
+        clock = FirstResultClock(self.warm, None if self.started else self.loader.start_time)
+        self.started = True
+        return clock
+    
+    def transcribe_file(self, audio_file_path, output_file=None, long_file=False, workers=None,
+                        skip_silence=False, filters=None, split_channels=False, labels=None,
+                        start=None, end=None):
+        """Transcribe an audio file, splitting long ones into parallel segments if asked
+
+        With split_channels=True every channel gets its own recognizer and
+        the transcript is labelled by channel. start and end (seconds)
+        limit it to part of the file, with word times kept in file time.
+        """
         if not os.path.exists(audio_file_path):
             print(f"✗ Error: Audio file '{audio_file_path}' not found.")
             return None
@@ -28,47 +70,40 @@ class AudioTranscriber:
         print(f"🎵 Transcribing: {audio_file_path}")
         
         try:
-            process = subprocess.Popen([
-                "ffmpeg", "-loglevel", "quiet", "-i", audio_file_path,
-                "-ar", "16000", "-ac", "1", "-f", "s16le", "-"
-            ], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            
-            rec = KaldiRecognizer(self.model, 16000)
-            rec.SetWords(True)
-            
-            transcription_parts = []
-            
-            while True:
-                data = process.stdout.read(4000)
-                if len(data) == 0:
-                    break
+            window_start, duration = time_window(start, end)
+            if split_channels:
+                utterances = transcribe_channels(self.loader, audio_file_path, labels=labels,
+                                                 skip_silence=skip_silence, start=start, end=end)
+                full_transcription = channel_transcript(utterances)
+            elif long_file:
+                results = transcribe_long_file(self.loader, audio_file_path, workers,
+                                               skip_silence=skip_silence, start=start, end=end)
+                full_transcription = results_text(results)
+            else:
+                clock = self.first_result_clock()
+                # Decoding runs ahead into a bounded buffer while the model loads
+                decoder = ReadAhead(open_decoder(audio_file_path, 16000, window_start, duration))
+                try:
+                    rec = KaldiRecognizer(self.model, 16000)
+                    rec.SetWords(True)
                 
-                if rec.AcceptWaveform(data):
-                    result = rec.Result()
-                    if result.strip():
-                        transcription_parts.append(result)
+                    skipper = SilenceSkipper(16000) if skip_silence else None
+                    filter_chain = parse_chain(filters) if filters else None
+                    transcription_parts = recognize_stream(rec, decoder, skipper, filters=filter_chain,
+                                                           time_offset=window_start or 0.0, clock=clock)
+                except BaseException:
+                    # Stop ffmpeg and the read-ahead thread, nothing will read them now
+                    decoder.kill()
+                    raise
+                self.warm = True
             
-            final_result = rec.FinalResult()
-            if final_result.strip():
-                transcription_parts.append(final_result)
+                if decoder.close() != 0:
+                    print("✗ Error: ffmpeg failed to process the audio file.")
+                    return None
+                print(decoder_report(decoder))
+                print(clock.report(self.loader.ready_time))
             
-            process.wait()
-            
-            if process.returncode != 0:
-                print("✗ Error: ffmpeg failed to process the audio file.")
-                return None
-            
-            # Combine all transcription parts
-            full_transcription = ""
-            for part in transcription_parts:
-                try:
-                    json_result = json.loads(part)
-                    if 'text' in json_result and json_result['text'].strip():
-                        full_transcription += json_result['text'] + " "
-                except json.JSONDecodeError:
-                    continue
-            
-            full_transcription = full_transcription.strip()
+                full_transcription = combine_text(transcription_parts)
             
             if not full_transcription:
                 print("⚠️  No speech detected in the audio file.")
@@ -83,7 +118,7 @@ class AudioTranscriber:
             
             # Save to file if requested
             if output_file:
-                with open(output_file, 'w', encoding='utf-8') as f:
+                with METRICS.time("write_output"), open(output_file, 'w', encoding='utf-8') as f:
                     f.write(full_transcription)
                 print(f"\n💾 Transcription saved to: {output_file}")
             
@@ -96,140 +131,224 @@ class AudioTranscriber:
         
         return None
     
-    def record_and_transcribe(self, duration=30, output_file=None):
-        """Record audio from microphone and transcribe in real-time"""
-        try:
-            import pyaudio
-        except ImportError:
-            print("✗ Error: pyaudio not installed. Install it with: pip3 install pyaudio")
-            return None
+    def transcribe_batch(self, audio_files, output_dir=None, workers=None, skip_silence=False,
+                         filters=None):
+        """Transcribe many files with decoding, recognition and writing overlapped
+
+        Every transcript is written to <name>.txt in output_dir, or next to
+        its audio file. Returns {audio file: transcription}.
+        """
+        workers = workers or os.cpu_count() or 1
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        transcriptions = {}
         
-        print(f"🎤 Recording for {duration} seconds... (Press Ctrl+C to stop early)")
-        print("Speak now!")
+        def probe(audio_file):
+            if not os.path.exists(audio_file):
+                print(f"✗ Error: Audio file '{audio_file}' not found.")
+                return None
+            # Decoding starts here and runs ahead into a bounded buffer, so
+            # a file in flight holds at most READ_AHEAD_SECONDS of PCM
+            decoder = ReadAhead(open_decoder(audio_file, 16000))
+            return {"file": audio_file, "start": time.time(), "decoder": decoder}
+        
+        def recognize(item):
+            decoder = item.pop("decoder")
+            try:
+                rec = KaldiRecognizer(self.model, 16000)
+                rec.SetWords(True)
+                skipper = SilenceSkipper(16000) if skip_silence else None
+                filter_chain = parse_chain(filters) if filters else None
+                item["parts"] = recognize_stream(rec, decoder, skipper, filters=filter_chain)
+            except BaseException:
+                decoder.kill()
+                raise
+            if decoder.close() != 0:
+                raise RuntimeError(f"ffmpeg failed to process {item['file']}")
+            item["decoder"] = decoder_report(decoder)
+            return item
+        
+        def format_text(item):
+            item["text"] = combine_text(item.pop("parts"))
+            return item
+        
+        def write(item):
+            name = os.path.splitext(os.path.basename(item["file"]))[0] + ".txt"
+            output_file = os.path.join(output_dir or os.path.dirname(item["file"]), name)
+            with METRICS.time("write_output"), open(output_file, 'w', encoding='utf-8') as f:
+                f.write(item["text"])
+            transcriptions[item["file"]] = item["text"]
+            print(f"💾 {output_file} ({time.time() - item['start']:.1f}s, {item['decoder']})")
+        
+        # Each file streams from its decoder into a recognizer while the
+        # next ones decode ahead and the finished ones are written behind
+        pipeline = Pipeline([
+            Stage("probe", probe),
+            Stage("recognize", recognize, workers, discard=lambda item: item["decoder"].kill()),
+            Stage("format", format_text),
+            Stage("write", write),
+        ], depth=workers)
         
-        # Audio recording parameters
-        CHUNK = 1024
-        FORMAT = pyaudio.paInt16
-        CHANNELS = 1
+        print(f"🎵 Transcribing {len(audio_files)} files with {workers} recognizers")
+        pipeline.run(audio_files)
+        print(pipeline.report())
+        return transcriptions
+    
+    def record_and_transcribe(self, duration=30, output_file=None, skip_silence=False, source=None,
+                              filters=None):
+        """Record audio from microphone and transcribe in real-time
+
+        Capture runs in the audio callback and only fills a ring buffer; the
+        recognizer consumes it on its own thread. source may be a
+        FileMicrophone to replay a recording instead of the microphone.
+        filters is an ffmpeg-style filter string applied in-process.
+        """
         RATE = 16000
         
-        p = pyaudio.PyAudio()
+        if source is None:
+            try:
+                source = MicrophoneSource(RingBuffer(RATE * BUFFER_SECONDS), RATE)
+            except ImportError:
+                print("✗ Error: pyaudio not installed. Install it with: pip3 install pyaudio")
+                return None
+        ring = source.ring
+        
+        print(f"🎤 Recording for {duration} seconds... (Press Ctrl+C to stop early)")
+        print("Speak now!")
+        
+        skipper = SilenceSkipper(RATE) if skip_silence else None
+        filter_chain = parse_chain(filters, RATE) if filters else None
         
         try:
-            stream = p.open(format=FORMAT,
-                           channels=CHANNELS,
-                           rate=RATE,
-                           input=True,
-                           frames_per_buffer=CHUNK)
-            
             rec = KaldiRecognizer(self.model, RATE)
             rec.SetWords(True)
-            
-            transcription_parts = []
-            start_time = time.time()
-            
+            session = LiveSession(rec, ring, source, skipper,
+                                  on_text=lambda text: print(f"📝 {text}"), filters=filter_chain)
+            session.start()
             print("🎙️  Recording started...")
             
-            while time.time() - start_time < duration:
-                try:
-                    data = stream.read(CHUNK, exception_on_overflow=False)
-                    
-                    if rec.AcceptWaveform(data):
-                        result = rec.Result()
-                        if result.strip():
-                            try:
-                                json_result = json.loads(result)
-                                if 'text' in json_result and json_result['text'].strip():
-                                    print(f"📝 {json_result['text']}")
-                                    transcription_parts.append(json_result['text'])
-                            except json.JSONDecodeError:
-                                continue
-                
-                except KeyboardInterrupt:
-                    print("\n⏹️  Recording stopped by user")
-                    break
-            
-            # Get final result
-            final_result = rec.FinalResult()
-            if final_result.strip():
-                try:
-                    json_result = json.loads(final_result)
-                    if 'text' in json_result and json_result['text'].strip():
-                        print(f"📝 {json_result['text']}")
-                        transcription_parts.append(json_result['text'])
-                except json.JSONDecodeError:
-                    pass
-            
-            stream.stop_stream()
-            stream.close()
-            p.terminate()
-            
-            # Combine all transcription parts
-            full_transcription = " ".join(transcription_parts)
-            
-            if not full_transcription:
-                print("⚠️  No speech detected during recording.")
-                return None
+            try:
+                time.sleep(duration)
+            except KeyboardInterrupt:
+                print("\n⏹️  Recording stopped by user")
             
-            print("\n" + "="*60)
-            print("📝 FINAL TRANSCRIPTION")
-            print("="*60)
-            print(full_transcription)
-            print("="*60)
-            
-            # Save to file if requested
-            if output_file:
-                with open(output_file, 'w', encoding='utf-8') as f:
-                    f.write(full_transcription)
-                print(f"\n💾 Transcription saved to: {output_file}")
-            
-            return full_transcription
+            transcription_parts = session.stop()
             
         except Exception as e:
             print(f"✗ Error during recording: {e}")
-            if 'stream' in locals():
-                stream.close()
-            if 'p' in locals():
-                p.terminate()
+            source.stop()
+            return None
         
-        return None
+        print(session.report(RATE))
+        if skipper is not None:
+            print(skipper.report(session.decode_time))
+        
+        # Combine all transcription parts
+        full_transcription = " ".join(transcription_parts)
+        
+        if not full_transcription:
+            print("⚠️  No speech detected during recording.")
+            return None
+        
+        print("\n" + "="*60)
+        print("📝 FINAL TRANSCRIPTION")
+        print("="*60)
+        print(full_transcription)
+        print("="*60)
+        
+        # Save to file if requested
+        if output_file:
+            with METRICS.time("write_output"), open(output_file, 'w', encoding='utf-8') as f:
+                f.write(full_transcription)
+            print(f"\n💾 Transcription saved to: {output_file}")
+        
+        return full_transcription
 
 def main():
-    transcriber = AudioTranscriber()
-    
     if len(sys.argv) < 2:
         print("🎯 Audio Transcription Tool")
         print("="*40)
         print("Usage:")
-        print("  python3 advanced_transcriber.py file <audio_file> [output_file]")
-        print("  python3 advanced_transcriber.py record [duration] [output_file]")
+        print("  python3 advanced_transcriber.py file <audio_file> [output_file] [--long-file] [--workers N] [--skip-silence] [--filters CHAIN] [--split-channels [--labels A,B]] [--start T] [--end T] [--warm-up] [--metrics FILE]")
+        print("  python3 advanced_transcriber.py record [duration] [output_file] [--skip-silence] [--filters CHAIN] [--warm-up] [--metrics FILE]")
+        print("  python3 advanced_transcriber.py batch <audio_file>... [--output-dir DIR] [--workers N] [--skip-silence] [--filters CHAIN] [--metrics FILE]")
         print("\nExamples:")
         print("  python3 advanced_transcriber.py file 'audio.m4a'")
         print("  python3 advanced_transcriber.py file 'audio.m4a' 'transcript.txt'")
+        print("  python3 advanced_transcriber.py file 'meeting.m4a' 'meeting.txt' --long-file")
+        print("  python3 advanced_transcriber.py file 'call.wav' --split-channels --labels Agent,Customer")
+        print("  python3 advanced_transcriber.py file 'meeting.m4a' --start 42:00 --end 45:00")
         print("  python3 advanced_transcriber.py record 30")
         print("  python3 advanced_transcriber.py record 60 'live_transcript.txt'")
+        print("  python3 advanced_transcriber.py batch calls/*.wav --output-dir transcripts")
         sys.exit(1)
     
-    mode = sys.argv[1].lower()
+    parser = argparse.ArgumentParser(description="Audio Transcription Tool")
+    parser.add_argument("mode")
+    parser.add_argument("params", nargs="*")
+    parser.add_argument("--long-file", action="store_true",
+                        help="split at silences and decode segments in parallel")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="parallel segment decoders for --long-file, or recognizers "
+                             "for batch (default: CPU count)")
+    parser.add_argument("--output-dir", default=None,
+                        help="where batch writes the transcripts (default: next to each file)")
+    parser.add_argument("--skip-silence", action="store_true",
+                        help="drop long silences before the recognizer")
+    parser.add_argument("--filters", default=None,
+                        help="ffmpeg-style filter chain applied in-process, "
+                             "e.g. 'highpass=f=200,lowpass=f=3000,volume=1.5'")
+    parser.add_argument("--split-channels", action="store_true",
+                        help="recognize each channel separately and label the transcript by channel")
+    parser.add_argument("--labels", default=None,
+                        help="comma-separated channel labels for --split-channels, e.g. 'Agent,Customer'")
+    parser.add_argument("--start", type=parse_time, default=None,
+                        help="transcribe from this time on, in seconds, MM:SS or HH:MM:SS")
+    parser.add_argument("--end", type=parse_time, default=None,
+                        help="stop transcribing at this time, in seconds, MM:SS or HH:MM:SS")
+    parser.add_argument("--warm-up", action="store_true",
+                        help="prefetch the model into the page cache and warm it up before transcribing")
+    parser.add_argument("--metrics", default=None,
+                        help="write per-stage latency histograms to this file on exit, "
+                             "as JSON for a .json name and Prometheus text otherwise")
+    args = parser.parse_args()
+    METRICS.export_at_exit(args.metrics)
+    
+    transcriber = AudioTranscriber(args.warm_up)
+    
+    mode = args.mode.lower()
+    params = args.params
     
     if mode == "file":
-        if len(sys.argv) < 3:
+        if len(params) < 1:
             print("✗ Error: Please specify an audio file")
             sys.exit(1)
         
-        audio_file = sys.argv[2]
-        output_file = sys.argv[3] if len(sys.argv) > 3 else None
+        audio_file = params[0]
+        output_file = params[1] if len(params) > 1 else None
         
-        transcriber.transcribe_file(audio_file, output_file)
+        labels = args.labels.split(",") if args.labels else None
+        transcriber.transcribe_file(audio_file, output_file, args.long_file, args.workers,
+                                    args.skip_silence, args.filters, args.split_channels, labels,
+                                    args.start, args.end)
     
     elif mode == "record":
-        duration = int(sys.argv[2]) if len(sys.argv) > 2 else 30
-        output_file = sys.argv[3] if len(sys.argv) > 3 else None
+        duration = int(params[0]) if len(params) > 0 else 30
+        output_file = params[1] if len(params) > 1 else None
+        
+        transcriber.record_and_transcribe(duration, output_file, args.skip_silence,
+                                          filters=args.filters)
+    
+    elif mode == "batch":
+        if len(params) < 1:
+            print("✗ Error: Please specify audio files")
+            sys.exit(1)
         
-        transcriber.record_and_transcribe(duration, output_file)
+        transcriber.transcribe_batch(params, args.output_dir, args.workers, args.skip_silence,
+                                     args.filters)
     
     else:
-        print(f"✗ Error: Unknown mode '{mode}'. Use 'file' or 'record'")
+        print(f"✗ Error: Unknown mode '{mode}'. Use 'file', 'record' or 'batch'")
         sys.exit(1)
 
 if __name__ == "__main__":
@@ -0,0 +1,566 @@
+#!/usr/bin/env python3
+"""
+Audio decoding helpers shared by the transcribers.
+
+16-bit mono WAV at the requested rate is memory-mapped as is. Other
+formats libsndfile reads (WAV, FLAC, OGG, ...) are decoded in the process
+with soundfile, in blocks and resampled on the fly; anything else, such as
+m4a, goes through an ffmpeg subprocess. All decoders read like the stdout
+pipe of ffmpeg, mono s16le at the requested rate.
+"""
+
+import os
+import struct
+import subprocess
+import tempfile
+import threading
+import time
+from collections import namedtuple
+from math import gcd
+from queue import Queue, Full
+
+import numpy as np
+from scipy.signal import firwin, upfirdn
+
+from metrics import METRICS
+
+try:
+    import soundfile
+except ImportError:  # Everything goes through ffmpeg
+    soundfile = None
+
+SAMPLE_RATE = 16000
+READ_AHEAD_SECONDS = 30  # Audio decoded ahead of the recognizer at most
+BLOCK_FRAMES = 8192  # Frames read from the file per soundfile call
+WAVE_FORMAT_PCM = 1
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+WavLayout = namedtuple("WavLayout", ["offset", "size", "sample_rate", "channels", "bits"])
+
+
+def ffmpeg_pcm_command(audio_file_path, sample_rate=SAMPLE_RATE, output="-", start=None, duration=None,
+                       channels=1):
+    """Build the ffmpeg command that decodes a file to mono s16le PCM
+
+    start and duration (seconds) seek on the input side, so only the
+    requested range is decoded. channels > 1 keeps that many channels,
+    interleaved.
+    """
+    cmd = ["ffmpeg", "-loglevel", "quiet", "-y"]
+    if start is not None:
+        cmd += ["-ss", str(start)]
+    cmd += ["-i", audio_file_path]
+    if duration is not None:
+        cmd += ["-t", str(duration)]
+    return cmd + ["-ar", str(sample_rate), "-ac", str(channels), "-f", "s16le", output]
+
+
+def wav_layout(audio_file_path):
+    """Where the samples of a PCM WAV file are, None if it is not one
+
+    Only the header is read. A data size left at 0 or 0xFFFFFFFF by a
+    streaming writer, or one past the end of the file, means the rest of
+    the file.
+    """
+    with open(audio_file_path, "rb") as f:
+        header = f.read(12)
+        if len(header) < 12 or header[:4] != b"RIFF" or header[8:12] != b"WAVE":
+            return None
+        file_size = os.fstat(f.fileno()).st_size
+        fmt = None
+        while True:
+            chunk = f.read(8)
+            if len(chunk) < 8:
+                return None
+            chunk_id, size = struct.unpack("<4sI", chunk)
+            if chunk_id == b"data":
+                break
+            body = f.read(size + size % 2)
+            if chunk_id == b"fmt " and len(body) >= 16:
+                tag, channels, rate, _, _, bits = struct.unpack("<HHIIHH", body[:16])
+                if tag == WAVE_FORMAT_EXTENSIBLE and len(body) >= 26:
+                    tag = struct.unpack("<H", body[24:26])[0]
+                fmt = (tag, channels, rate, bits)
+
+        if fmt is None or fmt[0] != WAVE_FORMAT_PCM:
+            return None
+        offset = f.tell()
+        rest = file_size - offset
+        if size == 0 or size > rest:
+            size = rest
+        block = max(fmt[1] * fmt[3] // 8, 1)
+        return WavLayout(offset, size - size % block, fmt[2], fmt[1], fmt[3])
+
+
+def map_wav(audio_file_path, sample_rate=SAMPLE_RATE, channels=1):
+    """The samples of a 16-bit WAV at sample_rate as a read-only memmap
+
+    Shape (n,) for mono, (n, channels) otherwise. None when the file
+    needs converting first.
+    """
+    try:
+        layout = wav_layout(audio_file_path)
+    except OSError:
+        return None
+    if layout is None or (layout.channels, layout.bits, layout.sample_rate) != (channels, 16, sample_rate):
+        return None
+    shape = (layout.size // (2 * channels),) + ((channels,) if channels > 1 else ())
+    if layout.size == 0:
+        return np.zeros(shape, dtype=np.int16)
+    return np.memmap(audio_file_path, dtype=np.int16, mode="r", offset=layout.offset, shape=shape)
+
+
+class StreamingResampler:
+    """Polyphase resampler that keeps its history between blocks
+
+    Uses the same Kaiser-windowed filter as scipy.signal.resample_poly, so
+    a file resampled block by block matches resampling it in one go.
+    """
+
+    def __init__(self, in_rate, out_rate):
+        common = gcd(int(in_rate), int(out_rate))
+        self.up = int(out_rate) // common
+        self.down = int(in_rate) // common
+
+        max_rate = max(self.up, self.down)
+        half_len = 10 * max_rate
+        self.h = firwin(2 * half_len + 1, 1.0 / max_rate, window=("kaiser", 5.0)) * self.up
+        self.n_taps = -(-len(self.h) // self.up)  # Input samples under the filter
+        self.delay = half_len
+
+        self.history = np.zeros(self.n_taps - 1)
+        self.n_in = 0
+        self.n_out = 0
+
+    def process(self, x, limit=None):
+        """Resample the next block, returning every output sample it completes"""
+        buffer = np.concatenate((self.history, x))
+        base = self.n_in - len(self.history)  # Input index of buffer[0]
+        self.n_in += len(x)
+        self.history = buffer[len(buffer) - (self.n_taps - 1):]
+
+        # Output k sits at k * down + delay on the upsampled grid and is
+        # ready once its newest input sample has arrived
+        n_ready = max(0, (self.n_in * self.up - 1 - self.delay) // self.down + 1)
+        if limit is not None:
+            n_ready = min(n_ready, limit)
+        if n_ready <= self.n_out:
+            return np.zeros(0)
+
+        # upfirdn only yields every down-th position of the buffer, so
+        # leading zeros on the filter line that grid up with output n_out
+        first = self.n_out * self.down + self.delay - base * self.up
+        shift = -first % self.down
+        y = upfirdn(np.concatenate((np.zeros(shift), self.h)), buffer, self.up, self.down)
+        start = (first + shift) // self.down
+        out = y[start:start + n_ready - self.n_out]
+        self.n_out = n_ready
+        return out
+
+    def flush(self):
+        """The last output samples, as if the input ended in silence"""
+        expected = -(-self.n_in * self.up // self.down)
+        return self.process(np.zeros(self.n_taps), limit=expected)
+
+
+def record_decode_speed(decoder):
+    """Audio seconds per decoding second of a finished decoder, into METRICS"""
+    if METRICS.enabled and decoder.decode_time > 0:
+        METRICS.observe("decode_speed", decoder.bytes_read / 2 / decoder.sample_rate / decoder.decode_time)
+
+
+def to_pcm(x):
+    """Float samples in [-1, 1) to s16le bytes"""
+    return np.clip(np.round(x * 32768.0), -32768, 32767).astype(np.int16).tobytes()
+
+
+class MappedWavDecoder:
+    """Reads the samples of a conforming WAV straight from its memory map
+
+    Nothing is decoded or resampled; start and duration become sample
+    offsets into the mapping.
+    """
+
+    backend = "mmap"
+
+    def __init__(self, samples, sample_rate=SAMPLE_RATE, start=None, duration=None):
+        first = min(round(start * sample_rate), len(samples)) if start else 0
+        last = len(samples) if duration is None else min(first + int(duration * sample_rate), len(samples))
+        self.view = memoryview(samples[first:last]).cast("B")
+        self.pos = 0
+        self.sample_rate = sample_rate
+        self.returncode = 0
+        self.decode_time = 0.0
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        end = len(self.view) if size < 0 else min(self.pos + size, len(self.view))
+        # PyPI vosk only takes bytes, so the slice is copied once here
+        data = self.view[self.pos:end].tobytes()
+        self.pos = end
+        self.bytes_read += len(data)
+        return data
+
+    def close(self):
+        return self.returncode
+
+    def kill(self):
+        self.close()
+
+
+class SoundFileDecoder:
+    """Decode a file with libsndfile in this process
+
+    read(size) returns mono s16le bytes at sample_rate. Channels are
+    averaged like ffmpeg's -ac 1, unless channels asks to keep all of
+    them interleaved; start and duration (seconds) seek in the file itself.
+    """
+
+    backend = "soundfile"
+
+    def __init__(self, audio_file_path, sample_rate=SAMPLE_RATE, start=None, duration=None,
+                 block_frames=BLOCK_FRAMES, channels=1):
+        self.file = soundfile.SoundFile(audio_file_path)
+        if channels != 1 and channels != self.file.channels:
+            self.file.close()
+            raise RuntimeError(f"{audio_file_path} has {self.file.channels} channels, not {channels}")
+        self.channels = channels
+        self.block_frames = block_frames
+        self.resamplers = None
+        if self.file.samplerate != sample_rate:
+            self.resamplers = [StreamingResampler(self.file.samplerate, sample_rate) for _ in range(channels)]
+        if start:
+            self.file.seek(min(round(start * self.file.samplerate), self.file.frames))
+        self.remaining = None if duration is None else int(duration * self.file.samplerate)
+
+        self.buffer = bytearray()
+        self.done = False
+        self.sample_rate = sample_rate
+        self.returncode = 0
+        self.decode_time = 0.0
+        self.bytes_read = 0
+
+    def decode_block(self):
+        frames = self.block_frames if self.remaining is None else min(self.block_frames, self.remaining)
+        plain = self.resamplers is None and self.file.channels == self.channels
+        if frames > 0:
+            x = self.file.read(frames, dtype="int16" if plain else "float64", always_2d=True)
+        else:
+            x = np.zeros((0, self.file.channels))
+        if self.remaining is not None:
+            self.remaining -= len(x)
+
+        if len(x) == 0:
+            self.done = True
+            if self.resamplers is None:
+                return b""
+            return to_pcm(np.stack([r.flush() for r in self.resamplers], axis=1))
+        if plain:
+            return x.tobytes()
+        if self.channels == 1:
+            x = x.mean(axis=1, keepdims=True)
+        if self.resamplers is not None:
+            x = np.stack([r.process(x[:, c]) for c, r in enumerate(self.resamplers)], axis=1)
+        return to_pcm(x)
+
+    def read(self, size=-1):
+        start_time = time.time()
+        while (size < 0 or len(self.buffer) < size) and not self.done:
+            self.buffer += self.decode_block()
+        if size < 0:
+            size = len(self.buffer)
+        data = bytes(self.buffer[:size])
+        del self.buffer[:size]
+        self.decode_time += time.time() - start_time
+        self.bytes_read += len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+        record_decode_speed(self)
+        return self.returncode
+
+    def kill(self):
+        self.close()
+
+
+class FfmpegDecoder:
+    """Decode a file through an ffmpeg subprocess, for what libsndfile cannot read"""
+
+    backend = "ffmpeg"
+
+    def __init__(self, audio_file_path, sample_rate=SAMPLE_RATE, start=None, duration=None):
+        self.process = subprocess.Popen(
+            ffmpeg_pcm_command(audio_file_path, sample_rate, "-", start, duration),
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        self.sample_rate = sample_rate
+        self.returncode = None
+        self.decode_time = 0.0
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        start_time = time.time()
+        data = self.process.stdout.read(size)
+        self.decode_time += time.time() - start_time
+        self.bytes_read += len(data)
+        return data
+
+    def close(self):
+        self.process.stdout.close()
+        self.returncode = self.process.wait()
+        record_decode_speed(self)
+        return self.returncode
+
+    def kill(self):
+        self.process.kill()
+        self.close()
+
+
+class ReadAhead:
+    """Runs a decoder on a background thread into a bounded buffer
+
+    Decoding gets ahead while the reader is busy or still waiting for the
+    model, holding at most max_bytes; past that the decoder waits for the
+    reader. Everything except read, close and kill is passed through to
+    the decoder.
+    """
+
+    def __init__(self, decoder, max_bytes=READ_AHEAD_SECONDS * 2 * SAMPLE_RATE,
+                 chunk_size=2 * BLOCK_FRAMES):
+        self.decoder = decoder
+        self.chunks = Queue(maxsize=max(1, max_bytes // chunk_size))
+        self.chunk_size = chunk_size
+        self.pending = b""
+        self.eof = False
+        self.error = None
+        self.stopped = False
+        self.peak = 0  # Most chunks buffered at once
+        self.thread = threading.Thread(target=self.fill, name="read-ahead", daemon=True)
+        self.thread.start()
+
+    def __getattr__(self, name):
+        return getattr(self.decoder, name)
+
+    def fill(self):
+        try:
+            while not self.stopped:
+                data = self.decoder.read(self.chunk_size)
+                self.put(data)
+                self.peak = max(self.peak, self.chunks.qsize())
+                if len(data) == 0:
+                    return
+        except Exception as e:
+            self.error = e
+            self.put(b"")
+
+    def put(self, data):
+        while not self.stopped:
+            try:
+                self.chunks.put(data, timeout=0.1)
+                return
+            except Full:
+                continue
+
+    def read(self, size=-1):
+        while not self.eof and (size < 0 or len(self.pending) < size):
+            data = self.chunks.get()
+            if len(data) == 0:
+                self.eof = True
+                if self.error is not None:
+                    raise self.error
+            self.pending += data
+        if size < 0:
+            size = len(self.pending)
+        data, self.pending = self.pending[:size], self.pending[size:]
+        return data
+
+    def stop(self):
+        self.stopped = True
+        self.thread.join()
+
+    def close(self):
+        self.stop()
+        return self.decoder.close()
+
+    def kill(self):
+        self.stopped = True
+        self.decoder.kill()
+        self.thread.join()
+
+
+def open_soundfile(audio_file_path, sample_rate=SAMPLE_RATE, start=None, duration=None, channels=1):
+    """A SoundFileDecoder, or None when soundfile is missing or cannot read the file"""
+    if soundfile is None:
+        return None
+    try:
+        return SoundFileDecoder(audio_file_path, sample_rate, start, duration, channels=channels)
+    except RuntimeError:  # Not a format libsndfile reads
+        return None
+
+
+def open_decoder(audio_file_path, sample_rate=SAMPLE_RATE, start=None, duration=None, backend="auto"):
+    """Open a file for streaming as mono s16le PCM
+
+    backend "auto" maps 16-bit mono WAV at sample_rate, decodes in the
+    process when libsndfile can read the file and falls back to ffmpeg
+    otherwise; "soundfile" and "ffmpeg" force one of them.
+    """
+    with METRICS.time("decoder_open"):
+        if backend == "soundfile":
+            if soundfile is None:
+                raise RuntimeError("soundfile is not installed")
+            return SoundFileDecoder(audio_file_path, sample_rate, start, duration)
+        if backend == "auto":
+            samples = map_wav(audio_file_path, sample_rate)
+            if samples is not None:
+                return MappedWavDecoder(samples, sample_rate, start, duration)
+            decoder = open_soundfile(audio_file_path, sample_rate, start, duration)
+            if decoder is not None:
+                return decoder
+        return FfmpegDecoder(audio_file_path, sample_rate, start, duration)
+
+
+def decoder_report(decoder):
+    """One line naming the decoder, the PCM it moved and what it cost"""
+    seconds = decoder.bytes_read / 2 / decoder.sample_rate
+    return (f"Decoder: {decoder.backend}, {seconds:.1f}s of audio at {decoder.sample_rate} Hz "
+            f"({decoder.bytes_read / 1e6:.1f} MB) in {decoder.decode_time:.2f}s")
+
+
+def probe_format(audio_file_path):
+    """(sample rate, channels) of a file from its header, ffprobe as the
+    last resort; (None, None) when unknown"""
+    try:
+        layout = wav_layout(audio_file_path)
+    except OSError:
+        return None, None
+    if layout is not None:
+        return layout.sample_rate, layout.channels
+    if soundfile is not None:
+        try:
+            info = soundfile.info(audio_file_path)
+            return info.samplerate, info.channels
+        except RuntimeError:
+            pass
+    try:
+        result = subprocess.run([
+            "ffprobe", "-v", "quiet", "-select_streams", "a:0", "-show_entries",
+            "stream=sample_rate,channels", "-of", "csv=p=0", audio_file_path
+        ], capture_output=True, text=True)
+        rate, channels = result.stdout.strip().split(",")[:2]
+        return int(rate), int(channels)
+    except (OSError, ValueError):
+        return None, None
+
+
+def probe_sample_rate(audio_file_path):
+    """Sample rate of a file, None if unknown"""
+    return probe_format(audio_file_path)[0]
+
+
+def choose_sample_rate(source_rate, model_rate=SAMPLE_RATE, native=False):
+    """Rate to decode at
+
+    The model rate by default. With native, a source at or above the
+    model rate is passed through, since Vosk downsamples inside the
+    recognizer; a lower rate still has to be upsampled to the model rate,
+    which the recognizer cannot do.
+    """
+    if native and source_rate is not None and source_rate >= model_rate:
+        return int(source_rate)
+    return model_rate
+
+
+def probe_duration(audio_file_path):
+    """Duration of a file in seconds, None when unknown
+
+    Read from the header when libsndfile knows the format, else from ffprobe.
+    """
+    if soundfile is not None:
+        try:
+            info = soundfile.info(audio_file_path)
+            return info.frames / info.samplerate
+        except RuntimeError:
+            pass
+    result = subprocess.run([
+        "ffprobe", "-v", "quiet", "-show_entries", "format=duration",
+        "-of", "csv=p=0", audio_file_path
+    ], capture_output=True, text=True)
+    try:
+        return float(result.stdout.strip())
+    except ValueError:
+        return None
+
+
+def parse_time(value):
+    """Seconds from "SS", "MM:SS" or "HH:MM:SS", fractions allowed"""
+    seconds = 0.0
+    for part in str(value).split(":"):
+        seconds = 60 * seconds + float(part)
+    if seconds < 0:
+        raise ValueError(f"negative time: {value}")
+    return seconds
+
+
+def time_window(start=None, end=None):
+    """(start, duration) for open_decoder from a start and end time in seconds"""
+    if end is None:
+        return start, None
+    if end <= (start or 0):
+        raise ValueError(f"end {end}s is not after start {start or 0}s")
+    return start, end - (start or 0)
+
+
+def decode_window(audio_file_path, start, duration, sample_rate=SAMPLE_RATE):
+    """Decode duration seconds from start to s16le bytes"""
+    decoder = open_decoder(audio_file_path, sample_rate, start, duration)
+    pcm = decoder.read()
+    if decoder.close() != 0:
+        raise RuntimeError("ffmpeg failed to process the audio file")
+    return pcm
+
+
+def decode_to_array(audio_file_path, sample_rate=SAMPLE_RATE, channels=1, start=None, duration=None):
+    """Decode a whole file to a mono int16 array
+
+    The PCM is written to a temporary file and memory-mapped, so hours of
+    audio do not have to fit in memory at once. 16-bit WAV at sample_rate
+    is mapped in place without decoding. channels > 1 keeps the channels
+    apart in an (n, channels) array instead of mixing them down. start and
+    duration (seconds) limit it to part of the file.
+    """
+    samples = map_wav(audio_file_path, sample_rate, channels)
+    if samples is not None:
+        first = min(round(start * sample_rate), len(samples)) if start else 0
+        last = len(samples) if duration is None else first + int(duration * sample_rate)
+        return samples[first:last]
+
+    fd, pcm_file = tempfile.mkstemp(suffix=".pcm")
+    os.close(fd)
+    try:
+        decoder = open_soundfile(audio_file_path, sample_rate, start, duration, channels)
+        if decoder is not None:
+            with open(pcm_file, "wb") as f:
+                for data in iter(lambda: decoder.read(2 * BLOCK_FRAMES), b""):
+                    f.write(data)
+            decoder.close()
+        else:
+            decode_start = time.time()
+            result = subprocess.run(ffmpeg_pcm_command(audio_file_path, sample_rate, pcm_file,
+                                                       start, duration, channels),
+                                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            if result.returncode != 0:
+                raise RuntimeError("ffmpeg failed to process the audio file")
+            if METRICS.enabled:
+                seconds = os.path.getsize(pcm_file) / (2 * channels) / sample_rate
+                METRICS.observe("decode_speed", seconds / max(time.time() - decode_start, 1e-9))
+        shape = (os.path.getsize(pcm_file) // (2 * channels),) + ((channels,) if channels > 1 else ())
+        if shape[0] == 0:
+            return np.zeros(shape, dtype=np.int16)
+        return np.memmap(pcm_file, dtype=np.int16, mode="r", shape=shape)
+    finally:
+        # The mapping stays valid after the name is removed
+        try:
+            os.remove(pcm_file)
+        except OSError:
+            pass
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Energy-based voice activity detection on decoded 16-bit PCM.
+
+Used to find silence boundaries in long recordings so they can be split
+into independently decodable segments, and to skip long silences before
+they reach the recognizer.
+"""
+
+from bisect import bisect_right
+from collections import deque
+
+import numpy as np
+
+FRAME_MS = 30
+BLOCK_FRAMES = 2000  # Frames converted to float at a time, keeps memory flat
+DIGITAL_SILENCE_DB = -90.0
+
+
+def frame_energy_db(samples, sample_rate, frame_ms=FRAME_MS):
+    """Return per-frame RMS energy in dBFS for an int16 sample array"""
+    frame_len = int(sample_rate * frame_ms / 1000)
+    n_frames = len(samples) // frame_len
+    energy = np.empty(n_frames, dtype=np.float32)
+
+    for start in range(0, n_frames, BLOCK_FRAMES):
+        stop = min(start + BLOCK_FRAMES, n_frames)
+        block = samples[start * frame_len:stop * frame_len].astype(np.float32)
+        block = block.reshape(-1, frame_len) / 32768.0
+        energy[start:stop] = 10 * np.log10(np.mean(block * block, axis=1) + 1e-10)
+
+    return energy
+
+
+def estimate_snr(samples, sample_rate, frame_ms=FRAME_MS):
+    """Rough signal-to-noise ratio from the frame energy distribution
+
+    The quietest frames stand in for the noise floor and the loudest for
+    speech, so no separate noise sample is needed. Digital silence is left
+    out, it would make any recording look clean. Returns
+    (snr_db, noise_floor_db).
+    """
+    energy = frame_energy_db(samples, sample_rate, frame_ms)
+    energy = energy[energy > DIGITAL_SILENCE_DB]
+    if len(energy) == 0:
+        return 0.0, DIGITAL_SILENCE_DB
+    noise_floor = float(np.percentile(energy, 10))
+    return float(np.percentile(energy, 95)) - noise_floor, noise_floor
+
+
+def silence_mask(energy_db, margin_db=10.0, floor_percentile=5):
+    """Mark frames within margin_db of the estimated noise floor as silent
+
+    The threshold is also kept margin_db below the median, so a recording
+    with hardly any pauses is not declared silent throughout.
+    """
+    if len(energy_db) == 0:
+        return np.zeros(0, dtype=bool)
+    noise_floor = np.percentile(energy_db, floor_percentile)
+    threshold = min(noise_floor + margin_db, np.median(energy_db) - margin_db)
+    return energy_db < threshold
+
+
+def silent_runs(mask):
+    """Return (start, stop) frame index pairs of consecutive silent frames"""
+    padded = np.concatenate(([False], mask, [False])).astype(np.int8)
+    edges = np.flatnonzero(np.diff(padded))
+    return edges.reshape(-1, 2)
+
+
+def find_split_points(samples, sample_rate, segment_seconds=300, search_seconds=30,
+                      min_silence_ms=300, frame_ms=FRAME_MS):
+    """Find sample offsets to split a recording at, roughly every segment_seconds
+
+    Each split is placed in the middle of the longest silence within
+    search_seconds of the target position. Returns a list of
+    (offset, at_silence) tuples; at_silence is False when no silence was
+    found and the cut had to be made mid-speech.
+    """
+    frame_len = int(sample_rate * frame_ms / 1000)
+    energy = frame_energy_db(samples, sample_rate, frame_ms)
+    runs = silent_runs(silence_mask(energy))
+    min_frames = max(1, min_silence_ms // frame_ms)
+    runs = runs[(runs[:, 1] - runs[:, 0]) >= min_frames]
+
+    segment_frames = int(segment_seconds * 1000 / frame_ms)
+    search_frames = int(search_seconds * 1000 / frame_ms)
+    points = []
+
+    centers = (runs[:, 0] + runs[:, 1]) // 2
+    for target in range(segment_frames, len(energy) - search_frames, segment_frames):
+        nearby = runs[np.abs(centers - target) <= search_frames]
+        if len(nearby) > 0:
+            longest = nearby[np.argmax(nearby[:, 1] - nearby[:, 0])]
+            point = (int((longest[0] + longest[1]) // 2) * frame_len, True)
+        else:
+            point = (target * frame_len, False)
+        if len(points) == 0 or point[0] > points[-1][0]:
+            points.append(point)
+
+    return points
+
+
+def frame_features(samples, frame_len):
+    """Return per-frame energy (dBFS) and zero-crossing rate for whole frames"""
+    frames = samples[:len(samples) // frame_len * frame_len].reshape(-1, frame_len)
+    scaled = frames.astype(np.float32) / 32768.0
+    energy_db = 10 * np.log10(np.mean(scaled * scaled, axis=1) + 1e-10)
+    signs = np.signbit(frames)
+    zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (frame_len - 1)
+    return energy_db, zcr
+
+
+class SilenceSkipper:
+    """Drop long silent stretches from a PCM stream before the recognizer
+
+    Frames are classified with energy and zero-crossing rate against a
+    running noise floor. Each silence keeps pad_ms at either end, so the
+    recognizer still sees enough silence to end utterances, and only the
+    middle of silences longer than 2 * pad_ms is dropped. The skipped
+    sample counts are recorded so word times can be mapped back to the
+    original audio with restore_times().
+    """
+
+    def __init__(self, sample_rate=16000, pad_ms=400, threshold_db=-45.0,
+                 margin_db=12.0, zcr_threshold=0.25, frame_ms=FRAME_MS):
+        self.sample_rate = sample_rate
+        self.frame_len = int(sample_rate * frame_ms / 1000)
+        self.pad_frames = max(1, pad_ms // frame_ms)
+        self.threshold_db = threshold_db
+        self.margin_db = margin_db
+        self.zcr_threshold = zcr_threshold
+
+        self.noise_floor = threshold_db - margin_db
+        self.pending = b""
+        self.silent_run = 0
+        self.lead_in = deque(maxlen=self.pad_frames)
+
+        self.total_samples = 0
+        self.emitted_samples = 0
+        self.skipped_samples = 0
+        self.skip_points = []  # (emitted sample offset, skipped so far)
+
+    def is_speech(self, energy_db, zcr):
+        threshold = max(self.threshold_db, self.noise_floor + self.margin_db)
+        speech = energy_db > threshold or (
+            # Quiet fricatives: low energy but many zero crossings
+            zcr > self.zcr_threshold and energy_db > threshold - self.margin_db / 2)
+
+        # The floor follows dips immediately, rises with non-speech frames
+        # and only creeps up during speech, so talking does not drag it up
+        if energy_db < self.noise_floor:
+            self.noise_floor = energy_db
+        else:
+            self.noise_floor += (0.002 if speech else 0.05) * (energy_db - self.noise_floor)
+        return speech
+
+    def process(self, data):
+        """Feed raw s16le bytes, return the bytes to pass to the recognizer"""
+        data = self.pending + data
+        usable = len(data) // (2 * self.frame_len) * (2 * self.frame_len)
+        self.pending = data[usable:]
+        if usable == 0:
+            return b""
+
+        samples = np.frombuffer(data[:usable], dtype=np.int16)
+        energy_db, zcr = frame_features(samples, self.frame_len)
+        self.total_samples += len(samples)
+
+        out = []
+        frame_bytes = 2 * self.frame_len
+        for i, (energy, rate) in enumerate(zip(energy_db, zcr)):
+            frame = data[i * frame_bytes:(i + 1) * frame_bytes]
+            if self.is_speech(energy, rate):
+                out.extend(self.lead_in)
+                self.emitted_samples += len(self.lead_in) * self.frame_len
+                self.lead_in.clear()
+                out.append(frame)
+                self.emitted_samples += self.frame_len
+                self.silent_run = 0
+                continue
+
+            self.silent_run += 1
+            if self.silent_run <= self.pad_frames:
+                out.append(frame)
+                self.emitted_samples += self.frame_len
+                continue
+
+            if len(self.lead_in) == self.lead_in.maxlen:
+                self.lead_in.popleft()
+                self.skip(self.emitted_samples)
+            self.lead_in.append(frame)
+
+        return b"".join(out)
+
+    def skip(self, emitted_at):
+        self.skipped_samples += self.frame_len
+        if self.skip_points and self.skip_points[-1][0] == emitted_at:
+            self.skip_points[-1] = (emitted_at, self.skipped_samples)
+        else:
+            self.skip_points.append((emitted_at, self.skipped_samples))
+
+    def flush(self):
+        """Return buffered audio at end of stream; trailing silence is dropped"""
+        self.total_samples += len(self.pending) // 2
+        self.skipped_samples += len(self.lead_in) * self.frame_len
+        self.lead_in.clear()
+        out, self.pending = self.pending, b""
+        self.emitted_samples += len(out) // 2
+        return out
+
+    def covered_samples(self):
+        """Samples of the original audio accounted for by the output so far
+
+        Held-back silence and the partial frame still pending are not
+        covered yet.
+        """
+        return self.total_samples - len(self.lead_in) * self.frame_len
+
+    def source_time(self, seconds):
+        """Map a time in the recognizer's input back to the original audio"""
+        offsets = [point[0] for point in self.skip_points]
+        index = bisect_right(offsets, seconds * self.sample_rate)
+        if index == 0:
+            return seconds
+        return seconds + self.skip_points[index - 1][1] / self.sample_rate
+
+    def restore_times(self, result):
+        """Rewrite word times of a parsed Vosk result to original audio time"""
+        for word in result.get("result", []):
+            word["start"] = self.source_time(word["start"])
+            word["end"] = self.source_time(word["end"])
+        return result
+
+    def skipped_fraction(self):
+        return self.skipped_samples / self.total_samples if self.total_samples else 0.0
+
+    def report(self, decode_seconds):
+        """Describe skipped audio and the decode time it saved"""
+        skipped = self.skipped_samples / self.sample_rate
+        fed = self.emitted_samples / self.sample_rate
+        saved = decode_seconds / fed * skipped if fed > 0 else 0.0
+        return (f"🔇 Skipped {self.skipped_fraction():.1%} of the audio as silence "
+                f"({skipped:.1f}s), saving ~{saved:.1f}s of decoding")
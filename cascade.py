@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Confidence-gated model cascade.
+
+The whole file is decoded with the small model; only utterances whose
+mean word confidence falls below a threshold are decoded again with the
+large model, and the large model's words replace them by timestamp.
+On clean audio most utterances pass, so the cost stays close to a single
+small-model decode.
+"""
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from audio_io import SAMPLE_RATE
+from long_file import decode_segment
+
+SMALL_MODEL = "vosk-model-small-en-us-0.15"
+LARGE_MODEL = "vosk-model-en-us-0.22"
+CONF_THRESHOLD = 0.8
+CONTEXT_SECONDS = 0.5  # Audio decoded on each side of a weak utterance
+
+
+def mean_confidence(result):
+    """Mean word confidence of one utterance, None when it has no words"""
+    words = result.get("result", [])
+    if not words:
+        return None
+    return sum(word["conf"] for word in words) / len(words)
+
+
+def weak_utterances(results, threshold=CONF_THRESHOLD):
+    """Indices of utterances whose mean word confidence is below threshold"""
+    weak = []
+    for i, result in enumerate(results):
+        conf = mean_confidence(result)
+        if conf is not None and conf < threshold:
+            weak.append(i)
+    return weak
+
+
+def utterance_segment(result, n_samples, sample_rate=SAMPLE_RATE, context=CONTEXT_SECONDS):
+    """Decode range with context and keep range covering exactly the utterance's words"""
+    words = result["result"]
+    keep_start = int(words[0]["start"] * sample_rate)
+    keep_end = min(n_samples, int(words[-1]["end"] * sample_rate) + 1)
+    pad = int(context * sample_rate)
+    return (max(0, keep_start - pad), min(n_samples, keep_end + pad), keep_start, keep_end)
+
+
+def splice_results(results, replacements):
+    """Replace utterances by index with re-decoded ones, keeping file order"""
+    spliced = []
+    for i, result in enumerate(results):
+        if i in replacements:
+            words = [word for part in replacements[i] for word in part["result"]]
+            result = {"result": words, "text": " ".join(word["word"] for word in words)}
+        if result.get("text"):
+            spliced.append(result)
+    return spliced
+
+
+def cascade_transcribe(small_model, large_model, samples, sample_rate=SAMPLE_RATE,
+                       threshold=CONF_THRESHOLD, workers=None):
+    """Decode with small_model, re-decode weak utterances with large_model
+
+    Returns the spliced Vosk-style results and a stats dict with the
+    pass timings and how much audio went through the large model.
+    """
+    n_samples = len(samples)
+
+    start_time = time.time()
+    results = decode_segment(small_model, samples, (0, n_samples, 0, n_samples), sample_rate)
+    small_time = time.time() - start_time
+
+    weak = weak_utterances(results, threshold)
+    segments = {i: utterance_segment(results[i], n_samples, sample_rate) for i in weak}
+
+    start_time = time.time()
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+        futures = {i: pool.submit(decode_segment, large_model, samples, segment, sample_rate)
+                   for i, segment in segments.items()}
+        replacements = {i: future.result() for i, future in futures.items()}
+    large_time = time.time() - start_time
+
+    stats = {
+        "utterances": sum(1 for res in results if res.get("result")),
+        "redecoded": len(weak),
+        "audio_seconds": n_samples / sample_rate,
+        "redecoded_seconds": sum(end - start for start, end, _, _ in segments.values()) / sample_rate,
+        "small_time": small_time,
+        "large_time": large_time,
+    }
+    return splice_results(results, replacements), stats
+
+
+def cascade_report(stats):
+    """One-line summary of a cascade run"""
+    return (f"🪜 Cascade: re-decoded {stats['redecoded']}/{stats['utterances']} utterances "
+            f"({stats['redecoded_seconds']:.1f}s of {stats['audio_seconds']:.1f}s audio); "
+            f"small pass {stats['small_time']:.1f}s, large pass {stats['large_time']:.1f}s")
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Resumable transcription of long recordings.
+
+Every so often, at an utterance boundary, the results finished since the
+last save are appended to a JSON lines file and the sample offset reached
+is written to a small sidecar next to it. A transcription
+that crashes or is killed restarts from that offset, seeking the decoder
+there instead of starting over, and the sidecar is removed once the
+transcript is complete.
+"""
+
+import json
+import os
+import time
+
+CHECKPOINT_SUFFIX = ".checkpoint.json"
+RESULTS_SUFFIX = ".results.jsonl"
+CHECKPOINT_INTERVAL = 60.0  # Seconds of audio between saves
+
+
+class Checkpoint:
+    """Progress of one transcription, kept in a sidecar JSON file
+
+    The file records the source size, mtime, decode rate and time window,
+    so a checkpoint of a different or modified recording is never resumed,
+    and how much of the results file it accounts for, so a save only
+    writes the new results. Offsets count from the start of the window.
+    """
+
+    def __init__(self, audio_file_path, sample_rate, path=None, interval=CHECKPOINT_INTERVAL,
+                 window=(None, None)):
+        self.path = path or audio_file_path + CHECKPOINT_SUFFIX
+        self.results_path = self.path + RESULTS_SUFFIX
+        self.sample_rate = sample_rate
+        st = os.stat(audio_file_path)
+        self.source = {"size": st.st_size, "mtime": st.st_mtime_ns, "sample_rate": sample_rate,
+                       "window": list(window)}
+        self.interval = int(interval * sample_rate)
+        self.offset = 0  # Samples of the source covered by self.results
+        self.results = []
+        self.saved_results = 0  # Results and bytes of the results file that are saved
+        self.results_size = 0
+        self.resumed_at = 0
+        self.saved_offset = 0
+        self.saves = 0
+        self.save_time = 0.0
+
+    def load(self):
+        """Pick up a matching sidecar, returning the sample offset to resume at"""
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return 0
+        if state.get("source") != self.source or "results_size" not in state:
+            return 0
+        try:
+            with open(self.results_path, "rb") as f:
+                data = f.read(state["results_size"])
+            # Lines past the recorded size were appended after the last save
+            results = [json.loads(line) for line in data.splitlines()]
+        except (OSError, ValueError):
+            return 0
+        if len(data) != state["results_size"]:
+            return 0
+        self.offset = self.saved_offset = self.resumed_at = state["offset"]
+        self.results = results
+        self.saved_results = len(results)
+        self.results_size = len(data)
+        return self.offset
+
+    @property
+    def start_time(self):
+        """Where decoding resumes, in seconds"""
+        return self.resumed_at / self.sample_rate
+
+    def restore_times(self, result):
+        """Shift word times of a parsed result from the resumed stream to file time"""
+        if self.resumed_at:
+            shift = self.resumed_at / self.sample_rate
+            for word in result.get("result", []):
+                word["start"] += shift
+                word["end"] += shift
+        return result
+
+    def update(self, offset, result):
+        """Record a finished utterance ending at sample offset, saving when due"""
+        self.results.append(result)
+        self.offset = offset
+        if self.offset - self.saved_offset >= self.interval:
+            self.save()
+
+    def save(self):
+        start_time = time.time()
+        lines = "".join(json.dumps(result) + "\n" for result in self.results[self.saved_results:])
+        with open(self.results_path, "ab") as f:
+            f.truncate(self.results_size)  # Whatever a crashed save appended
+            f.write(lines.encode("utf-8"))
+            f.flush()
+            os.fsync(f.fileno())
+            self.results_size = f.tell()
+        state = {"source": self.source, "offset": self.offset, "results_size": self.results_size}
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        # The rename is atomic, a crash leaves the old checkpoint or the new one
+        os.replace(tmp_path, self.path)
+        self.saved_offset = self.offset
+        self.saved_results = len(self.results)
+        self.saves += 1
+        self.save_time += time.time() - start_time
+
+    def remove(self):
+        """Drop the sidecar and results once the transcript is complete"""
+        for path in (self.path, self.results_path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def report(self, elapsed):
+        """Describe how many checkpoints were written and what they cost"""
+        return (f"💾 {self.saves} checkpoints in {self.save_time:.3f}s "
+                f"({self.save_time / max(elapsed, 1e-9):.2%} of {elapsed:.1f}s)")
@@ -3,6 +3,7 @@
 import os
 import sys
 import subprocess
+import time
 from datetime import datetime
 
 def run_transcription(method, audio_file, output_file):
@@ -15,6 +16,8 @@ def run_transcription(method, audio_file, output_file):
         cmd = ["python3", "enhanced_transcriber.py", audio_file, output_file, "vosk-model-en-us-0.22"]
     elif method == "ensemble":
         cmd = ["python3", "ensemble_transcriber.py", audio_file, output_file]
+    elif method == "nbest":
+        cmd = ["python3", "ensemble_transcriber.py", audio_file, output_file, "--nbest"]
     else:
         print(f"✗ Unknown method: {method}")
         return False
@@ -31,6 +34,23 @@ def run_transcription(method, audio_file, output_file):
         print(f"✗ Error running {method}: {e}")
         return False
 
+def word_error_rate(reference, hypothesis):
+    """Word-level edit distance divided by the reference length"""
+    ref = reference.lower().split()
+    hyp = hypothesis.lower().split()
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        current = [i]
+        for j, hyp_word in enumerate(hyp, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1,
+                               previous[j - 1] + (ref_word != hyp_word)))
+        previous = current
+    
+    return previous[-1] / len(ref)
+
 def analyze_transcription(file_path):
     """Analyze transcription quality"""
     if not os.path.exists(file_path):
@@ -80,16 +100,22 @@ def main():
     
     if len(sys.argv) < 2:
         print("Usage:")
-        print("  python3 compare_transcriptions.py <audio_file>")
+        print("  python3 compare_transcriptions.py <audio_file> [reference_transcript]")
         print("\nThis tool compares different transcription methods:")
         print("  1. Basic (simple Vosk)")
         print("  2. Enhanced (better model + post-processing)")
         print("  3. Ensemble (multiple models + audio variations)")
+        print("  4. N-best ensemble (one decode, rescored alternatives)")
+        print("\nWith a reference transcript the word error rate of each method is shown.")
         print("\nExample:")
         print("  python3 compare_transcriptions.py 'audio.m4a'")
         sys.exit(1)
     
     audio_file = sys.argv[1]
+    reference = None
+    if len(sys.argv) > 2:
+        with open(sys.argv[2], 'r', encoding='utf-8') as f:
+            reference = f.read()
     
     if not os.path.exists(audio_file):
         print(f"✗ Error: Audio file '{audio_file}' not found.")
@@ -106,7 +132,8 @@ def main():
     methods = [
         ("basic", "Basic Vosk"),
         ("enhanced", "Enhanced (0.22 model + post-processing)"),
-        ("ensemble", "Ensemble (multiple models + variations)")
+        ("ensemble", "Ensemble (multiple models + variations)"),
+        ("nbest", "N-best ensemble (one decode)")
     ]
     
     results = {}
@@ -119,17 +146,24 @@ def main():
         print(f"🎯 Testing: {description}")
         print(f"{'='*60}")
         
+        start_time = time.time()
         success = run_transcription(method, audio_file, output_file)
+        elapsed = time.time() - start_time
         
         if success:
             analysis = analyze_transcription(output_file)
             if analysis:
+                analysis['elapsed'] = elapsed
+                if reference is not None:
+                    with open(output_file, 'r', encoding='utf-8') as f:
+                        analysis['wer'] = word_error_rate(reference, f.read())
                 results[method] = {
                     'description': description,
                     'output_file': output_file,
                     'analysis': analysis
                 }
-                print(f"📊 Analysis: {analysis['word_count']} words, Quality: {analysis['quality_score']}/100")
+                print(f"📊 Analysis: {analysis['word_count']} words, Quality: {analysis['quality_score']}/100, "
+                      f"Time: {elapsed:.1f}s")
             else:
                 print("⚠️  No transcription generated")
         else:
@@ -145,7 +179,7 @@ def main():
         return
     
     # Create comparison table
-    print(f"{'Method':<25} {'Words':<8} {'Quality':<8} {'Improvements':<12} {'Preview'}")
+    print(f"{'Method':<25} {'Words':<8} {'Quality':<8} {'Time':<8} {'WER':<8} {'Preview'}")
     print("-" * 80)
     
     best_method = None
@@ -155,7 +189,9 @@ def main():
         analysis = data['analysis']
         preview = analysis['text_preview'].replace('\n', ' ')[:50]
         
-        print(f"{data['description']:<25} {analysis['word_count']:<8} {analysis['quality_score']:<8} {analysis['corrections_made']:<12} {preview}")
+        wer = f"{analysis['wer']:.1%}" if 'wer' in analysis else "-"
+        print(f"{data['description'][:24]:<25} {analysis['word_count']:<8} {analysis['quality_score']:<8} "
+              f"{analysis['elapsed']:<8.1f} {wer:<8} {preview}")
         
         if analysis['quality_score'] > best_score:
             best_score = analysis['quality_score']
@@ -179,6 +215,9 @@ def main():
         print(f"Sentences: {analysis['sentence_count']}")
         print(f"Quality Score: {analysis['quality_score']}/100")
         print(f"Improvements Applied: {analysis['corrections_made']}")
+        print(f"Time: {analysis['elapsed']:.1f}s")
+        if 'wer' in analysis:
+            print(f"Word Error Rate: {analysis['wer']:.1%}")
         print(f"Preview: {analysis['text_preview']}")
     
     # Recommendations
@@ -195,6 +234,12 @@ def main():
             print("   - Best for important recordings")
             print("   - Takes longer but provides highest quality")
         
+        if 'nbest' in results and 'ensemble' in results:
+            nbest, ensemble = results['nbest']['analysis'], results['ensemble']['analysis']
+            print(f"✅ N-best ensemble took {nbest['elapsed']:.1f}s vs {ensemble['elapsed']:.1f}s for the full ensemble")
+            if 'wer' in nbest:
+                print(f"   - WER {nbest['wer']:.1%} vs {ensemble['wer']:.1%}")
+        
         if 'enhanced' in results:
             print("✅ Use Enhanced method for good balance")
             print("   - Uses the largest Vosk model (0.22)")
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Live capture decoupled from recognition.
+
+A capture callback (pyaudio, or a file-backed fake microphone) writes
+samples into a preallocated NumPy ring buffer; the recognizer consumes
+from it on its own thread. A slow decode step then only grows the queue
+instead of overflowing the audio device and losing samples.
+"""
+
+import json
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from metrics import METRICS
+
+BUFFER_SECONDS = 30  # Audio the recognizer may fall behind before samples drop
+
+
+class RingBuffer:
+    """Single-producer single-consumer ring buffer of int16 samples
+
+    The producer only moves write_pos and the consumer only moves
+    read_pos, so no lock is needed. When the consumer falls a whole
+    buffer behind, incoming samples are dropped and counted rather than
+    overwriting audio that has not been read yet.
+    """
+
+    def __init__(self, capacity):
+        self.buffer = np.zeros(capacity, dtype=np.int16)
+        self.capacity = capacity
+        self.write_pos = 0
+        self.read_pos = 0
+        self.dropped = 0
+        self.max_depth = 0
+        self.marks = deque()  # (sample position, capture time) per write
+
+    def depth(self):
+        """Number of samples waiting to be consumed"""
+        return self.write_pos - self.read_pos
+
+    def write(self, samples, capture_time=None):
+        """Append samples, returning how many were stored"""
+        free = self.capacity - self.depth()
+        if len(samples) > free:
+            self.dropped += len(samples) - free
+            samples = samples[:free]
+        n = len(samples)
+        if n == 0:
+            return 0
+
+        start = self.write_pos % self.capacity
+        first = min(n, self.capacity - start)
+        self.buffer[start:start + first] = samples[:first]
+        self.buffer[:n - first] = samples[first:]
+
+        self.marks.append((self.write_pos + n, capture_time or time.time()))
+        self.write_pos += n
+        self.max_depth = max(self.max_depth, self.depth())
+        return n
+
+    def read(self, max_samples=None):
+        """Return (samples, capture time of the newest sample) for what is queued"""
+        n = self.depth()
+        if max_samples is not None:
+            n = min(n, max_samples)
+        if n == 0:
+            return np.zeros(0, dtype=np.int16), None
+
+        start = self.read_pos % self.capacity
+        first = min(n, self.capacity - start)
+        samples = np.concatenate((self.buffer[start:start + first],
+                                  self.buffer[:n - first]))
+        self.read_pos += n
+
+        while self.marks[0][0] < self.read_pos:
+            self.marks.popleft()
+        capture_time = self.marks[0][1]
+        if self.marks[0][0] == self.read_pos:
+            self.marks.popleft()
+        return samples, capture_time
+
+
+class MicrophoneSource:
+    """Callback-driven pyaudio capture into a RingBuffer"""
+
+    def __init__(self, ring, rate=16000, chunk=1024):
+        import pyaudio
+        self.pyaudio = pyaudio
+        self.ring = ring
+        self.rate = rate
+        self.chunk = chunk
+        self.overflows = 0
+        self.audio = None
+        self.stream = None
+
+    def callback(self, in_data, frame_count, time_info, status):
+        if status & self.pyaudio.paInputOverflow:
+            self.overflows += 1
+        self.ring.write(np.frombuffer(in_data, dtype=np.int16))
+        return (None, self.pyaudio.paContinue)
+
+    def start(self):
+        self.audio = self.pyaudio.PyAudio()
+        self.stream = self.audio.open(format=self.pyaudio.paInt16, channels=1,
+                                      rate=self.rate, input=True,
+                                      frames_per_buffer=self.chunk,
+                                      stream_callback=self.callback)
+        self.stream.start_stream()
+
+    def stop(self):
+        if self.stream is not None:
+            self.stream.stop_stream()
+            self.stream.close()
+        if self.audio is not None:
+            self.audio.terminate()
+
+
+class FileMicrophone:
+    """Fake microphone that plays s16le PCM into a RingBuffer in real time
+
+    speed > 1 plays faster than real time, which is handy for tests.
+    """
+
+    def __init__(self, ring, pcm, rate=16000, chunk=1024, speed=1.0):
+        if isinstance(pcm, (bytes, bytearray)):
+            pcm = np.frombuffer(pcm, dtype=np.int16)
+        self.ring = ring
+        self.samples = pcm
+        self.rate = rate
+        self.chunk = chunk
+        self.speed = speed
+        self.overflows = 0
+        self.finished = threading.Event()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def run(self):
+        interval = self.chunk / self.rate / self.speed
+        next_time = time.time()
+        for pos in range(0, len(self.samples), self.chunk):
+            if self.stopped.is_set():
+                break
+            self.ring.write(self.samples[pos:pos + self.chunk])
+            next_time += interval
+            delay = next_time - time.time()
+            if delay > 0:
+                time.sleep(delay)
+        self.finished.set()
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+
+
+class LiveSession:
+    """Consume a RingBuffer on a recognizer thread
+
+    on_text is called from the recognizer thread with each finalized
+    utterance text. filters, a dsp_filters.FilterChain, runs on the
+    recognizer thread so the capture callback stays cheap. stats() reports overflow and drop counters, queue
+    depth and capture-to-result latency.
+    """
+
+    def __init__(self, rec, ring, source, skipper=None, on_text=None, poll_interval=0.02, filters=None):
+        self.rec = rec
+        self.ring = ring
+        self.source = source
+        self.skipper = skipper
+        self.filters = filters
+        self.on_text = on_text
+        self.poll_interval = poll_interval
+        self.transcription_parts = []
+        self.latencies = []
+        self.decode_time = 0.0
+        self.capturing = False
+        self.thread = None
+
+    def start(self):
+        self.capturing = True
+        self.thread = threading.Thread(target=self.consume, daemon=True)
+        self.thread.start()
+        self.source.start()
+
+    def stop(self):
+        """Stop capture, drain the buffer and return the transcription parts"""
+        self.source.stop()
+        self.capturing = False
+        self.thread.join()
+        return self.transcription_parts
+
+    def consume(self):
+        while self.capturing or self.ring.depth() > 0:
+            samples, capture_time = self.ring.read()
+            if len(samples) == 0:
+                time.sleep(self.poll_interval)
+                continue
+
+            data = samples.tobytes()
+            if self.filters is not None:
+                data = self.filters.process(data)
+            if self.skipper is not None:
+                data = self.skipper.process(data)
+                if len(data) == 0:
+                    continue
+
+            decode_start = time.time()
+            accepted = self.rec.AcceptWaveform(data)
+            elapsed = time.time() - decode_start
+            self.decode_time += elapsed
+            METRICS.observe("accept_waveform", elapsed)
+            if accepted:
+                self.latencies.append(time.time() - capture_time)
+                with METRICS.time("result"):
+                    self.collect(self.rec.Result())
+
+        if self.filters is not None:
+            data = self.filters.flush()
+            if self.skipper is not None:
+                data = self.skipper.process(data)
+            if len(data) > 0 and self.rec.AcceptWaveform(data):
+                self.collect(self.rec.Result())
+        if self.skipper is not None:
+            data = self.skipper.flush()
+            if len(data) > 0 and self.rec.AcceptWaveform(data):
+                self.collect(self.rec.Result())
+        self.collect(self.rec.FinalResult())
+
+    def collect(self, result):
+        try:
+            json_result = json.loads(result)
+        except json.JSONDecodeError:
+            return
+        text = json_result.get('text', '').strip()
+        if text:
+            self.transcription_parts.append(text)
+            if self.on_text is not None:
+                self.on_text(text)
+
+    def stats(self):
+        latencies = sorted(self.latencies)
+        return {
+            "overflows": getattr(self.source, "overflows", 0),
+            "dropped_samples": self.ring.dropped,
+            "queue_depth": self.ring.depth(),
+            "max_queue_depth": self.ring.max_depth,
+            "latency_mean": sum(latencies) / len(latencies) if latencies else None,
+            "latency_p95": latencies[int(0.95 * (len(latencies) - 1))] if latencies else None,
+            "decode_time": self.decode_time,
+        }
+
+    def report(self, rate=16000):
+        stats = self.stats()
+        lines = [f"🎛️  Capture: {stats['overflows']} overflows, "
+                 f"{stats['dropped_samples'] / rate:.2f}s dropped, "
+                 f"max queue {stats['max_queue_depth'] / rate:.2f}s"]
+        if stats["latency_mean"] is not None:
+            lines.append(f"⏱️  Capture-to-result latency: mean {stats['latency_mean']:.2f}s, "
+                         f"p95 {stats['latency_p95']:.2f}s")
+        return "\n".join(lines)
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Per-stage latency histograms for the transcribers.
+
+Hot paths record into the shared METRICS, which starts disabled: until
+an entry point turns it on with --metrics, recording costs one attribute
+check. Histograms have fixed buckets and are exported as Prometheus text
+or, for a .json path, as a JSON snapshot when the program exits.
+"""
+
+import atexit
+import functools
+import json
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Upper bounds in seconds, from one AcceptWaveform chunk up to a whole file
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+# Upper bounds for seconds of audio decoded per second
+THROUGHPUT_BUCKETS = (1.0, 10.0, 25.0, 50.0, 100.0, 250.0, 500.0, 1000.0, 2500.0, 5000.0)
+
+# Timed stages; each becomes notetaker_<name>_seconds
+STAGES = {
+    "decoder_open": "Seconds to open a decoder, spawning ffmpeg included",
+    "accept_waveform": "Seconds per AcceptWaveform call",
+    "result": "Seconds per Result or FinalResult call including the JSON parse",
+    "postprocess": "Seconds to post-process one transcription",
+    "write_output": "Seconds to write one output file",
+}
+THROUGHPUT = {
+    "decode_speed": "Seconds of audio decoded per second of decoder time",
+}
+PREFIX = "notetaker_"
+
+
+class Histogram:
+    """Fixed-bucket histogram with Prometheus semantics (cumulative, le bounds)"""
+
+    def __init__(self, name, help_text, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def cumulative(self):
+        """(upper bound, observations at or below it) pairs, +inf last"""
+        with self.lock:
+            counts = list(self.counts)
+        total = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            total += count
+            yield bound, total
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile, None when empty"""
+        if self.count == 0:
+            return None
+        for bound, total in self.cumulative():
+            if total >= q * self.count:
+                return bound
+        return float("inf")
+
+
+class Metrics:
+    """The histograms of every stage, recorded only while enabled"""
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.histograms = {}
+        for name, help_text in STAGES.items():
+            self.histograms[name] = Histogram(f"{PREFIX}{name}_seconds", help_text)
+        for name, help_text in THROUGHPUT.items():
+            self.histograms[name] = Histogram(f"{PREFIX}{name}_ratio", help_text, THROUGHPUT_BUCKETS)
+
+    def observe(self, name, value):
+        if self.enabled:
+            self.histograms[name].observe(value)
+
+    @contextmanager
+    def time(self, name):
+        if not self.enabled:
+            yield
+            return
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.histograms[name].observe(time.perf_counter() - start_time)
+
+    def timed(self, name):
+        """Decorator recording every call of a function under name"""
+        def decorate(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                start_time = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.histograms[name].observe(time.perf_counter() - start_time)
+            return wrapper
+        return decorate
+
+    def prometheus(self):
+        """Histograms in the Prometheus text exposition format"""
+        lines = []
+        for hist in self.histograms.values():
+            lines.append(f"# HELP {hist.name} {hist.help}")
+            lines.append(f"# TYPE {hist.name} histogram")
+            for bound, total in hist.cumulative():
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{hist.name}_bucket{{le="{le}"}} {total}')
+            lines.append(f"{hist.name}_sum {hist.sum!r}")
+            lines.append(f"{hist.name}_count {hist.count}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        """Histograms as a JSON-serializable dict"""
+        return {hist.name: {"help": hist.help, "buckets": list(hist.buckets),
+                            "counts": [total for _, total in hist.cumulative()],
+                            "sum": hist.sum, "count": hist.count}
+                for hist in self.histograms.values()}
+
+    def write(self, path):
+        """Export to path, a JSON snapshot for .json and Prometheus text otherwise
+
+        Written to a temporary file and renamed, so a scraper reading
+        the file never sees half of it.
+        """
+        text = json.dumps(self.snapshot(), indent=1) if str(path).endswith(".json") else self.prometheus()
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".metrics.", suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+
+    def report(self):
+        """One line per stage that saw any observations"""
+        lines = []
+        for name, hist in self.histograms.items():
+            if not hist.count:
+                continue
+            mean = hist.sum / hist.count
+            mean = f"{mean:.0f}x realtime" if name in THROUGHPUT else f"{mean * 1000:.3f} ms"
+            lines.append(f"   {name}: {hist.count} × mean {mean}, "
+                         f"p50 ≤ {hist.quantile(0.5)}, p99 ≤ {hist.quantile(0.99)}")
+        return "📈 Stage timings:\n" + "\n".join(lines) if lines else "📈 No stage timings recorded"
+
+    def export_at_exit(self, path):
+        """Enable recording and write the histograms to path when the program exits"""
+        if path is None:
+            return
+        self.enabled = True
+
+        def export():
+            print(self.report())
+            self.write(path)
+            print(f"📈 Metrics written to: {path}")
+
+        atexit.register(export)
+
+
+METRICS = Metrics()
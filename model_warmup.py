@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Warm start for Vosk models.
+
+The first transcription after a model load is slower than later ones:
+graph and acoustic model pages are faulted in from disk on first touch
+and the decoder's lazily built structures start out empty. Warming up
+reads the model directory through the page cache before loading it and
+then decodes a short buffer of silence, so the first real file does not
+pay for either.
+
+Loading itself can run on a background thread (ModelLoader) while the
+input is probed and decoded, so startup costs the longer of the two
+rather than their sum. Tools that hold several models keep LazyModel
+handles, which load on first use and can be released again.
+"""
+
+import os
+import re
+import threading
+import time
+
+from vosk import Model, KaldiRecognizer, MODEL_DIRS
+
+SAMPLE_RATE = 16000
+WARMUP_SECONDS = 1.0
+PREFETCH_BLOCK = 1 << 20
+
+
+def model_directory(model_path=None, model_name=None, lang="en-us"):
+    """Directory a Model would be loaded from, None when it is not downloaded yet
+
+    Searches the model directories the way Model does, by exact name or
+    else by language.
+    """
+    if model_path is not None:
+        return str(model_path)
+    pattern = rf"vosk-model(-small)?-{lang}"
+    for directory in MODEL_DIRS:
+        if directory is None or not os.path.isdir(directory):
+            continue
+        for name in os.listdir(directory):
+            if model_name is not None:
+                found = name == model_name
+            else:
+                found = re.match(pattern, name) is not None
+            if found:
+                return os.path.join(directory, name)
+    return None
+
+
+def prefetch_model(model_dir, block_size=PREFETCH_BLOCK):
+    """Read every file of a model directory once so it sits in the page cache
+
+    Returns (bytes read, seconds taken).
+    """
+    start_time = time.time()
+    total = 0
+    buffer = bytearray(block_size)
+    for root, _, files in os.walk(model_dir):
+        for name in files:
+            try:
+                with open(os.path.join(root, name), "rb", buffering=0) as f:
+                    if hasattr(os, "posix_fadvise"):
+                        os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+                    while True:
+                        n = f.readinto(buffer)
+                        if not n:
+                            break
+                        total += n
+            except OSError:
+                continue
+    return total, time.time() - start_time
+
+
+def first_result_latency(model, sample_rate=SAMPLE_RATE, seconds=WARMUP_SECONDS):
+    """Seconds from a new recognizer to its final result on a buffer of silence"""
+    silence = bytes(2 * int(sample_rate * seconds))
+    start_time = time.time()
+    rec = KaldiRecognizer(model, sample_rate)
+    rec.SetWords(True)
+    rec.AcceptWaveform(silence)
+    rec.FinalResult()
+    return time.time() - start_time
+
+
+class WarmupReport:
+    """Cold vs warm first-result latency of one model load"""
+
+    def __init__(self, load_time, prefetched=0, prefetch_time=0.0, cold=None, warm=None):
+        self.load_time = load_time
+        self.prefetched = prefetched
+        self.prefetch_time = prefetch_time
+        self.cold = cold  # First decode after the load
+        self.warm = warm  # The same decode once more
+
+    def __str__(self):
+        text = f"🔥 Model loaded in {self.load_time:.2f}s"
+        if self.prefetched:
+            text += (f", {self.prefetched / 1e6:.0f} MB prefetched into the page cache "
+                     f"in {self.prefetch_time:.2f}s")
+        if self.cold is not None:
+            text += (f"; first-result latency cold {self.cold * 1000:.0f} ms, "
+                     f"warm {self.warm * 1000:.0f} ms")
+        return text
+
+
+def load_model(model_path=None, model_name=None, lang="en-us", warm_up=False,
+               sample_rate=SAMPLE_RATE):
+    """Load a Model, optionally prefetching its files and warming it up
+
+    Returns (model, WarmupReport). The report's cold latency is the first
+    decode on the fresh model, which the real first file pays when
+    warm_up is off.
+    """
+    prefetched, prefetch_time = 0, 0.0
+    model_dir = model_directory(model_path, model_name, lang) if warm_up else None
+    if model_dir is not None:
+        # A model still to be downloaded is not worth prefetching, Model just wrote it
+        prefetched, prefetch_time = prefetch_model(model_dir)
+
+    start_time = time.time()
+    if model_path is not None:
+        model = Model(str(model_path))
+    else:
+        model = Model(model_name=model_name, lang=lang)
+    report = WarmupReport(time.time() - start_time, prefetched, prefetch_time)
+
+    if warm_up:
+        report.cold = first_result_latency(model, sample_rate)
+        report.warm = first_result_latency(model, sample_rate)
+    return model, report
+
+
+class ModelLoader:
+    """Runs a model load on a background thread
+
+    Probing and decoding the input can go ahead while the model loads;
+    result() blocks until load() has returned and re-raises its error.
+    """
+
+    def __init__(self, load, *args, **kwargs):
+        self.start_time = time.time()
+        self.ready_time = None  # Seconds from start until the load finished
+        self._result = None
+        self._error = None
+        self._thread = threading.Thread(target=self._run, args=(load, args, kwargs),
+                                        name="model-loader", daemon=True)
+        self._thread.start()
+
+    def _run(self, load, args, kwargs):
+        try:
+            self._result = load(*args, **kwargs)
+        except BaseException as e:
+            self._error = e
+        finally:
+            self.ready_time = time.time() - self.start_time
+
+    def ready(self):
+        return not self._thread.is_alive()
+
+    def result(self):
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+
+def resolve_model(model):
+    """The Model itself, waiting for it if a ModelLoader is still loading it"""
+    return model.result() if isinstance(model, ModelLoader) else model
+
+
+class LazyModel:
+    """Handle to a model that is loaded on first use and can be released
+
+    load() builds the Model and defaults to Model(name). get() loads it
+    once, also when several threads ask at the same time, and re-raises
+    a failed load. release() drops the handle's reference so the model's
+    memory is freed once no recognizer uses it anymore.
+    """
+
+    def __init__(self, name, load=None):
+        self.name = name
+        self._load = load if load is not None else (lambda: Model(name))
+        self._model = None
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.load_time = 0.0
+
+    @property
+    def loaded(self):
+        return self._model is not None
+
+    def get(self):
+        with self._lock:
+            if self._model is None:
+                start_time = time.time()
+                self._model = self._load()
+                self.loads += 1
+                self.load_time += time.time() - start_time
+            return self._model
+
+    def release(self):
+        with self._lock:
+            self._model = None
+
+
+class FirstResultClock:
+    """Time from start to the first finished utterance of a transcription
+
+    start_time defaults to now; pass the program start to measure the
+    whole startup, model load included.
+    """
+
+    def __init__(self, warm=False, start_time=None):
+        self.warm = warm
+        self.start_time = start_time if start_time is not None else time.time()
+        self.first = None
+
+    def mark(self):
+        if self.first is None:
+            self.first = time.time() - self.start_time
+
+    def report(self, model_ready=None):
+        """model_ready is when the model finished loading, in seconds from start"""
+        if self.first is None:
+            return "⏱️  No result"
+        text = f"⏱️  First result after {self.first:.2f}s ({'warm' if self.warm else 'cold'} model"
+        if model_ready is not None:
+            text += f", ready after {model_ready:.2f}s"
+        return text + ")"
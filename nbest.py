@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Single-decode N-best ensemble.
+
+Instead of decoding the file once per model and filter, the recognizer
+returns its N best hypotheses for every utterance (SetMaxAlternatives)
+and they are rescored here: each hypothesis keeps its recognizer
+confidence and gains a bonus for every domain term it contains.
+"""
+
+import json
+import re
+
+from vosk import KaldiRecognizer
+
+from recognition import recognize_stream
+
+MAX_ALTERNATIVES = 10
+TERM_BONUS = 5.0  # Score added per domain term, in recognizer confidence units
+
+DOMAIN_TERMS = [
+    'python', 'pyspark', 'sql', 'tableau', 'synchrony', 'discover', 'paypal',
+    'credit risk', 'analytics', 'modeling', 'dashboard', 'sponsorship',
+    'interview', 'experience',
+]
+
+
+def build_terms(corrections, extra_terms=None):
+    """Domain terms plus correction keys that stand for a different phrase"""
+    terms = list(extra_terms if extra_terms is not None else DOMAIN_TERMS)
+    for wrong, correct in corrections.items():
+        if wrong.lower() != correct.lower():
+            terms.append(wrong)
+    return sorted({term.lower() for term in terms})
+
+
+def term_pattern(terms):
+    """One word-bounded regex matching any of the terms"""
+    return re.compile(r'\b(' + '|'.join(re.escape(term) for term in terms) + r')\b', re.IGNORECASE)
+
+
+def rescore(result, pattern, term_bonus=TERM_BONUS):
+    """Pick the best alternative of one utterance, returning (alternative, changed)"""
+    alternatives = [alt for alt in result.get("alternatives", []) if alt.get("text", "").strip()]
+    if not alternatives:
+        return None, False
+
+    def score(alt):
+        return alt.get("confidence", 0.0) + term_bonus * len(pattern.findall(alt["text"]))
+
+    best = max(alternatives, key=score)
+    return best, best is not alternatives[0]
+
+
+def nbest_transcribe(model, stream, terms, max_alternatives=MAX_ALTERNATIVES,
+                     term_bonus=TERM_BONUS, sample_rate=16000):
+    """Decode a PCM stream once with N-best output and rescore every utterance
+
+    Returns the chosen text and a stats dict with how many utterances the
+    rescoring changed.
+    """
+    rec = KaldiRecognizer(model, sample_rate)
+    rec.SetMaxAlternatives(max_alternatives)
+    rec.SetWords(True)
+
+    pattern = term_pattern(terms)
+    texts = []
+    stats = {"utterances": 0, "changed": 0}
+    for part in recognize_stream(rec, stream):
+        best, changed = rescore(json.loads(part), pattern, term_bonus)
+        if best is None:
+            continue
+        texts.append(best["text"])
+        stats["utterances"] += 1
+        stats["changed"] += int(changed)
+
+    return " ".join(texts), stats
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Skip the expensive denoiser on recordings that do not need it.
+
+ffmpeg's anlmdn is often slower than recognition itself. A NumPy SNR
+estimate on a few sampled windows decides per file whether a filter chain
+keeps it; clean recordings get the chain without anlmdn.
+"""
+
+import time
+
+import numpy as np
+
+from audio_io import SAMPLE_RATE, decode_to_array, decode_window, probe_duration
+from audio_vad import estimate_snr
+from variant_selection import SAMPLE_WINDOWS, WINDOW_SECONDS, sample_windows
+
+CLEAN_SNR_DB = 25.0  # Above this the denoiser is skipped
+
+
+def without_denoise(filter_chain):
+    """The filter chain with any anlmdn stage removed"""
+    return ",".join(f for f in filter_chain.split(",") if not f.startswith("anlmdn"))
+
+
+def analysis_samples(audio_file_path, start=None, duration=None, count=SAMPLE_WINDOWS,
+                     window=WINDOW_SECONDS):
+    """int16 samples to estimate the SNR from
+
+    count windows spread over the file (or over start..start+duration),
+    like variant selection samples them, so a long recording is not
+    decoded in full just to be measured. Short ones are used whole.
+    """
+    span = duration
+    if span is None:
+        total = probe_duration(audio_file_path)
+        span = None if total is None else total - (start or 0.0)
+    starts = sample_windows(span, count, window)
+    if starts is None:
+        return decode_to_array(audio_file_path, start=start, duration=duration)
+    first = start or 0.0
+    pcm = b"".join(decode_window(audio_file_path, first + offset, window) for offset in starts)
+    return np.frombuffer(pcm, dtype=np.int16)
+
+
+def adapt_filter_chain(audio_file_path, filter_chain, threshold_db=CLEAN_SNR_DB, start=None,
+                       duration=None):
+    """Return filter_chain, without anlmdn when the recording is clean
+
+    start and duration (seconds) restrict the analysis to that part of the file.
+    """
+    if "anlmdn" not in filter_chain:
+        return filter_chain
+
+    start_time = time.time()
+    try:
+        samples = analysis_samples(audio_file_path, start=start, duration=duration)
+    except Exception as e:
+        print(f"⚠️  Noise analysis failed ({e}), keeping denoiser")
+        return filter_chain
+    snr_db, noise_floor_db = estimate_snr(samples, SAMPLE_RATE)
+    analysis_time = time.time() - start_time
+
+    if snr_db < threshold_db:
+        print(f"🔊 SNR {snr_db:.1f} dB (noise floor {noise_floor_db:.1f} dBFS): denoising "
+              f"[analysis {analysis_time:.2f}s]")
+        return filter_chain
+
+    print(f"🧹 SNR {snr_db:.1f} dB (noise floor {noise_floor_db:.1f} dBFS) is above "
+          f"{threshold_db:.0f} dB: clean, skipping anlmdn [analysis {analysis_time:.2f}s]")
+    return without_denoise(filter_chain)
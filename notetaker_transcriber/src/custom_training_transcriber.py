@@ -9,7 +9,15 @@ import re
 import requests
 import zipfile
 import shutil
+import argparse
 from vosk import Model, KaldiRecognizer, SetLogLevel
+from audio_vad import SilenceSkipper
+from recognition import recognize_stream, combine_text
+from audio_io import decode_to_array, open_decoder, decoder_report
+from long_file import results_text
+from cascade import SMALL_MODEL, LARGE_MODEL, CONF_THRESHOLD, cascade_transcribe, cascade_report
+from model_warmup import LazyModel
+from metrics import METRICS
 
 class CustomTrainingTranscriber:
     def __init__(self):
@@ -19,20 +27,19 @@ class CustomTrainingTranscriber:
         self.load_models()
     
     def load_models(self):
-        """Load available models including custom ones"""
-        print("🔧 Loading transcription models...")
-        
+        """Find available models including custom ones
+
+        Only handles are created here; a model is loaded when a command
+        first decodes with it, so the profile and training commands never
+        load one.
+        """
         # Check for custom trained model
         custom_model_path = "custom_model"
         if os.path.exists(custom_model_path):
-            try:
-                self.models["custom"] = Model(custom_model_path)
-                self.custom_model_path = custom_model_path
-                print("✅ Loaded custom trained model")
-            except Exception as e:
-                print(f"⚠️  Failed to load custom model: {e}")
+            self.models["custom"] = LazyModel(custom_model_path)
+            self.custom_model_path = custom_model_path
         
-        # Load standard models
+        # Standard models, largest first
         standard_models = [
             "vosk-model-en-us-0.22",
             "vosk-model-en-us-0.21", 
@@ -41,20 +48,36 @@ class CustomTrainingTranscriber:
         
         for model_name in standard_models:
             if os.path.exists(model_name):
-                try:
-                    self.models[model_name] = Model(model_name)
-                    print(f"✅ Loaded: {model_name}")
-                except Exception as e:
-                    print(f"⚠️  Failed to load {model_name}: {e}")
+                self.models[model_name] = LazyModel(model_name)
         
-        if not self.models:
-            print("⚠️  No models loaded, falling back to default")
-            try:
-                self.models["default"] = Model(lang="en-us")
-                print("✅ Default model loaded")
-            except Exception as e:
-                print(f"✗ Error loading default model: {e}")
-                sys.exit(1)
+        # Fallback when none of the above can be loaded
+        self.models["default"] = LazyModel("default", lambda: Model(lang="en-us"))
+    
+    def get_model(self, model_name):
+        """Load a model on first use, None when it cannot be loaded"""
+        handle = self.models[model_name]
+        try:
+            was_loaded = handle.loaded
+            model = handle.get()
+        except Exception as e:
+            print(f"⚠️  Failed to load {model_name}: {e}")
+            return None
+        if not was_loaded:
+            print(f"✅ Loaded: {model_name} ({handle.load_time:.1f}s)")
+        return model
+    
+    def best_model(self):
+        """Custom model first, then the largest standard one that loads"""
+        for model_name in self.models:
+            model = self.get_model(model_name)
+            if model is not None:
+                return model_name, model
+        return None, None
+    
+    def release_models(self):
+        """Drop loaded models so their memory can be freed"""
+        for handle in self.models.values():
+            handle.release()
     
     def prepare_training_data(self, audio_files, transcriptions, output_dir="training_data"):
         """Prepare audio files and transcriptions for training"""
@@ -244,7 +267,20 @@ echo "   3. Run: cd $MODEL_OUTPUT_DIR && ./adapt.sh"
         print(f"✅ Voice profile saved: {profile_file}")
         return profile_data
     
-    def adaptive_transcribe(self, audio_file, output_file=None, use_voice_profile=True):
+    def cascade_models(self):
+        """Small and large cascade models from the local model folders, or None"""
+        if not os.path.exists(SMALL_MODEL) or not os.path.exists(LARGE_MODEL):
+            return None
+        for model_name in (SMALL_MODEL, LARGE_MODEL):
+            self.models.setdefault(model_name, LazyModel(model_name))
+        small_model = self.get_model(SMALL_MODEL)
+        large_model = self.get_model(LARGE_MODEL)
+        if small_model is None or large_model is None:
+            return None
+        return small_model, large_model
+    
+    def adaptive_transcribe(self, audio_file, output_file=None, use_voice_profile=True, skip_silence=False,
+                            cascade=False, threshold=CONF_THRESHOLD):
         """Transcribe with voice adaptation"""
         if not os.path.exists(audio_file):
             print(f"✗ Error: Audio file '{audio_file}' not found.")
@@ -262,68 +298,33 @@ echo "   3. Run: cd $MODEL_OUTPUT_DIR && ./adapt.sh"
             except:
                 use_voice_profile = False
         
-        # Choose best model (custom first, then largest standard)
-        best_model_name = None
-        best_model = None
-        
-        if "custom" in self.models:
-            best_model_name = "custom"
-            best_model = self.models["custom"]
-        elif "vosk-model-en-us-0.22" in self.models:
-            best_model_name = "vosk-model-en-us-0.22"
-            best_model = self.models["vosk-model-en-us-0.22"]
-        else:
-            best_model_name = list(self.models.keys())[0]
-            best_model = self.models[best_model_name]
-        
-        print(f"🔧 Using model: {best_model_name}")
+        # The cascade brings its own pair; otherwise only the best model loads
+        cascade_pair = self.cascade_models() if cascade else None
+        if cascade_pair is None:
+            best_model_name, best_model = self.best_model()
+            if best_model is None:
+                print("✗ Error: No model could be loaded")
+                return None
+            if cascade:
+                print(f"⚠️  Cascade needs {SMALL_MODEL} and {LARGE_MODEL}, using {best_model_name} only")
+            print(f"🔧 Using model: {best_model_name}")
         
         # Preprocess audio with voice-specific settings
         processed_file = self.preprocess_for_voice(audio_file, use_voice_profile)
         
         try:
-            process = subprocess.Popen([
-                "ffmpeg", "-loglevel", "quiet", "-i", processed_file,
-                "-ar", "16000", "-ac", "1", "-f", "s16le", "-"
-            ], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            
-            rec = KaldiRecognizer(best_model, 16000)
-            rec.SetWords(True)
-            
-            transcription_parts = []
-            
-            while True:
-                data = process.stdout.read(4000)
-                if len(data) == 0:
-                    break
-                
-                if rec.AcceptWaveform(data):
-                    result = rec.Result()
-                    if result.strip():
-                        transcription_parts.append(result)
-            
-            final_result = rec.FinalResult()
-            if final_result.strip():
-                transcription_parts.append(final_result)
-            
-            process.wait()
+            if cascade_pair is not None:
+                samples = decode_to_array(processed_file)
+                results, stats = cascade_transcribe(*cascade_pair, samples, threshold=threshold)
+                print(cascade_report(stats))
+                full_transcription = results_text(results)
+            else:
+                full_transcription = self.decode_file(best_model, processed_file, skip_silence)
             
-            if process.returncode != 0:
+            if full_transcription is None:
                 print("✗ Error: ffmpeg failed to process the audio file.")
                 return None
             
-            # Combine transcription parts
-            full_transcription = ""
-            for part in transcription_parts:
-                try:
-                    json_result = json.loads(part)
-                    if 'text' in json_result and json_result['text'].strip():
-                        full_transcription += json_result['text'] + " "
-                except json.JSONDecodeError:
-                    continue
-            
-            full_transcription = full_transcription.strip()
-            
             if not full_transcription:
                 print("⚠️  No speech detected in the audio file.")
                 return None
@@ -343,7 +344,7 @@ echo "   3. Run: cd $MODEL_OUTPUT_DIR && ./adapt.sh"
             
             # Save to file if requested
             if output_file:
-                with open(output_file, 'w', encoding='utf-8') as f:
+                with METRICS.time("write_output"), open(output_file, 'w', encoding='utf-8') as f:
                     f.write(improved_transcription)
                 print(f"\n💾 Adaptive transcription saved to: {output_file}")
             
@@ -359,6 +360,24 @@ echo "   3. Run: cd $MODEL_OUTPUT_DIR && ./adapt.sh"
         except Exception as e:
             print(f"✗ Error during transcription: {e}")
             return None
+        finally:
+            self.release_models()
+    
+    def decode_file(self, model, audio_file, skip_silence=False):
+        """Decode a file with one model, None when ffmpeg fails"""
+        decoder = open_decoder(audio_file, 16000)
+        
+        rec = KaldiRecognizer(model, 16000)
+        rec.SetWords(True)
+        
+        skipper = SilenceSkipper(16000) if skip_silence else None
+        transcription_parts = recognize_stream(rec, decoder, skipper)
+        
+        if decoder.close() != 0:
+            return None
+        print(decoder_report(decoder))
+        
+        return combine_text(transcription_parts)
     
     def preprocess_for_voice(self, audio_file, use_voice_profile=True):
         """Preprocess audio with voice-specific settings"""
@@ -394,6 +413,7 @@ echo "   3. Run: cd $MODEL_OUTPUT_DIR && ./adapt.sh"
             print(f"⚠️  Preprocessing error: {e}, using original file")
             return audio_file
     
+    @METRICS.timed("postprocess")
     def post_process_for_voice(self, text, use_voice_profile=True):
         """Post-process with voice-specific corrections"""
         if not text:
@@ -464,7 +484,7 @@ def main():
     
     if len(sys.argv) < 2:
         print("Usage:")
-        print("  python3 custom_training_transcriber.py transcribe <audio_file> [output_file]")
+        print("  python3 custom_training_transcriber.py transcribe <audio_file> [output_file] [--skip-silence] [--cascade [--threshold T]] [--metrics FILE]")
         print("  python3 custom_training_transcriber.py create-profile <audio_file1> [audio_file2] ...")
         print("  python3 custom_training_transcriber.py prepare-training <audio_file1> <transcript1> [audio_file2] [transcript2] ...")
         print("\nExamples:")
@@ -473,34 +493,51 @@ def main():
         print("  python3 custom_training_transcriber.py prepare-training 'audio1.m4a' 'transcript1.txt' 'audio2.m4a' 'transcript2.txt'")
         sys.exit(1)
     
-    command = sys.argv[1].lower()
+    parser = argparse.ArgumentParser(description="Custom Training Transcription Tool")
+    parser.add_argument("command")
+    parser.add_argument("params", nargs="*")
+    parser.add_argument("--skip-silence", action="store_true",
+                        help="drop long silences before the recognizer")
+    parser.add_argument("--cascade", action="store_true",
+                        help="small model first, re-decode low-confidence utterances with the large model")
+    parser.add_argument("--threshold", type=float, default=CONF_THRESHOLD,
+                        help="mean word confidence below which --cascade re-decodes an utterance")
+    parser.add_argument("--metrics", default=None,
+                        help="write per-stage latency histograms to this file on exit, "
+                             "as JSON for a .json name and Prometheus text otherwise")
+    options = parser.parse_args()
+    METRICS.export_at_exit(options.metrics)
+    
+    command = options.command.lower()
+    params = options.params
     transcriber = CustomTrainingTranscriber()
     
     if command == "transcribe":
-        if len(sys.argv) < 3:
+        if len(params) < 1:
             print("✗ Error: Please specify an audio file")
             sys.exit(1)
         
-        audio_file = sys.argv[2]
-        output_file = sys.argv[3] if len(sys.argv) > 3 else None
+        audio_file = params[0]
+        output_file = params[1] if len(params) > 1 else None
         
-        transcriber.adaptive_transcribe(audio_file, output_file)
+        transcriber.adaptive_transcribe(audio_file, output_file, skip_silence=options.skip_silence,
+                                        cascade=options.cascade, threshold=options.threshold)
     
     elif command == "create-profile":
-        if len(sys.argv) < 3:
+        if len(params) < 1:
             print("✗ Error: Please specify at least one audio file")
             sys.exit(1)
         
-        audio_files = sys.argv[2:]
+        audio_files = params
         profile = transcriber.create_voice_profile(audio_files)
         print(f"\n🎤 Voice profile created with {len(profile['audio_files'])} samples")
     
     elif command == "prepare-training":
-        if len(sys.argv) < 4 or len(sys.argv) % 2 != 0:
+        if len(params) < 2 or len(params) % 2 != 0:
             print("✗ Error: Please specify pairs of audio files and transcriptions")
             sys.exit(1)
         
-        args = sys.argv[2:]
+        args = params
         audio_files = args[::2]
         transcriptions = args[1::2]
         
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+In-process versions of the ffmpeg preprocessing filters.
+
+parse_chain() turns an ffmpeg -af string such as
+"highpass=f=200,lowpass=f=3000,volume=1.5" into a FilterChain that
+filters s16le chunks as they stream from any PCM source to the
+recognizer, carrying filter state across chunks. Arrays from the
+microphone or from memory no longer need a round trip through ffmpeg.
+
+highpass/lowpass are ffmpeg's default two-pole Butterworth biquads and
+volume is a plain gain with clipping. compand follows ffmpeg's
+attack/decay envelope, transfer points and look-ahead delay, with the
+envelope updated once per millisecond and without the soft-knee
+rounding of the transfer curve.
+"""
+
+import argparse
+import subprocess
+import time
+
+import numpy as np
+from scipy.signal import butter, sosfilt
+
+SAMPLE_RATE = 16000
+ENVELOPE_BLOCK = 16  # Samples per compand envelope step, 1 ms at 16 kHz
+
+
+class BiquadFilter:
+    """Two-pole Butterworth high- or low-pass with state kept between chunks"""
+
+    def __init__(self, btype, frequency, sample_rate=SAMPLE_RATE):
+        self.sos = butter(2, frequency, btype=btype, fs=sample_rate, output="sos")
+        self.zi = np.zeros((self.sos.shape[0], 2))
+
+    def process(self, x):
+        if len(x) == 0:
+            return x
+        y, self.zi = sosfilt(self.sos, x, zi=self.zi)
+        return y
+
+    def flush(self):
+        return np.zeros(0)
+
+
+class Gain:
+    """ffmpeg volume=factor"""
+
+    def __init__(self, factor):
+        self.factor = factor
+
+    def process(self, x):
+        return x * self.factor
+
+    def flush(self):
+        return np.zeros(0)
+
+
+class Compander:
+    """ffmpeg compand for mono audio
+
+    The gain applied to a sample is taken from the envelope delay seconds
+    later, as ffmpeg does, so output lags input by the delay until
+    flush() drains it.
+    """
+
+    def __init__(self, attack, decay, points, gain_db=0.0, initial_db=-90.0, delay=0.0,
+                 sample_rate=SAMPLE_RATE):
+        self.attack = self.coefficient(attack, sample_rate)
+        self.decay = self.coefficient(decay, sample_rate)
+        self.in_db = np.array([p[0] for p in points], dtype=np.float64)
+        self.out_db = np.array([p[1] for p in points], dtype=np.float64)
+        self.gain_db = gain_db
+        self.volume = 10 ** (initial_db / 20)
+        self.delay = int(delay * sample_rate)
+        self.pending = np.zeros(0)  # Samples not output yet
+        self.gains = np.zeros(0)  # Gains known for the start of pending
+
+    @staticmethod
+    def coefficient(seconds, sample_rate):
+        if seconds * sample_rate <= ENVELOPE_BLOCK:
+            return 1.0
+        return 1.0 - np.exp(-ENVELOPE_BLOCK / (sample_rate * seconds))
+
+    def transfer_db(self, level_db):
+        """Output level for an input level, linear between and beyond the points"""
+        out = np.interp(level_db, self.in_db, self.out_db)
+        below = level_db < self.in_db[0]
+        above = level_db > self.in_db[-1]
+        out[below] = level_db[below] + (self.out_db[0] - self.in_db[0])
+        out[above] = level_db[above] + (self.out_db[-1] - self.in_db[-1])
+        return out + self.gain_db
+
+    def envelope_gains(self, x):
+        """Gains for x, a whole number of envelope blocks"""
+        peaks = np.abs(x).reshape(-1, ENVELOPE_BLOCK).max(axis=1)
+
+        envelope = np.empty(len(peaks))
+        volume = self.volume
+        for k, peak in enumerate(peaks):
+            volume += (peak - volume) * (self.attack if peak > volume else self.decay)
+            envelope[k] = volume
+        self.volume = volume
+
+        level_db = 20 * np.log10(np.maximum(envelope, 1e-9))
+        gain = 10 ** ((self.transfer_db(level_db) - level_db) / 20)
+        return np.repeat(gain, ENVELOPE_BLOCK)
+
+    def process(self, x):
+        self.pending = np.concatenate((self.pending, x))
+        # Only whole blocks get an envelope, so chunk sizes do not matter
+        n_new = (len(self.pending) - len(self.gains)) // ENVELOPE_BLOCK * ENVELOPE_BLOCK
+        if n_new > 0:
+            start = len(self.gains)
+            self.gains = np.concatenate((self.gains, self.envelope_gains(self.pending[start:start + n_new])))
+
+        # Sample j is output with the gain of sample j + delay
+        n_out = max(0, len(self.gains) - self.delay)
+        out = self.pending[:n_out] * self.gains[self.delay:self.delay + n_out]
+        self.pending = self.pending[n_out:]
+        self.gains = self.gains[n_out:]
+        return out
+
+    def flush(self):
+        rest = len(self.pending) - len(self.gains)
+        if rest > 0:
+            block = np.zeros(ENVELOPE_BLOCK)
+            block[:rest] = self.pending[len(self.gains):]
+            self.gains = np.concatenate((self.gains, self.envelope_gains(block)[:rest]))
+        gains = self.gains[self.delay:]
+        last = gains[-1] if len(gains) else (self.gains[-1] if len(self.gains) else 1.0)
+        gains = np.concatenate((gains, np.full(len(self.pending) - len(gains), last)))
+        out = self.pending * gains
+        self.pending = np.zeros(0)
+        self.gains = np.zeros(0)
+        return out
+
+
+class FilterChain:
+    """A sequence of filter stages applied to s16le chunks
+
+    process() and flush() take and return bytes, like SilenceSkipper, so
+    the chain can sit in any of the streaming loops.
+    """
+
+    def __init__(self, stages):
+        self.stages = stages
+
+    def process_array(self, x):
+        for stage in self.stages:
+            x = stage.process(x)
+        return x
+
+    def process(self, data):
+        x = np.frombuffer(data, dtype=np.int16).astype(np.float64) / 32768.0
+        return self.to_pcm(self.process_array(x))
+
+    def flush(self):
+        x = np.zeros(0)
+        for stage in self.stages:
+            x = np.concatenate((stage.process(x), stage.flush()))
+        return self.to_pcm(x)
+
+    @staticmethod
+    def to_pcm(x):
+        return np.clip(np.round(x * 32768.0), -32768, 32767).astype(np.int16).tobytes()
+
+
+def parse_options(options):
+    """Split 'f=200:p=2' style filter options into a dict, keeping positional ones in order"""
+    named = {}
+    positional = []
+    for option in options.split(":") if options else []:
+        if "=" in option:
+            key, value = option.split("=", 1)
+            named[key] = value
+        else:
+            positional.append(option)
+    return named, positional
+
+
+def parse_compand(options, sample_rate):
+    named, positional = parse_options(options)
+    names = ["attacks", "decays", "points", "soft-knee", "gain", "volume", "delay"]
+    values = dict(zip(names, positional))
+    values.update(named)
+
+    # Per-channel lists, the first entry is the one that applies to mono
+    attack = float(values.get("attacks", "0").split("|")[0])
+    decay = float(values.get("decays", "0.8").split("|")[0])
+    numbers = [float(v) for v in values.get("points", "-70/-70|-60/-20|1/0").replace("|", "/").split("/")]
+    points = list(zip(numbers[::2], numbers[1::2]))
+    return Compander(attack, decay, points, float(values.get("gain", 0)),
+                     float(values.get("volume", 0)), float(values.get("delay", 0)), sample_rate)
+
+
+def parse_chain(filter_chain, sample_rate=SAMPLE_RATE):
+    """Build a FilterChain from an ffmpeg -af string
+
+    Raises ValueError for filters that have no in-process version, such
+    as anlmdn.
+    """
+    stages = []
+    for spec in filter_chain.split(","):
+        name, _, options = spec.partition("=")
+        named, positional = parse_options(options)
+        if name in ("highpass", "lowpass"):
+            default = 3000 if name == "highpass" else 500  # ffmpeg's defaults
+            frequency = named.get("f", named.get("frequency", positional[0] if positional else default))
+            stages.append(BiquadFilter(name[:-4], float(frequency), sample_rate))
+        elif name == "volume":
+            factor = named.get("volume", positional[0] if positional else 1.0)
+            stages.append(Gain(float(factor)))
+        elif name == "compand":
+            stages.append(parse_compand(options, sample_rate))
+        else:
+            raise ValueError(f"No in-process version of ffmpeg filter '{name}'")
+    return FilterChain(stages)
+
+
+def benchmark(audio_file_path, filter_chain, sample_rate=SAMPLE_RATE, chunk_size=4000):
+    """Time ffmpeg's filter chain against the in-process one on the same file"""
+    decode = ["ffmpeg", "-loglevel", "quiet", "-i", audio_file_path,
+              "-ar", str(sample_rate), "-ac", "1", "-f", "s16le", "-"]
+
+    start_time = time.time()
+    raw = subprocess.run(decode, stdout=subprocess.PIPE, check=True).stdout
+    decode_time = time.time() - start_time
+
+    start_time = time.time()
+    reference = subprocess.run(decode[:-5] + ["-af", filter_chain] + decode[-5:],
+                               stdout=subprocess.PIPE, check=True).stdout
+    ffmpeg_time = time.time() - start_time
+
+    chain = parse_chain(filter_chain, sample_rate)
+    start_time = time.time()
+    filtered = b"".join(chain.process(raw[i:i + chunk_size]) for i in range(0, len(raw), chunk_size))
+    filtered += chain.flush()
+    native_time = time.time() - start_time
+
+    a = np.frombuffer(reference, dtype=np.int16).astype(np.float64)
+    b = np.frombuffer(filtered, dtype=np.int16).astype(np.float64)
+    n = min(len(a), len(b))
+    error_db = 10 * np.log10(np.mean((a[:n] - b[:n]) ** 2) / max(np.mean(a[:n] ** 2), 1e-9) + 1e-12)
+
+    seconds = len(raw) / 2 / sample_rate
+    print(f"🎚️  {filter_chain}")
+    print(f"   Audio: {seconds:.1f}s")
+    print(f"   ffmpeg decode only:      {decode_time:.2f}s")
+    print(f"   ffmpeg decode + filters: {ffmpeg_time:.2f}s")
+    print(f"   In-process filters:      {native_time:.2f}s (after the plain decode)")
+    print(f"   Difference from ffmpeg:  {error_db:.1f} dB relative to signal")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare in-process filters with ffmpeg")
+    parser.add_argument("audio_file")
+    parser.add_argument("filter_chain", nargs="?", default="highpass=f=200,lowpass=f=3000,volume=1.5")
+    args = parser.parse_args()
+    benchmark(args.audio_file, args.filter_chain)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,20 +2,41 @@
 
 import subprocess
 import sys
-import json
 import os
 import time
 import re
 import requests
 import zipfile
-from vosk import Model, KaldiRecognizer, SetLogLevel
+import argparse
+from vosk import KaldiRecognizer, SetLogLevel
+from audio_vad import SilenceSkipper
+from recognition import recognize_stream, combine_text
+from adaptive_preprocessing import adapt_filter_chain
+from audio_io import open_decoder, decoder_report, parse_time, time_window, ReadAhead
+from model_warmup import load_model, ModelLoader, FirstResultClock
+from metrics import METRICS
 
 class EnhancedAudioTranscriber:
-    def __init__(self, model_name=None):
+    def __init__(self, model_name=None, warm_up=False):
         SetLogLevel(-1)
         self.model_name = model_name or "vosk-model-en-us-0.22"
-        self.model = None
-        self.load_model()
+        self.warm_up = warm_up
+        # Resolving, downloading and loading the model run in the background
+        # while the first input is preprocessed and decoded
+        self.loader = ModelLoader(self.load_model, self.model_name)
+        # The first transcription on an unwarmed model pays the cold start
+        self.warm = warm_up
+        self.started = False
+    
+    @property
+    def model(self):
+        """The loaded Model, waiting for the background load if needed
+
+        model_name becomes the name actually loaded, after any fallback,
+        only here on the caller's thread; the loader never touches it.
+        """
+        model, self.model_name = self.loader.result()
+        return model
     
     def download_model(self, model_name):
         """Download a specific Vosk model"""
@@ -63,36 +84,55 @@ class EnhancedAudioTranscriber:
             print(f"✗ Error downloading model: {e}")
             return False
     
-    def load_model(self):
-        """Load the Vosk model"""
+    def load_model(self, model_name):
+        """Load the Vosk model, returning it with the name it was loaded by"""
         try:
-            if not os.path.exists(self.model_name):
-                if not self.download_model(self.model_name):
+            if not os.path.exists(model_name):
+                if not self.download_model(model_name):
                     print(f"⚠️  Falling back to default model")
-                    self.model_name = "en-us"
+                    model_name = "en-us"
             
-            self.model = Model(self.model_name)
-            print(f"✅ Model loaded: {self.model_name}")
+            model, self.load_report = load_model(model_name, warm_up=self.warm_up)
+            print(f"✅ Model loaded: {model_name}")
+            print(self.load_report)
+            return model, model_name
             
         except Exception as e:
             print(f"✗ Error loading model: {e}")
             print("⚠️  Falling back to default model")
             try:
-                self.model = Model(lang="en-us")
+                model, self.load_report = load_model(lang="en-us", warm_up=self.warm_up)
                 print("✅ Default model loaded")
+                print(self.load_report)
+                return model, "en-us"
             except Exception as e2:
                 print(f"✗ Error loading default model: {e2}")
                 sys.exit(1)
     
-    def preprocess_audio(self, input_file, output_file=None):
-        """Preprocess audio for better recognition"""
+    def preprocess_audio(self, input_file, output_file=None, always_denoise=False, start=None,
+                         duration=None):
+        """Preprocess audio for better recognition, denoising only noisy recordings
+
+        start and duration (seconds) preprocess only that part of the file.
+        """
         if output_file is None:
             output_file = f"preprocessed_{os.path.basename(input_file)}"
         
+        filter_chain = "highpass=f=200,lowpass=f=3000,volume=1.5,anlmdn=s=7:p=0.002:r=0.01"
+        if not always_denoise:
+            filter_chain = adapt_filter_chain(input_file, filter_chain, start=start, duration=duration)
+        
+        # Seek on the input side, so only the requested range is decoded
+        window = []
+        if start is not None:
+            window += ["-ss", str(start)]
+        if duration is not None:
+            window += ["-t", str(duration)]
+        
         # Enhanced audio preprocessing with ffmpeg
         cmd = [
-            "ffmpeg", "-y", "-i", input_file,
-            "-af", "highpass=f=200,lowpass=f=3000,volume=1.5,anlmdn=s=7:p=0.002:r=0.01",  # Noise reduction and filtering
+            "ffmpeg", "-y", *window, "-i", input_file,
+            "-af", filter_chain,  # Noise reduction and filtering
             "-ar", "16000",  # Sample rate
             "-ac", "1",      # Mono
             "-acodec", "pcm_s16le",  # 16-bit PCM
@@ -111,6 +151,7 @@ class EnhancedAudioTranscriber:
             print(f"⚠️  Preprocessing error: {e}, using original file")
             return input_file
     
+    @METRICS.timed("postprocess")
     def post_process_transcription(self, text):
         """Post-process transcription to improve accuracy"""
         if not text:
@@ -257,8 +298,13 @@ class EnhancedAudioTranscriber:
         
         return text
     
-    def transcribe_with_confidence(self, audio_file_path, output_file=None, use_preprocessing=True):
-        """Transcribe audio with confidence scoring and multiple passes"""
+    def transcribe_with_confidence(self, audio_file_path, output_file=None, use_preprocessing=True,
+                                   skip_silence=False, always_denoise=False, start=None, end=None):
+        """Transcribe audio with confidence scoring and multiple passes
+
+        start and end (seconds) limit it to part of the file, with word
+        times kept in file time.
+        """
         if not os.path.exists(audio_file_path):
             print(f"✗ Error: Audio file '{audio_file_path}' not found.")
             return None
@@ -266,56 +312,47 @@ class EnhancedAudioTranscriber:
         print(f"🎵 Transcribing: {audio_file_path}")
         print(f"🔧 Using model: {self.model_name}")
         
-        # Preprocess audio if requested
-        if use_preprocessing:
-            processed_file = self.preprocess_audio(audio_file_path)
-        else:
-            processed_file = audio_file_path
-        
         try:
-            # First pass: Standard transcription
-            process = subprocess.Popen([
-                "ffmpeg", "-loglevel", "quiet", "-i", processed_file,
-                "-ar", "16000", "-ac", "1", "-f", "s16le", "-"
-            ], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            window_start, duration = time_window(start, end)
             
-            rec = KaldiRecognizer(self.model, 16000)
-            rec.SetWords(True)
+            # Preprocess audio if requested
+            if use_preprocessing:
+                processed_file = self.preprocess_audio(audio_file_path, always_denoise=always_denoise,
+                                                       start=window_start, duration=duration)
+            else:
+                processed_file = audio_file_path
             
-            transcription_parts = []
-            confidence_scores = []
+            # First pass: Standard transcription. A preprocessed file
+            # already holds just the window. Decoding runs ahead into a
+            # bounded buffer while the model may still be loading.
+            if processed_file != audio_file_path:
+                decoder = ReadAhead(open_decoder(processed_file, 16000))
+            else:
+                decoder = ReadAhead(open_decoder(processed_file, 16000, window_start, duration))
             
-            while True:
-                data = process.stdout.read(4000)
-                if len(data) == 0:
-                    break
+            # The first transcription counts from startup, model load included
+            clock = FirstResultClock(self.warm, None if self.started else self.loader.start_time)
+            self.started = True
+            try:
+                rec = KaldiRecognizer(self.model, 16000)
+                rec.SetWords(True)
                 
-                if rec.AcceptWaveform(data):
-                    result = rec.Result()
-                    if result.strip():
-                        transcription_parts.append(result)
-            
-            final_result = rec.FinalResult()
-            if final_result.strip():
-                transcription_parts.append(final_result)
+                skipper = SilenceSkipper(16000) if skip_silence else None
+                transcription_parts = recognize_stream(rec, decoder, skipper,
+                                                       time_offset=window_start or 0.0, clock=clock)
+            except BaseException:
+                # Stop ffmpeg and the read-ahead thread, nothing will read them now
+                decoder.kill()
+                raise
+            self.warm = True
             
-            process.wait()
-            
-            if process.returncode != 0:
+            if decoder.close() != 0:
                 print("✗ Error: ffmpeg failed to process the audio file.")
                 return None
+            print(decoder_report(decoder))
+            print(clock.report(self.loader.ready_time))
             
-            # Combine all transcription parts
-            full_transcription = ""
-            for part in transcription_parts:
-                try:
-                    json_result = json.loads(part)
-                    if 'text' in json_result and json_result['text'].strip():
-                        full_transcription += json_result['text'] + " "
-                except json.JSONDecodeError:
-                    continue
-            
-            full_transcription = full_transcription.strip()
+            full_transcription = combine_text(transcription_parts)
             
             if not full_transcription:
                 print("⚠️  No speech detected in the audio file.")
@@ -341,7 +378,7 @@ class EnhancedAudioTranscriber:
             
             # Save to file if requested
             if output_file:
-                with open(output_file, 'w', encoding='utf-8') as f:
+                with METRICS.time("write_output"), open(output_file, 'w', encoding='utf-8') as f:
                     f.write(improved_transcription)
                 print(f"\n💾 Enhanced transcription saved to: {output_file}")
             
@@ -367,7 +404,7 @@ def main():
     
     if len(sys.argv) < 2:
         print("Usage:")
-        print("  python3 enhanced_transcriber.py <audio_file> [output_file] [model_name]")
+        print("  python3 enhanced_transcriber.py <audio_file> [output_file] [model_name] [--skip-silence] [--always-denoise] [--start T] [--end T] [--warm-up] [--metrics FILE]")
         print("\nAvailable models:")
         print("  - vosk-model-en-us-0.22 (largest, most accurate)")
         print("  - vosk-model-en-us-0.21 (large, accurate)")
@@ -379,12 +416,31 @@ def main():
         print("  python3 enhanced_transcriber.py 'audio.m4a' 'transcript.txt' 'vosk-model-en-us-0.22'")
         sys.exit(1)
     
-    audio_file = sys.argv[1]
-    output_file = sys.argv[2] if len(sys.argv) > 2 else None
-    model_name = sys.argv[3] if len(sys.argv) > 3 else None
+    parser = argparse.ArgumentParser(description="Enhanced Audio Transcription Tool")
+    parser.add_argument("audio_file")
+    parser.add_argument("output_file", nargs="?")
+    parser.add_argument("model_name", nargs="?")
+    parser.add_argument("--skip-silence", action="store_true",
+                        help="drop long silences before the recognizer")
+    parser.add_argument("--always-denoise", action="store_true",
+                        help="run the anlmdn denoiser even when the recording looks clean")
+    parser.add_argument("--start", type=parse_time, default=None,
+                        help="transcribe from this time on, in seconds, MM:SS or HH:MM:SS")
+    parser.add_argument("--end", type=parse_time, default=None,
+                        help="stop transcribing at this time, in seconds, MM:SS or HH:MM:SS")
+    parser.add_argument("--warm-up", action="store_true",
+                        help="prefetch the model into the page cache and warm it up before transcribing")
+    parser.add_argument("--metrics", default=None,
+                        help="write per-stage latency histograms to this file on exit, "
+                             "as JSON for a .json name and Prometheus text otherwise")
+    args = parser.parse_args()
+    METRICS.export_at_exit(args.metrics)
     
-    transcriber = EnhancedAudioTranscriber(model_name)
-    transcriber.transcribe_with_confidence(audio_file, output_file)
+    transcriber = EnhancedAudioTranscriber(args.model_name, args.warm_up)
+    transcriber.transcribe_with_confidence(args.audio_file, args.output_file,
+                                           skip_silence=args.skip_silence,
+                                           always_denoise=args.always_denoise,
+                                           start=args.start, end=args.end)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Agreement-driven scheduling of ensemble decodes.
+
+Jobs run in priority order. Every finished hypothesis is aligned word by
+word against the ones before it; once two of them agree closely enough
+the remaining jobs are cancelled, since more decodes of easy audio only
+repeat the same words.
+
+Which models are resident at the same time is planned against a memory
+budget: plan_residency groups models into waves that fit together, and
+a wave's models are released before the next wave loads.
+"""
+
+import os
+import resource
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from difflib import SequenceMatcher
+
+AGREEMENT_THRESHOLD = 0.9
+# A loaded model takes about this much more memory than its files on disk
+FOOTPRINT_FACTOR = 1.2
+
+
+def word_agreement(text_a, text_b):
+    """Share of words two hypotheses have in common after alignment, 0..1"""
+    words_a = text_a.lower().split()
+    words_b = text_b.lower().split()
+    if not words_a and not words_b:
+        return 1.0
+    return SequenceMatcher(None, words_a, words_b, autojunk=False).ratio()
+
+
+def run_until_agreement(jobs, run_job, threshold=AGREEMENT_THRESHOLD, workers=2, earlier=()):
+    """Run jobs in order until two finished hypotheses agree
+
+    run_job(job, stop_event) returns the hypothesis text or None and
+    should return early once stop_event is set. threshold None runs every
+    job. earlier are (job, text) pairs finished before, which new
+    hypotheses are compared against too. Returns the newly finished
+    (job, text) pairs in completion order and the best agreement seen.
+    """
+    stop_event = threading.Event()
+    finished = list(earlier)
+    best_agreement = 0.0
+    pending = list(jobs)
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while pending or running:
+            while pending and len(running) < workers and not stop_event.is_set():
+                job = pending.pop(0)
+                running[pool.submit(run_job, job, stop_event)] = job
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                job = running.pop(future)
+                text = future.result()
+                if not text or stop_event.is_set():
+                    continue
+                for _, other in finished:
+                    best_agreement = max(best_agreement, word_agreement(text, other))
+                finished.append((job, text))
+
+            if threshold is not None and best_agreement >= threshold:
+                stop_event.set()
+
+    return finished[len(earlier):], best_agreement
+
+
+def model_footprint(model_dir, factor=FOOTPRINT_FACTOR):
+    """Estimated resident bytes of a loaded model, None if it is not on disk"""
+    if not os.path.isdir(model_dir):
+        return None
+    total = 0
+    for root, _, files in os.walk(model_dir):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                continue
+    return int(total * factor)
+
+
+def memory_available():
+    """Bytes the system can give this process without swapping, None if unknown"""
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def current_rss():
+    """Resident bytes of this process right now, None if unknown"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+def peak_rss():
+    """Highest resident bytes of this process so far"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def parse_size(text):
+    """Bytes from '4G', '3500M', '512k' or a plain number of bytes"""
+    text = str(text).strip().upper().rstrip("B")
+    units = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30, "T": 1 << 40}
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(float(text))
+
+
+def plan_residency(footprints, budget):
+    """Group models into waves that fit in the memory budget together
+
+    footprints maps model names, in priority order, to estimated bytes or
+    None when unknown. Each wave is a list of names whose models can be
+    resident at once; waves keep the priority order. A model of unknown
+    size, or one larger than the whole budget, gets a wave of its own.
+    budget None puts every model in its own wave.
+    """
+    waves = []
+    wave, used = [], 0
+    for name, size in footprints.items():
+        alone = budget is None or size is None or size > budget
+        if wave and (alone or used + size > budget):
+            waves.append(wave)
+            wave, used = [], 0
+        wave.append(name)
+        used += size or 0
+        if alone:
+            waves.append(wave)
+            wave, used = [], 0
+    if wave:
+        waves.append(wave)
+    return waves
@@ -2,19 +2,143 @@
 
 import subprocess
 import sys
-import json
 import os
 import time
 import re
 import requests
 import zipfile
+import argparse
 from vosk import Model, KaldiRecognizer, SetLogLevel
+from audio_vad import SilenceSkipper
+from recognition import recognize_stream, combine_text
+from audio_io import decode_to_array, open_decoder, decoder_report
+from long_file import results_text
+from cascade import SMALL_MODEL, LARGE_MODEL, CONF_THRESHOLD, cascade_transcribe, cascade_report
+from nbest import build_terms, nbest_transcribe
+from ensemble_scheduler import AGREEMENT_THRESHOLD, run_until_agreement
+from ensemble_scheduler import plan_residency, model_footprint, memory_available, current_rss, peak_rss
+from ensemble_scheduler import parse_size
+from concurrent.futures import ThreadPoolExecutor
+from audio_io import probe_duration
+from variant_selection import select_variant
+from adaptive_preprocessing import adapt_filter_chain
+from model_warmup import LazyModel
+from metrics import METRICS
+
+# Common corrections for interview context
+CORRECTIONS = {
+    'yeah yeah': 'yes, yes',
+    'uh huh': 'uh-huh',
+    'i think': 'I think',
+    'i would': 'I would',
+    'i will': 'I will',
+    'i am': 'I am',
+    'i have': 'I have',
+    'i do': 'I do',
+    'i can': 'I can',
+    'python py': 'Python, Py',
+    'py spark': 'PySpark',
+    'sql': 'SQL',
+    'tableau': 'Tableau',
+    'synchrony': 'Synchrony',
+    'discover': 'Discover',
+    'paypal': 'PayPal',
+    'credit risk': 'credit risk',
+    'modeling': 'modeling',
+    'analytics': 'analytics',
+    'dashboard': 'dashboard',
+    'probability': 'probability',
+    'exposure': 'exposure',
+    'sponsorship': 'sponsorship',
+    'interview': 'interview',
+    'position': 'position',
+    'experience': 'experience',
+    'technical': 'technical',
+    'methodology': 'methodology',
+    'leadership': 'leadership',
+    'operations': 'operations',
+    'strategy': 'strategy',
+    'industry': 'industry',
+    'finance': 'finance',
+    'banking': 'banking',
+    'analytical': 'analytical',
+    'insights': 'insights',
+    'managers': 'managers',
+    'leaders': 'leaders',
+    'decision': 'decision',
+    'development': 'development',
+    'current': 'current',
+    'previous': 'previous',
+    'building': 'building',
+    'delivering': 'delivering',
+    'reports': 'reports',
+    'regarding': 'regarding',
+    'analysis': 'analysis',
+    'potential': 'potential',
+    'similar': 'similar',
+    'based': 'based',
+    'role': 'role',
+    'there': 'there',
+    'currently': 'currently',
+    'one': 'one',
+    'first year': 'first year',
+    'market': 'market',
+    'ranges': 'ranges',
+    'salary': 'salary',
+    'hundred': 'hundred',
+    'thousand': 'thousand',
+    'thirty': 'thirty',
+    'five': 'five',
+    'above': 'above',
+    'further': 'further',
+    'talk': 'talk',
+    'about': 'about',
+    'interviewing': 'interviewing',
+    'company': 'company',
+    'second round': 'second round',
+    'coding': 'coding',
+    'available': 'available',
+    'march': 'March',
+    'six': 'six',
+    'seven': 'seven',
+    'eleven': 'eleven',
+    'twelve': 'twelve',
+    'four': 'four',
+    'pm': 'PM',
+    'am': 'AM',
+    'cst': 'CST',
+    'preferred': 'preferred',
+    'time': 'time',
+    'entire': 'entire',
+    'day': 'day',
+    'backfill': 'backfill',
+    'expansion': 'expansion',
+    'follow up': 'follow up',
+    'question': 'question',
+    'manager': 'manager',
+    'accommodating': 'accommodating',
+    'thank you': 'thank you',
+}
+
+class StoppableReader:
+    """File wrapper that reports end of stream once stop_event is set"""
+    
+    def __init__(self, stream, stop_event):
+        self.stream = stream
+        self.stop_event = stop_event
+    
+    def read(self, size):
+        if self.stop_event.is_set():
+            return b""
+        return self.stream.read(size)
 
 class EnsembleAudioTranscriber:
-    def __init__(self):
+    def __init__(self, load_all=True):
         SetLogLevel(-1)
         self.models = {}
-        self.load_models()
+        self.unavailable = set()  # Models that failed to download or load
+        if load_all:
+            self.load_models()
     
     def download_model(self, model_name):
         """Download a specific Vosk model"""
@@ -61,37 +185,201 @@ class EnsembleAudioTranscriber:
             return False
     
     def load_models(self):
-        """Load multiple Vosk models for ensemble"""
+        """Set up handles for the ensemble models
+
+        Nothing is downloaded or loaded here; each model is fetched when
+        the first decode needs it and released once its decodes are done.
+        """
         model_names = [
             "vosk-model-en-us-0.22",  # Largest, most accurate
             "vosk-model-en-us-0.21",  # Large, accurate
             "vosk-model-en-us-0.15"   # Medium
         ]
         
-        print("🔧 Loading ensemble models...")
-        
         for model_name in model_names:
-            try:
-                if not os.path.exists(model_name):
-                    if not self.download_model(model_name):
-                        continue
-                
-                self.models[model_name] = Model(model_name)
-                print(f"✅ Loaded: {model_name}")
+            self.models[model_name] = LazyModel(model_name, lambda name=model_name: self.fetch_model(name))
+    
+    def fetch_model(self, model_name):
+        """Download a model if it is missing and load it"""
+        if not os.path.exists(model_name) and not self.download_model(model_name):
+            raise RuntimeError(f"{model_name} is not available")
+        return Model(model_name)
+    
+    def get_model(self, model_name):
+        """Return a loaded model, downloading and loading it on first use"""
+        if model_name in self.unavailable:
+            return None
+        handle = self.models.get(model_name)
+        if handle is None:
+            handle = self.models[model_name] = LazyModel(model_name, lambda: self.fetch_model(model_name))
+        try:
+            was_loaded = handle.loaded
+            model = handle.get()
+        except Exception as e:
+            print(f"⚠️  Failed to load {model_name}: {e}")
+            self.unavailable.add(model_name)
+            return None
+        if not was_loaded:
+            print(f"✅ Loaded: {model_name} ({handle.load_time:.1f}s)")
+        return model
+    
+    def residency_plan(self, memory_budget=None):
+        """Waves of models that fit in memory together
+
+        memory_budget is in bytes and defaults to the memory available
+        now. Models of a wave are resident at the same time; a wave is
+        released before the next one loads.
+        """
+        budget = memory_budget if memory_budget is not None else memory_available()
+        footprints = {model_name: model_footprint(model_name) for model_name in self.models}
+        waves = plan_residency(footprints, budget)
+        print(f"🧠 Memory budget {budget / 1e6:.0f} MB: " if budget is not None else "🧠 Memory budget unknown: ",
+              end="")
+        print(" → ".join(" + ".join(wave) for wave in waves))
+        return waves, budget
+    
+    def default_wave(self):
+        """Register the default model as a last resort when no ensemble model loads"""
+        print("⚠️  No models loaded, falling back to default")
+        self.models["default"] = LazyModel("default", lambda: Model(lang="en-us"))
+        return ["default"]
+    
+    def run_wave(self, wave, run):
+        """Load a wave's models together, return run([(model_name, model), ...]) and release them
+
+        Returns None when none of the wave's models can be loaded.
+        """
+        with ThreadPoolExecutor(max_workers=len(wave)) as pool:
+            loaded = [(model_name, model) for model_name, model in zip(wave, pool.map(self.get_model, wave))
+                      if model is not None]
+        if not loaded:
+            return None
+        rss = current_rss()
+        print(f"🧠 Resident: {', '.join(model_name for model_name, _ in loaded)}"
+              + (f" ({rss / 1e6:.0f} MB RSS)" if rss is not None else ""))
+        try:
+            return run(loaded)
+        finally:
+            for model_name in wave:
+                self.models[model_name].release()
+    
+    def decode_variations(self, models, variations, skip_silence=False):
+        """Decode every variation with each resident model, models in parallel"""
+        def decode(model_name, model):
+            transcriptions = []
+            print(f"\n🔍 Using model: {model_name}")
+            for i, variation in enumerate(variations):
+                print(f"  📝 {model_name}: processing variation {i+1}/{len(variations)}...")
                 
-            except Exception as e:
-                print(f"⚠️  Failed to load {model_name}: {e}")
+                transcription = self.transcribe_with_model(variation, model_name, model, skip_silence)
+                if transcription:
+                    transcriptions.append({
+                        'model': model_name,
+                        'variation': i+1,
+                        'text': transcription
+                    })
+                    print(f"    ✅ Got transcription ({len(transcription)} chars)")
+                else:
+                    print(f"    ⚠️  No transcription")
+            return transcriptions
         
-        if not self.models:
-            print("⚠️  No models loaded, falling back to default")
-            try:
-                self.models["default"] = Model(lang="en-us")
-                print("✅ Default model loaded")
-            except Exception as e:
-                print(f"✗ Error loading default model: {e}")
-                sys.exit(1)
+        with ThreadPoolExecutor(max_workers=len(models)) as pool:
+            futures = [pool.submit(decode, model_name, model) for model_name, model in models]
+            return [transcription for future in futures for transcription in future.result()]
     
-    def create_audio_variations(self, input_file):
+    def cascade_transcribe(self, audio_file, output_file=None, threshold=CONF_THRESHOLD):
+        """Decode with the small model, re-decode only low-confidence utterances with the large one"""
+        if not os.path.exists(audio_file):
+            print(f"✗ Error: Audio file '{audio_file}' not found.")
+            return None
+        
+        print(f"🎵 Cascade transcribing: {audio_file}")
+        small_model = self.get_model(SMALL_MODEL)
+        large_model = self.get_model(LARGE_MODEL)
+        if small_model is None or large_model is None:
+            print("✗ Error: Cascade needs both the small and the large model")
+            return None
+        
+        try:
+            samples = decode_to_array(audio_file)
+        except Exception as e:
+            print(f"✗ Error decoding audio: {e}")
+            return None
+        
+        results, stats = cascade_transcribe(small_model, large_model, samples, threshold=threshold)
+        print(cascade_report(stats))
+        
+        improved_transcription = self.post_process_transcription({'text': results_text(results)})
+        if not improved_transcription:
+            print("⚠️  No speech detected in the audio file.")
+            return None
+        
+        print("\n" + "="*80)
+        print("📝 CASCADE TRANSCRIPTION RESULT")
+        print("="*80)
+        print(improved_transcription)
+        print("="*80)
+        
+        if output_file:
+            with METRICS.time("write_output"), open(output_file, 'w', encoding='utf-8') as f:
+                f.write(improved_transcription)
+            print(f"\n💾 Cascade transcription saved to: {output_file}")
+        
+        return improved_transcription
+    
+    def nbest_ensemble_transcribe(self, audio_file, output_file=None, terms_file=None):
+        """Decode once with N-best output and rescore each utterance with domain terms"""
+        if not os.path.exists(audio_file):
+            print(f"✗ Error: Audio file '{audio_file}' not found.")
+            return None
+        
+        print(f"🎵 N-best transcribing: {audio_file}")
+        model = self.get_model(LARGE_MODEL)
+        if model is None:
+            print(f"✗ Error: N-best mode needs {LARGE_MODEL}")
+            return None
+        
+        extra_terms = None
+        if terms_file:
+            with open(terms_file, 'r', encoding='utf-8') as f:
+                extra_terms = [line.strip() for line in f if line.strip()]
+        terms = build_terms(CORRECTIONS, extra_terms)
+        
+        start_time = time.time()
+        try:
+            decoder = open_decoder(audio_file, 16000)
+            text, stats = nbest_transcribe(model, decoder, terms)
+        except Exception as e:
+            print(f"✗ Error during transcription: {e}")
+            return None
+        
+        if decoder.close() != 0:
+            print("✗ Error: ffmpeg failed to process the audio file.")
+            return None
+        print(decoder_report(decoder))
+        
+        print(f"🔀 Rescored {stats['utterances']} utterances with {len(terms)} terms, "
+              f"{stats['changed']} changed; 1 decode in {time.time() - start_time:.1f}s")
+        
+        improved_transcription = self.post_process_transcription({'text': text})
+        if not improved_transcription:
+            print("⚠️  No speech detected in the audio file.")
+            return None
+        
+        print("\n" + "="*80)
+        print("📝 N-BEST TRANSCRIPTION RESULT")
+        print("="*80)
+        print(improved_transcription)
+        print("="*80)
+        
+        if output_file:
+            with METRICS.time("write_output"), open(output_file, 'w', encoding='utf-8') as f:
+                f.write(improved_transcription)
+            print(f"\n💾 N-best transcription saved to: {output_file}")
+        
+        return improved_transcription
+    
+    def create_audio_variations(self, input_file, always_denoise=False):
         """Create audio variations for better recognition"""
         variations = []
         base_name = os.path.splitext(input_file)[0]
@@ -114,11 +402,14 @@ class EnsembleAudioTranscriber:
             var2
         ]
         
-        # Variation 3: Noise reduction
+        # Variation 3: Noise reduction, when the recording is noisy enough to need it
+        denoise_chain = "anlmdn=s=7:p=0.002:r=0.01,highpass=f=300,lowpass=f=2800,volume=1.3"
+        if not always_denoise:
+            denoise_chain = adapt_filter_chain(input_file, denoise_chain)
         var3 = f"{base_name}_var3.wav"
         cmd3 = [
             "ffmpeg", "-y", "-i", input_file,
-            "-af", "anlmdn=s=7:p=0.002:r=0.01,highpass=f=300,lowpass=f=2800,volume=1.3",
+            "-af", denoise_chain,
             "-ar", "16000", "-ac", "1", "-acodec", "pcm_s16le",
             var3
         ]
@@ -139,92 +430,83 @@ class EnsembleAudioTranscriber:
         
         return variations
     
-    def transcribe_with_model(self, audio_file, model_name, model):
-        """Transcribe audio with a specific model"""
+    def transcribe_with_model(self, audio_file, model_name, model, skip_silence=False, stop_event=None):
+        """Transcribe audio with a specific model, giving up once stop_event is set"""
         try:
-            process = subprocess.Popen([
-                "ffmpeg", "-loglevel", "quiet", "-i", audio_file,
-                "-ar", "16000", "-ac", "1", "-f", "s16le", "-"
-            ], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            decoder = open_decoder(audio_file, 16000)
             
             rec = KaldiRecognizer(model, 16000)
             rec.SetWords(True)
             
-            transcription_parts = []
-            
-            while True:
-                data = process.stdout.read(4000)
-                if len(data) == 0:
-                    break
-                
-                if rec.AcceptWaveform(data):
-                    result = rec.Result()
-                    if result.strip():
-                        transcription_parts.append(result)
-            
-            final_result = rec.FinalResult()
-            if final_result.strip():
-                transcription_parts.append(final_result)
+            stream = decoder
+            if stop_event is not None:
+                stream = StoppableReader(stream, stop_event)
             
-            process.wait()
+            skipper = SilenceSkipper(16000) if skip_silence else None
+            transcription_parts = recognize_stream(rec, stream, skipper)
             
-            if process.returncode != 0:
+            if stop_event is not None and stop_event.is_set():
+                decoder.kill()
                 return None
             
-            # Combine transcription parts
-            full_transcription = ""
-            for part in transcription_parts:
-                try:
-                    json_result = json.loads(part)
-                    if 'text' in json_result and json_result['text'].strip():
-                        full_transcription += json_result['text'] + " "
-                except json.JSONDecodeError:
-                    continue
+            if decoder.close() != 0:
+                return None
             
-            return full_transcription.strip()
+            return combine_text(transcription_parts)
             
         except Exception as e:
             print(f"⚠️  Error with model {model_name}: {e}")
             return None
     
-    def ensemble_transcribe(self, audio_file, output_file=None):
-        """Perform ensemble transcription using multiple models and audio variations"""
+    def ensemble_transcribe(self, audio_file, output_file=None, skip_silence=False, agreement=None,
+                            prescan=False, always_denoise=False, memory_budget=None):
+        """Perform ensemble transcription using multiple models and audio variations
+
+        With agreement set, decodes stop as soon as two hypotheses agree on
+        that share of their words instead of running every combination.
+        With prescan, sampled windows pick one variation to decode in full.
+        Work is ordered model by model; models are only resident together
+        when they fit in memory_budget bytes (default: available memory).
+        """
         if not os.path.exists(audio_file):
             print(f"✗ Error: Audio file '{audio_file}' not found.")
             return None
         
         print(f"🎵 Ensemble transcribing: {audio_file}")
-        print(f"🔧 Using {len(self.models)} models")
+        print(f"🔧 Using up to {len(self.models)} models, loaded on demand")
         
         # Create audio variations
         print("🎛️  Creating audio variations...")
-        variations = self.create_audio_variations(audio_file)
+        variations = self.create_audio_variations(audio_file, always_denoise)
         if not variations:
             variations = [audio_file]  # Fallback to original
         
         # Add original file to variations
         if audio_file not in variations:
             variations.append(audio_file)
+        created_files = list(variations)
+        
+        if prescan:
+            variations = self.prescan_variations(audio_file, variations)
         
+        waves, budget = self.residency_plan(memory_budget)
         all_transcriptions = []
         
-        # Transcribe with each model and variation
-        for model_name, model in self.models.items():
-            print(f"\n🔍 Using model: {model_name}")
+        if agreement is None:
+            # Transcribe with each model and variation, one wave of models at a time
+            def run(models):
+                return self.decode_variations(models, variations, skip_silence)
             
-            for i, variation in enumerate(variations):
-                print(f"  📝 Processing variation {i+1}/{len(variations)}...")
-                
-                transcription = self.transcribe_with_model(variation, model_name, model)
-                if transcription:
-                    all_transcriptions.append({
-                        'model': model_name,
-                        'variation': i+1,
-                        'text': transcription
-                    })
-                    print(f"    ✅ Got transcription ({len(transcription)} chars)")
-                else:
-                    print(f"    ⚠️  No transcription")
+            loaded_any = False
+            for wave in waves:
+                transcriptions = self.run_wave(wave, run)
+                if transcriptions is not None:
+                    loaded_any = True
+                    all_transcriptions.extend(transcriptions)
+            if not loaded_any:
+                all_transcriptions = self.run_wave(self.default_wave(), run) or []
+        else:
+            all_transcriptions = self.transcribe_until_agreement(variations, agreement, skip_silence, waves)
         
         if not all_transcriptions:
             print("✗ Error: No transcriptions generated")
@@ -248,19 +530,21 @@ class EnsembleAudioTranscriber:
         
         # Show ensemble statistics
         print(f"\n📊 ENSEMBLE STATISTICS:")
-        print(f"- Models used: {len(self.models)}")
+        print(f"- Models used: {len({t['model'] for t in all_transcriptions})}")
         print(f"- Audio variations: {len(variations)}")
         print(f"- Total transcriptions: {len(all_transcriptions)}")
         print(f"- Best model: {best_transcription.get('model', 'unknown')}")
+        print(f"- Peak RSS: {peak_rss() / 1e6:.0f} MB"
+              + (f" (budget {budget / 1e6:.0f} MB)" if budget is not None else ""))
         
         # Save to file if requested
         if output_file:
-            with open(output_file, 'w', encoding='utf-8') as f:
+            with METRICS.time("write_output"), open(output_file, 'w', encoding='utf-8') as f:
                 f.write(improved_transcription)
             print(f"\n💾 Ensemble transcription saved to: {output_file}")
         
         # Clean up variation files
-        for variation in variations:
+        for variation in created_files:
             if variation != audio_file and os.path.exists(variation):
                 try:
                     os.remove(variation)
@@ -269,6 +553,84 @@ class EnsembleAudioTranscriber:
         
         return improved_transcription
     
+    def prescan_variations(self, audio_file, variations):
+        """Keep only the variation whose sampled windows decode most confidently"""
+        model_name = next(iter(self.models))
+        model = self.get_model(model_name)
+        if model is None:
+            print(f"⚠️  Pre-scan model {model_name} unavailable, decoding every variation")
+            return variations
+        print(f"🔬 Pre-scanning {len(variations)} variations with {model_name}...")
+        
+        start_time = time.time()
+        try:
+            best, scores = select_variant(model, variations, probe_duration(audio_file))
+        except Exception as e:
+            print(f"⚠️  Pre-scan failed ({e}), decoding every variation")
+            return variations
+        
+        if best is None:
+            print("   Recording too short to sample, decoding every variation")
+            return variations
+        
+        for i, variation in enumerate(variations):
+            marker = " ⭐" if variation == best else ""
+            print(f"   Variation {i+1}: mean confidence {scores[variation]:.3f}{marker}")
+        print(f"   Pre-scan took {time.time() - start_time:.1f}s, "
+              f"skipping {len(variations) - 1} full-length decodes per model")
+        return [best]
+    
+    def transcribe_until_agreement(self, variations, agreement, skip_silence=False, waves=None):
+        """Run model × variation jobs in priority order until two hypotheses agree
+
+        Jobs run one wave of resident models at a time (default: every
+        model in one wave); a later wave stops early too once it agrees
+        with a hypothesis from an earlier one.
+        """
+        if waves is None:
+            waves = [list(self.models)]
+        
+        def run_job(job, stop_event):
+            model_name, i, variation = job
+            # Models load when their first job runs, not when a decode
+            # that an early agreement cancels would have needed them
+            model = self.get_model(model_name)
+            if model is None or stop_event.is_set():
+                return None
+            print(f"  📝 {model_name} on variation {i+1}/{len(variations)}...")
+            return self.transcribe_with_model(variation, model_name, model, skip_silence, stop_event)
+        
+        finished, best_agreement = [], 0.0
+        for wave in waves:
+            if best_agreement >= agreement:
+                break
+            if all(model_name in self.unavailable for model_name in wave):
+                continue
+            # Variation-major order, so the first decodes compare different
+            # models on the same audio
+            jobs = [(model_name, i, variation)
+                    for i, variation in enumerate(variations)
+                    for model_name in wave]
+            try:
+                wave_finished, wave_agreement = run_until_agreement(jobs, run_job, agreement,
+                                                                    earlier=finished)
+            finally:
+                for model_name in wave:
+                    self.models[model_name].release()
+            finished.extend(wave_finished)
+            best_agreement = max(best_agreement, wave_agreement)
+        
+        if (not finished and "default" not in self.models
+                and all(model_name in self.unavailable for wave in waves for model_name in wave)):
+            return self.transcribe_until_agreement(variations, agreement, skip_silence, [self.default_wave()])
+        
+        print(f"🤝 {len(finished)} decodes of {len(self.models)} models × {len(variations)} variations, "
+              f"best agreement {best_agreement:.1%}"
+              + (" - stopped early" if best_agreement >= agreement else ""))
+        
+        return [{'model': model_name, 'variation': i+1, 'text': text}
+                for (model_name, i, _), text in finished]
+    
     def select_best_transcription(self, transcriptions):
         """Select the best transcription from multiple results"""
         if not transcriptions:
@@ -311,6 +673,7 @@ class EnsembleAudioTranscriber:
         scored_transcriptions.sort(reverse=True)
         return scored_transcriptions[0][1]
     
+    @METRICS.timed("postprocess")
     def post_process_transcription(self, transcription_data):
         """Post-process the best transcription"""
         if not transcription_data or 'text' not in transcription_data:
@@ -321,103 +684,8 @@ class EnsembleAudioTranscriber:
         # Remove extra whitespace
         text = re.sub(r'\s+', ' ', text).strip()
         
-        # Common corrections for interview context
-        corrections = {
-            'yeah yeah': 'yes, yes',
-            'uh huh': 'uh-huh',
-            'i think': 'I think',
-            'i would': 'I would',
-            'i will': 'I will',
-            'i am': 'I am',
-            'i have': 'I have',
-            'i do': 'I do',
-            'i can': 'I can',
-            'python py': 'Python, Py',
-            'py spark': 'PySpark',
-            'sql': 'SQL',
-            'tableau': 'Tableau',
-            'synchrony': 'Synchrony',
-            'discover': 'Discover',
-            'paypal': 'PayPal',
-            'credit risk': 'credit risk',
-            'modeling': 'modeling',
-            'analytics': 'analytics',
-            'dashboard': 'dashboard',
-            'probability': 'probability',
-            'exposure': 'exposure',
-            'sponsorship': 'sponsorship',
-            'interview': 'interview',
-            'position': 'position',
-            'experience': 'experience',
-            'technical': 'technical',
-            'methodology': 'methodology',
-            'leadership': 'leadership',
-            'operations': 'operations',
-            'strategy': 'strategy',
-            'industry': 'industry',
-            'finance': 'finance',
-            'banking': 'banking',
-            'analytical': 'analytical',
-            'insights': 'insights',
-            'managers': 'managers',
-            'leaders': 'leaders',
-            'decision': 'decision',
-            'development': 'development',
-            'current': 'current',
-            'previous': 'previous',
-            'building': 'building',
-            'delivering': 'delivering',
-            'reports': 'reports',
-            'regarding': 'regarding',
-            'analysis': 'analysis',
-            'potential': 'potential',
-            'similar': 'similar',
-            'based': 'based',
-            'role': 'role',
-            'there': 'there',
-            'currently': 'currently',
-            'one': 'one',
-            'first year': 'first year',
-            'market': 'market',
-            'ranges': 'ranges',
-            'salary': 'salary',
-            'hundred': 'hundred',
-            'thousand': 'thousand',
-            'thirty': 'thirty',
-            'five': 'five',
-            'above': 'above',
-            'further': 'further',
-            'talk': 'talk',
-            'about': 'about',
-            'interviewing': 'interviewing',
-            'company': 'company',
-            'second round': 'second round',
-            'coding': 'coding',
-            'available': 'available',
-            'march': 'March',
-            'six': 'six',
-            'seven': 'seven',
-            'eleven': 'eleven',
-            'twelve': 'twelve',
-            'four': 'four',
-            'pm': 'PM',
-            'am': 'AM',
-            'cst': 'CST',
-            'preferred': 'preferred',
-            'time': 'time',
-            'entire': 'entire',
-            'day': 'day',
-            'backfill': 'backfill',
-            'expansion': 'expansion',
-            'follow up': 'follow up',
-            'question': 'question',
-            'manager': 'manager',
-            'accommodating': 'accommodating',
-            'thank you': 'thank you',
-        }
-        
         # Apply corrections
-        for wrong, correct in corrections.items():
+        for wrong, correct in CORRECTIONS.items():
             text = re.sub(r'\b' + re.escape(wrong) + r'\b', correct, text, flags=re.IGNORECASE)
         
         # Capitalize sentences
@@ -442,18 +710,59 @@ def main():
     
     if len(sys.argv) < 2:
         print("Usage:")
-        print("  python3 ensemble_transcriber.py <audio_file> [output_file]")
+        print("  python3 ensemble_transcriber.py <audio_file> [output_file] [--skip-silence] [--cascade [--threshold T]] [--nbest [--terms FILE]] [--agreement [T]] [--prescan] [--always-denoise] [--memory-budget SIZE] [--metrics FILE]")
         print("\nThis tool uses multiple models and audio variations for maximum accuracy.")
         print("\nExamples:")
         print("  python3 ensemble_transcriber.py 'audio.m4a'")
         print("  python3 ensemble_transcriber.py 'audio.m4a' 'ensemble_transcript.txt'")
+        print("  python3 ensemble_transcriber.py 'audio.m4a' --agreement 0.9")
+        print("  python3 ensemble_transcriber.py 'audio.m4a' --memory-budget 3.5G")
+        print("  python3 ensemble_transcriber.py 'audio.m4a' --cascade")
+        print("  python3 ensemble_transcriber.py 'audio.m4a' --nbest --terms 'terms.txt'")
         sys.exit(1)
     
-    audio_file = sys.argv[1]
-    output_file = sys.argv[2] if len(sys.argv) > 2 else None
+    parser = argparse.ArgumentParser(description="Ensemble Audio Transcription Tool")
+    parser.add_argument("audio_file")
+    parser.add_argument("output_file", nargs="?")
+    parser.add_argument("--skip-silence", action="store_true",
+                        help="drop long silences before the recognizer")
+    parser.add_argument("--cascade", action="store_true",
+                        help="small model first, re-decode low-confidence utterances with the large model")
+    parser.add_argument("--threshold", type=float, default=CONF_THRESHOLD,
+                        help="mean word confidence below which --cascade re-decodes an utterance")
+    parser.add_argument("--nbest", action="store_true",
+                        help="decode once with N-best alternatives and rescore them with domain terms")
+    parser.add_argument("--terms", default=None,
+                        help="file with one domain term per line for --nbest")
+    parser.add_argument("--agreement", type=float, nargs="?", const=AGREEMENT_THRESHOLD, default=None,
+                        help="stop decoding once two hypotheses share this fraction of words "
+                             f"(default {AGREEMENT_THRESHOLD})")
+    parser.add_argument("--prescan", action="store_true",
+                        help="score variations on short sampled windows and fully decode only the best")
+    parser.add_argument("--always-denoise", action="store_true",
+                        help="run the anlmdn denoiser even when the recording looks clean")
+    parser.add_argument("--memory-budget", type=parse_size, default=None,
+                        help="memory the resident models may use, e.g. 3.5G; models that do not fit "
+                             "together are loaded one after another (default: available memory)")
+    parser.add_argument("--metrics", default=None,
+                        help="write per-stage latency histograms to this file on exit, "
+                             "as JSON for a .json name and Prometheus text otherwise")
+    args = parser.parse_args()
+    METRICS.export_at_exit(args.metrics)
+    
+    if args.nbest:
+        transcriber = EnsembleAudioTranscriber(load_all=False)
+        transcriber.nbest_ensemble_transcribe(args.audio_file, args.output_file, args.terms)
+        return
+    
+    if args.cascade:
+        transcriber = EnsembleAudioTranscriber(load_all=False)
+        transcriber.cascade_transcribe(args.audio_file, args.output_file, args.threshold)
+        return
     
     transcriber = EnsembleAudioTranscriber()
-    transcriber.ensemble_transcribe(audio_file, output_file)
+    transcriber.ensemble_transcribe(args.audio_file, args.output_file, args.skip_silence, args.agreement,
+                                    args.prescan, args.always_denoise, args.memory_budget)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Parallel transcription of long recordings.
+
+The file is decoded once, split at silence boundaries found by the energy
+VAD and the segments are decoded concurrently, each on its own recognizer.
+Vosk releases the GIL inside native calls, so threads are enough to keep
+every core busy.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from vosk import KaldiRecognizer
+
+from audio_io import SAMPLE_RATE, decode_to_array, time_window
+from audio_vad import SilenceSkipper, find_split_points
+from model_warmup import resolve_model
+from recognition import accept_waveform, parse_result
+
+CHUNK_SAMPLES = 2000  # Same 4000-byte chunks as the streaming loops
+OVERLAP_SECONDS = 1.0  # Extra context decoded around cuts made mid-speech
+
+
+def plan_segments(n_samples, points, sample_rate=SAMPLE_RATE):
+    """Turn split points into (decode_start, decode_end, keep_start, keep_end) tuples
+
+    Segments cut inside speech are decoded with OVERLAP_SECONDS of extra
+    audio on that side; only words whose midpoint falls in the keep range
+    are reported, so words decoded twice in the overlap are dropped.
+    """
+    overlap = int(OVERLAP_SECONDS * sample_rate)
+    bounds = [(0, True)] + list(points) + [(n_samples, True)]
+    segments = []
+
+    for (start, start_clean), (end, end_clean) in zip(bounds, bounds[1:]):
+        decode_start = start if start_clean else max(0, start - overlap)
+        decode_end = end if end_clean else min(n_samples, end + overlap)
+        segments.append((decode_start, decode_end, start, end))
+
+    return segments
+
+
+def decode_segment(model, samples, segment, sample_rate=SAMPLE_RATE, skip_silence=False,
+                   time_offset=0.0):
+    """Decode one segment and return its results in absolute file time
+
+    time_offset is where samples starts in the file, in seconds.
+    """
+    decode_start, decode_end, keep_start, keep_end = segment
+    offset = time_offset + decode_start / sample_rate
+
+    rec = KaldiRecognizer(model, sample_rate)
+    rec.SetWords(True)
+    skipper = SilenceSkipper(sample_rate) if skip_silence else None
+
+    results = []
+    for pos in range(decode_start, decode_end, CHUNK_SAMPLES):
+        data = samples[pos:min(pos + CHUNK_SAMPLES, decode_end)].tobytes()
+        if skipper is not None:
+            data = skipper.process(data)
+        if len(data) > 0 and accept_waveform(rec, data):
+            results.append(parse_result(rec.Result))
+    if skipper is not None:
+        data = skipper.flush()
+        if len(data) > 0 and accept_waveform(rec, data):
+            results.append(parse_result(rec.Result))
+    results.append(parse_result(rec.FinalResult))
+
+    if skipper is not None:
+        results = [skipper.restore_times(res) for res in results]
+
+    return [shift_result(res, offset, time_offset + keep_start / sample_rate,
+                         time_offset + keep_end / sample_rate)
+            for res in results]
+
+
+def shift_result(result, offset, keep_from, keep_to):
+    """Offset word timestamps and drop words outside [keep_from, keep_to)"""
+    words = []
+    for word in result.get("result", []):
+        word = dict(word, start=word["start"] + offset, end=word["end"] + offset)
+        if keep_from <= (word["start"] + word["end"]) / 2 < keep_to:
+            words.append(word)
+    return {"result": words, "text": " ".join(w["word"] for w in words)}
+
+
+def stitch_results(segment_results):
+    """Concatenate per-segment results in order, dropping emptied utterances"""
+    return [res for results in segment_results for res in results if res["text"]]
+
+
+def transcribe_long_file(model, audio_file_path, workers=None, segment_seconds=300,
+                         sample_rate=SAMPLE_RATE, skip_silence=False, start=None, end=None):
+    """Transcribe a long file on several cores, returning Vosk-style results
+
+    start and end (seconds) limit it to part of the file; word times stay
+    in file time. model may be a ModelLoader, waited for once the audio
+    is decoded and split.
+    """
+    start, duration = time_window(start, end)
+    samples = decode_to_array(audio_file_path, sample_rate, start=start, duration=duration)
+    points = find_split_points(samples, sample_rate, segment_seconds)
+    segments = plan_segments(len(samples), points, sample_rate)
+    workers = workers or os.cpu_count() or 1
+    model = resolve_model(model)
+
+    print(f"⚡ Decoding {len(segments)} segments on {min(workers, len(segments))} workers")
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        segment_results = list(pool.map(
+            lambda segment: decode_segment(model, samples, segment, sample_rate, skip_silence,
+                                           start or 0.0),
+            segments))
+
+    return stitch_results(segment_results)
+
+
+def results_text(results):
+    """Join result texts the way the streaming loops do"""
+    return " ".join(res["text"] for res in results if res["text"].strip())
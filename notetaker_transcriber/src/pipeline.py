@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Staged processing of many files.
+
+Each stage (probe, decode/filter, recognize, format, write) runs on its own
+threads and hands items to the next through a bounded queue. Decoding file
+N+1 and writing file N-1 then overlap recognition of file N, and the queue
+bounds keep only a few decoded files in memory.
+"""
+
+import threading
+import time
+from queue import Queue
+
+_DONE = object()
+
+
+class Stage:
+    """One step of a Pipeline with its own worker threads
+
+    func(item) returns the item for the next stage, or None to drop it.
+    discard(item), if given, releases an item that an aborted run drops
+    before func has seen it.
+    """
+
+    def __init__(self, name, func, workers=1, discard=None):
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.discard = discard
+        self.items = 0
+        self.failed = 0
+        self.busy = 0.0
+        self.starved = 0.0  # Waiting for input from the stage before
+        self.blocked = 0.0  # Waiting for room in the queue after
+        self.lock = threading.Lock()
+
+    def account(self, busy, starved, blocked, items, failed):
+        with self.lock:
+            self.busy += busy
+            self.starved += starved
+            self.blocked += blocked
+            self.items += items
+            self.failed += failed
+
+
+class Pipeline:
+    """Stages connected by queues of depth items
+
+    An exception from a stage only drops that item. Anything else raised,
+    such as SystemExit or KeyboardInterrupt, aborts the run: the stages
+    drain their queues without processing and run() re-raises it.
+    """
+
+    def __init__(self, stages, depth=2):
+        self.stages = stages
+        self.depth = depth
+        self.wall_time = 0.0
+        self.error = None
+
+    def worker(self, stage, inbox, outbox):
+        busy = starved = blocked = 0.0
+        items = failed = 0
+        while True:
+            wait_start = time.time()
+            item = inbox.get()
+            starved += time.time() - wait_start
+            if item is _DONE:
+                break
+            if self.error is not None:
+                # Keep draining, so nothing upstream blocks on a full queue
+                if stage.discard is not None:
+                    stage.discard(item)
+                continue
+
+            start_time = time.time()
+            try:
+                item = stage.func(item)
+            except Exception as e:
+                print(f"⚠️  {stage.name} failed: {e}")
+                item = None
+                failed += 1
+            except BaseException as e:
+                # A dead worker would leave the stages around it waiting forever
+                self.error = e
+                item = None
+                failed += 1
+            busy += time.time() - start_time
+            items += 1
+
+            if item is not None and outbox is not None:
+                put_start = time.time()
+                outbox.put(item)
+                blocked += time.time() - put_start
+        stage.account(busy, starved, blocked, items, failed)
+
+    def run(self, items):
+        """Push items through every stage, returning once the last one is done"""
+        self.error = None
+        queues = [Queue(maxsize=self.depth) for _ in self.stages]
+        groups = []
+        for k, stage in enumerate(self.stages):
+            outbox = queues[k + 1] if k + 1 < len(queues) else None
+            threads = [threading.Thread(target=self.worker, args=(stage, queues[k], outbox), daemon=True)
+                       for _ in range(stage.workers)]
+            for thread in threads:
+                thread.start()
+            groups.append(threads)
+
+        start_time = time.time()
+        for item in items:
+            if self.error is not None:
+                break
+            queues[0].put(item)
+        # Stop the stages in order, each only after the one before has
+        # handed over everything
+        for inbox, threads in zip(queues, groups):
+            for _ in threads:
+                inbox.put(_DONE)
+            for thread in threads:
+                thread.join()
+        self.wall_time = time.time() - start_time
+        if self.error is not None:
+            raise self.error
+        return self.wall_time
+
+    def report(self):
+        lines = [f"🏭 Pipeline: {self.wall_time:.1f}s wall time"]
+        for stage in self.stages:
+            utilization = stage.busy / (stage.workers * max(self.wall_time, 1e-9))
+            lines.append(f"   {stage.name:<10} {stage.items:>4} items, {stage.workers} workers, "
+                         f"utilization {utilization:.0%}, starved {stage.starved:.1f}s, "
+                         f"blocked {stage.blocked:.1f}s"
+                         + (f", {stage.failed} failed" if stage.failed else ""))
+        return "\n".join(lines)
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+The streaming recognition loop shared by the transcribers.
+"""
+
+import json
+import time
+
+from metrics import METRICS
+
+CHUNK_SIZE = 4000
+
+
+def accept_waveform(rec, data):
+    """rec.AcceptWaveform(data), timed into METRICS when it is enabled"""
+    if not METRICS.enabled:
+        return rec.AcceptWaveform(data)
+    start_time = time.perf_counter()
+    accepted = rec.AcceptWaveform(data)
+    METRICS.observe("accept_waveform", time.perf_counter() - start_time)
+    return accepted
+
+
+def parse_result(get_result):
+    """json.loads(get_result()) for rec.Result or rec.FinalResult, timed likewise"""
+    if not METRICS.enabled:
+        return json.loads(get_result())
+    start_time = time.perf_counter()
+    result = json.loads(get_result())
+    METRICS.observe("result", time.perf_counter() - start_time)
+    return result
+
+
+def recognize_stream(rec, stream, skipper=None, chunk_size=CHUNK_SIZE, filters=None,
+                     checkpoint=None, time_offset=0.0, clock=None):
+    """Feed a PCM stream to a recognizer and return the raw JSON results
+
+    With a SilenceSkipper, long silences are dropped before the recognizer
+    and word times in the results are mapped back to the original audio.
+    filters is an optional dsp_filters.FilterChain applied to every chunk.
+    With a checkpoint.Checkpoint, every finished utterance is recorded
+    with the offset reached; the stream must start at checkpoint.start_time.
+    time_offset (seconds) is added to word times, for streams that begin
+    partway into a file. clock (model_warmup.FirstResultClock) is marked
+    at the first result.
+    """
+    transcription_parts = []
+    decode_time = 0.0
+    read_samples = 0
+    timed = METRICS.enabled
+
+    def collect(get_result):
+        """Fetch a result with get_result (rec.Result or rec.FinalResult) and keep it"""
+        fetch_start = time.perf_counter() if timed else 0.0
+        result = get_result()
+        if not result.strip():
+            return
+        if clock is not None:
+            clock.mark()
+        if skipper is not None or checkpoint is not None or time_offset:
+            parsed = json.loads(result)
+            if skipper is not None:
+                parsed = skipper.restore_times(parsed)
+            for word in parsed.get("result", []):
+                word["start"] += time_offset
+                word["end"] += time_offset
+            if checkpoint is not None:
+                parsed = checkpoint.restore_times(parsed)
+            result = json.dumps(parsed)
+        if timed:
+            METRICS.observe("result", time.perf_counter() - fetch_start)
+        transcription_parts.append(result)
+        if checkpoint is not None:
+            covered = skipper.covered_samples() if skipper is not None else read_samples
+            checkpoint.update(checkpoint.resumed_at + covered, result)
+
+    while True:
+        data = stream.read(chunk_size)
+        if len(data) == 0:
+            break
+        read_samples += len(data) // 2
+
+        if filters is not None:
+            data = filters.process(data)
+
+        if skipper is not None:
+            data = skipper.process(data)
+            if len(data) == 0:
+                continue
+
+        decode_start = time.perf_counter()
+        accepted = rec.AcceptWaveform(data)
+        elapsed = time.perf_counter() - decode_start
+        decode_time += elapsed
+        if timed:
+            METRICS.observe("accept_waveform", elapsed)
+        if accepted:
+            collect(rec.Result)
+
+    if filters is not None:
+        data = filters.flush()
+        if skipper is not None:
+            data = skipper.process(data)
+        if len(data) > 0 and rec.AcceptWaveform(data):
+            collect(rec.Result)
+
+    if skipper is not None:
+        data = skipper.flush()
+        if len(data) > 0 and rec.AcceptWaveform(data):
+            collect(rec.Result)
+
+    collect(rec.FinalResult)
+
+    if skipper is not None:
+        print(skipper.report(decode_time))
+
+    return transcription_parts
+
+
+def combine_text(transcription_parts):
+    """Join the text of all results into one transcription"""
+    full_transcription = ""
+    for part in transcription_parts:
+        try:
+            json_result = json.loads(part)
+            if 'text' in json_result and json_result['text'].strip():
+                full_transcription += json_result['text'] + " "
+        except json.JSONDecodeError:
+            continue
+
+    return full_transcription.strip()
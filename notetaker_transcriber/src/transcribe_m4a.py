@@ -1,13 +1,42 @@
 #!/usr/bin/env python3
 
-import subprocess
 import sys
-import json
 import os
-from vosk import Model, KaldiRecognizer, SetLogLevel
+import time
+import argparse
+from vosk import KaldiRecognizer, SetLogLevel
+from long_file import transcribe_long_file, results_text
+from audio_vad import SilenceSkipper
+from recognition import recognize_stream, combine_text
+from audio_io import open_decoder, decoder_report, probe_sample_rate, choose_sample_rate, ReadAhead
+from audio_io import parse_time, time_window
+from channels import transcribe_channels, channel_transcript
+from checkpoint import Checkpoint, CHECKPOINT_SUFFIX
+from model_warmup import load_model, ModelLoader, FirstResultClock
+from metrics import METRICS
 
-def transcribe_audio(audio_file_path, output_file=None):
-    """Transcribe an audio file using Vosk"""
+def transcribe_audio(audio_file_path, output_file=None, long_file=False, workers=None,
+                     skip_silence=False, native_rate=False, split_channels=False, labels=None,
+                     resumable=False, start=None, end=None, warm_up=False):
+    """Transcribe an audio file using Vosk
+
+    With long_file=True the file is split at silences and the segments are
+    decoded in parallel on `workers` threads (default: one per core).
+    With skip_silence=True long silent stretches never reach the recognizer.
+    With native_rate=True audio at or above the model rate is not
+    resampled before the recognizer, which downsamples it itself.
+    With split_channels=True every channel is recognized on its own and
+    the transcript is labelled by channel (labels, default "Channel N").
+    With resumable=True progress is checkpointed to a sidecar file and a
+    rerun after a crash continues from the last checkpoint.
+    start and end (seconds) transcribe only that part of the file; only
+    that part is decoded and word times stay in file time.
+    With warm_up=True the model files are prefetched into the page cache
+    and the model decodes silence before the file, reporting cold vs warm
+    first-result latency.
+    The model loads in the background while the file is probed and
+    decoded; recognition starts as soon as it is ready.
+    """
     
     if not os.path.exists(audio_file_path):
         print(f"Error: Audio file '{audio_file_path}' not found.")
@@ -16,61 +45,76 @@ def transcribe_audio(audio_file_path, output_file=None):
     # Initialize Vosk
     SetLogLevel(-1)
     
-    try:
-        model = Model(lang="en-us")
-    except Exception as e:
-        print(f"Error loading model: {e}")
-        return
+    def load():
+        try:
+            model, load_report = load_model(lang="en-us", warm_up=warm_up)
+        except Exception as e:
+            raise RuntimeError(f"loading the model failed: {e}") from e
+        print(load_report)
+        return model
+    
+    loader = ModelLoader(load)
     
     # Set up recognizer
-    SAMPLE_RATE = 16000
-    rec = KaldiRecognizer(model, SAMPLE_RATE)
-    rec.SetWords(True)
+    MODEL_RATE = 16000
+    source_rate = probe_sample_rate(audio_file_path) if native_rate else None
+    SAMPLE_RATE = choose_sample_rate(source_rate, MODEL_RATE, native_rate)
     
     print(f"Transcribing: {audio_file_path}")
     
+    checkpoint = None
     try:
-        process = subprocess.Popen([
-            "ffmpeg", "-loglevel", "quiet", "-i", audio_file_path,
-            "-ar", str(SAMPLE_RATE), "-ac", "1", "-f", "s16le", "-"
-        ], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        
-        transcription_parts = []
-        
-        while True:
-            data = process.stdout.read(4000)
-            if len(data) == 0:
-                break
+        window_start, duration = time_window(start, end)
+        if split_channels:
+            utterances = transcribe_channels(loader, audio_file_path, labels=labels,
+                                             skip_silence=skip_silence, start=start, end=end)
+            full_transcription = channel_transcript(utterances)
+        elif long_file:
+            results = transcribe_long_file(loader, audio_file_path, workers,
+                                           skip_silence=skip_silence, start=start, end=end)
+            full_transcription = results_text(results)
+        else:
+            start_time = time.time()
+            resume_at = 0.0
+            if resumable:
+                checkpoint = Checkpoint(audio_file_path, SAMPLE_RATE,
+                                        output_file + CHECKPOINT_SUFFIX if output_file else None,
+                                        window=(start, end))
+                if checkpoint.load():
+                    resume_at = checkpoint.start_time
+                    print(f"Resuming at {(window_start or 0) + resume_at:.1f}s from {checkpoint.path}")
+            earlier_parts = list(checkpoint.results) if checkpoint is not None else []
+            # Decoding runs ahead into a bounded buffer while the model loads
+            decoder = ReadAhead(open_decoder(audio_file_path, SAMPLE_RATE,
+                                             (window_start or 0) + resume_at or None,
+                                             duration - resume_at if duration is not None else None))
             
-            if rec.AcceptWaveform(data):
-                result = rec.Result()
-                if result.strip():
-                    transcription_parts.append(result)
-        
-        final_result = rec.FinalResult()
-        if final_result.strip():
-            transcription_parts.append(final_result)
+            rec = KaldiRecognizer(loader.result(), SAMPLE_RATE)
+            rec.SetWords(True)
         
-        process.wait()
-        
-        if process.returncode != 0:
-            print("Error: ffmpeg failed to process the audio file.")
-            return
+            skipper = SilenceSkipper(SAMPLE_RATE) if skip_silence else None
+            clock = FirstResultClock(warm_up, loader.start_time)
+            transcription_parts = earlier_parts + recognize_stream(rec, decoder, skipper,
+                                                                   checkpoint=checkpoint,
+                                                                   time_offset=window_start or 0.0,
+                                                                   clock=clock)
         
-        # Combine all transcription parts
-        full_transcription = ""
-        for part in transcription_parts:
-            try:
-                json_result = json.loads(part)
-                if 'text' in json_result and json_result['text'].strip():
-                    full_transcription += json_result['text'] + " "
-            except json.JSONDecodeError:
-                continue
+            if decoder.close() != 0:
+                print("Error: ffmpeg failed to process the audio file.")
+                return
+            elapsed = time.time() - start_time
+            print(decoder_report(decoder))
+            print(f"xRT {elapsed / max(decoder.bytes_read / 2 / SAMPLE_RATE, 1e-9):.3f}")
+            print(clock.report(loader.ready_time))
+            if checkpoint is not None:
+                print(checkpoint.report(elapsed))
         
-        full_transcription = full_transcription.strip()
+            full_transcription = combine_text(transcription_parts)
         
         if not full_transcription:
             print("No speech detected in the audio file.")
+            if checkpoint is not None:
+                checkpoint.remove()
             return
         
         print("\n" + "="*50)
@@ -80,9 +124,11 @@ def transcribe_audio(audio_file_path, output_file=None):
         print("="*50)
         
         if output_file:
-            with open(output_file, 'w', encoding='utf-8') as f:
+            with METRICS.time("write_output"), open(output_file, 'w', encoding='utf-8') as f:
                 f.write(full_transcription)
             print(f"\nTranscription saved to: {output_file}")
+        if checkpoint is not None:
+            checkpoint.remove()
         
         return full_transcription
         
@@ -93,14 +139,45 @@ def transcribe_audio(audio_file_path, output_file=None):
 
 def main():
     if len(sys.argv) < 2:
-        print("Usage: python3 transcribe_m4a.py <audio_file> [output_file]")
+        print("Usage: python3 transcribe_m4a.py <audio_file> [output_file] [--long-file] [--workers N] [--skip-silence] [--native-rate] [--split-channels [--labels A,B]] [--resumable] [--start T] [--end T] [--warm-up] [--metrics FILE]")
         print("Example: python3 transcribe_m4a.py 'sample_audio_1.m4a'")
+        print("         python3 transcribe_m4a.py 'meeting.m4a' 'meeting.txt' --long-file")
+        print("         python3 transcribe_m4a.py 'meeting.m4a' --start 42:00 --end 45:00")
         sys.exit(1)
     
-    audio_file = sys.argv[1]
-    output_file = sys.argv[2] if len(sys.argv) > 2 else None
+    parser = argparse.ArgumentParser(description="Transcribe an audio file using Vosk")
+    parser.add_argument("audio_file")
+    parser.add_argument("output_file", nargs="?")
+    parser.add_argument("--long-file", action="store_true",
+                        help="split at silences and decode segments in parallel")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="parallel segment decoders for --long-file (default: CPU count)")
+    parser.add_argument("--skip-silence", action="store_true",
+                        help="drop long silences before the recognizer")
+    parser.add_argument("--native-rate", action="store_true",
+                        help="keep the source sample rate when the recognizer can take it")
+    parser.add_argument("--split-channels", action="store_true",
+                        help="recognize each channel separately and label the transcript by channel")
+    parser.add_argument("--labels", default=None,
+                        help="comma-separated channel labels for --split-channels, e.g. 'Agent,Customer'")
+    parser.add_argument("--resumable", action="store_true",
+                        help="checkpoint progress so a rerun after a crash continues where it stopped")
+    parser.add_argument("--start", type=parse_time, default=None,
+                        help="transcribe from this time on, in seconds, MM:SS or HH:MM:SS")
+    parser.add_argument("--end", type=parse_time, default=None,
+                        help="stop transcribing at this time, in seconds, MM:SS or HH:MM:SS")
+    parser.add_argument("--warm-up", action="store_true",
+                        help="prefetch the model into the page cache and warm it up before the file")
+    parser.add_argument("--metrics", default=None,
+                        help="write per-stage latency histograms to this file on exit, "
+                             "as JSON for a .json name and Prometheus text otherwise")
+    args = parser.parse_args()
+    METRICS.export_at_exit(args.metrics)
     
-    transcribe_audio(audio_file, output_file)
+    labels = args.labels.split(",") if args.labels else None
+    transcribe_audio(args.audio_file, args.output_file, args.long_file, args.workers,
+                     args.skip_silence, args.native_rate, args.split_channels, labels,
+                     args.resumable, args.start, args.end, args.warm_up)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
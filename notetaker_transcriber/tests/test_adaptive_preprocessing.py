@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Tests for the SNR estimate behind adaptive denoising
+"""
+
+import unittest
+import sys
+import os
+import tempfile
+
+import numpy as np
+import soundfile
+
+# Add src directory to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from audio_vad import estimate_snr
+from adaptive_preprocessing import CLEAN_SNR_DB, without_denoise, analysis_samples, adapt_filter_chain
+
+RATE = 16000
+
+
+def speech_like(seconds, noise_amplitude, seed=0):
+    """Bursts of tone with pauses, over a constant noise bed"""
+    rng = np.random.RandomState(seed)
+    t = np.arange(int(seconds * RATE)) / RATE
+    bursts = (np.sin(2 * np.pi * 0.5 * t) > 0) * 8000 * np.sin(2 * np.pi * 300 * t)
+    return (bursts + rng.randn(len(t)) * noise_amplitude).astype(np.int16)
+
+
+class TestAdaptivePreprocessing(unittest.TestCase):
+    """Test cases for the clean/noisy decision"""
+
+    def test_clean_recording(self):
+        """A quiet noise bed gives an SNR above the denoise threshold"""
+        snr, floor = estimate_snr(speech_like(10, 20), RATE)
+        self.assertGreater(snr, CLEAN_SNR_DB)
+        self.assertLess(floor, -50)
+
+    def test_noisy_recording(self):
+        """A loud noise bed gives an SNR below the threshold"""
+        snr, _ = estimate_snr(speech_like(10, 2000), RATE)
+        self.assertLess(snr, CLEAN_SNR_DB)
+
+    def test_digital_silence_ignored(self):
+        """Zero padding does not make a noisy recording look clean"""
+        samples = np.concatenate([np.zeros(5 * RATE, dtype=np.int16), speech_like(10, 2000)])
+        snr, _ = estimate_snr(samples, RATE)
+        self.assertLess(snr, CLEAN_SNR_DB)
+
+    def test_long_file_sampled(self):
+        """A long file is measured on the sampled windows only"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "clean.wav")
+            soundfile.write(path, speech_like(30, 20), RATE, subtype="PCM_16")
+            samples = analysis_samples(path, count=3, window=2)
+            self.assertEqual(len(samples), 3 * 2 * RATE)
+            self.assertEqual(len(analysis_samples(path, start=20, count=3, window=2)), 10 * RATE)
+            chain = adapt_filter_chain(path, "highpass=f=200,anlmdn=s=7")
+            self.assertEqual(chain, "highpass=f=200")
+
+    def test_without_denoise(self):
+        """Only the anlmdn stage is removed from a chain"""
+        chain = "highpass=f=200,lowpass=f=3000,volume=1.5,anlmdn=s=7:p=0.002:r=0.01"
+        self.assertEqual(without_denoise(chain), "highpass=f=200,lowpass=f=3000,volume=1.5")
+        self.assertEqual(without_denoise("anlmdn=s=7,highpass=f=300"), "highpass=f=300")
+
+
+if __name__ == "__main__":
+    unittest.main()
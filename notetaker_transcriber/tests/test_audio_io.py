@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Tests for the in-process audio decoder
+"""
+
+import unittest
+import sys
+import os
+import tempfile
+
+import numpy as np
+import soundfile
+from scipy.signal import resample_poly
+
+# Add src directory to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from audio_io import StreamingResampler, open_decoder, open_soundfile, probe_duration, map_wav, wav_layout
+from audio_io import probe_sample_rate, choose_sample_rate, parse_time, time_window, decode_to_array
+from audio_io import ReadAhead
+
+
+class TestAudioIO(unittest.TestCase):
+    """Test cases for WAV mapping, soundfile decoding and resampling"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def write_wav(self, name, audio, rate):
+        path = os.path.join(self.tmp.name, name)
+        soundfile.write(path, audio, rate, subtype="PCM_16")
+        return path
+
+    def test_resampler_matches_resample_poly(self):
+        """Block-wise resampling gives the same samples as one resample_poly call"""
+        x = np.random.default_rng(0).standard_normal(44100) * 0.1
+        expected = resample_poly(x, 160, 441)
+        for block in (1, 1000, 100000):
+            resampler = StreamingResampler(44100, 16000)
+            out = np.concatenate([resampler.process(x[i:i + block]) for i in range(0, len(x), block)]
+                                 + [resampler.flush()])
+            np.testing.assert_allclose(out, expected, atol=1e-12)
+
+    def test_plain_wav_passes_through(self):
+        """16 kHz mono int16 comes out byte for byte from either backend"""
+        pcm = np.random.default_rng(1).integers(-3000, 3000, 16000).astype(np.int16)
+        path = self.write_wav("plain.wav", pcm, 16000)
+        for backend, expected in (("auto", "mmap"), ("soundfile", "soundfile")):
+            decoder = open_decoder(path, backend=backend)
+            self.assertEqual(decoder.backend, expected)
+            self.assertEqual(decoder.read(4000) + decoder.read(), pcm.tobytes())
+            self.assertEqual(decoder.close(), 0)
+
+    def test_conforming_wav_mapped_in_place(self):
+        """The data chunk is mapped, not decoded, even with a streamed header"""
+        pcm = np.arange(1000, dtype=np.int16)
+        path = self.write_wav("mapped.wav", pcm, 16000)
+        samples = map_wav(path)
+        self.assertIsInstance(samples, np.memmap)
+        np.testing.assert_array_equal(samples, pcm)
+
+        # Writers that stream to a pipe leave the data size unset
+        with open(path, "r+b") as f:
+            f.seek(wav_layout(path).offset - 4)
+            f.write(b"\xff\xff\xff\xff")
+        np.testing.assert_array_equal(map_wav(path), pcm)
+
+    def test_non_conforming_wav_not_mapped(self):
+        """Stereo, other rates and float WAV go through the decoder"""
+        pcm = np.zeros(1600, dtype=np.int16)
+        self.assertIsNone(map_wav(self.write_wav("stereo.wav", np.stack([pcm, pcm], axis=1), 16000)))
+        self.assertIsNone(map_wav(self.write_wav("8k.wav", pcm, 8000)))
+        path = os.path.join(self.tmp.name, "float.wav")
+        soundfile.write(path, pcm.astype(np.float32), 16000, subtype="FLOAT")
+        self.assertIsNone(wav_layout(path))
+
+    def test_stereo_44k_downmixed_and_resampled(self):
+        """Two channels at 44.1 kHz become one channel at 16 kHz"""
+        t = np.arange(44100) / 44100
+        tone = 0.25 * np.sin(2 * np.pi * 440 * t)
+        path = self.write_wav("stereo.wav", np.stack([tone, tone], axis=1), 44100)
+
+        decoder = open_decoder(path)
+        chunks = [decoder.read(4000) for _ in range(3)]
+        rest = decoder.read()
+        decoder.close()
+        self.assertTrue(all(len(chunk) == 4000 for chunk in chunks))
+        out = np.frombuffer(b"".join(chunks) + rest, dtype=np.int16)
+        self.assertEqual(len(out), 16000)
+        self.assertAlmostEqual(np.max(np.abs(out[1000:-1000])) / 32768, 0.25, delta=0.01)
+
+    def test_window_seeks_in_file(self):
+        """start and duration select the same range ffmpeg -ss/-t would"""
+        pcm = np.arange(32000, dtype=np.int16)
+        path = self.write_wav("ramp.wav", pcm, 16000)
+        for backend in ("auto", "soundfile"):
+            decoder = open_decoder(path, start=0.5, duration=0.25, backend=backend)
+            self.assertEqual(decoder.read(), pcm[8000:12000].tobytes())
+        self.assertAlmostEqual(probe_duration(os.path.join(self.tmp.name, "ramp.wav")), 2.0)
+
+    def test_time_range(self):
+        """Clock times parse to seconds and select the same samples in every path"""
+        self.assertEqual(parse_time("42:00"), 2520.0)
+        self.assertEqual(parse_time("1:02:03.5"), 3723.5)
+        self.assertEqual(time_window(2520.0, 2700.0), (2520.0, 180.0))
+        self.assertEqual(time_window(None, 30.0), (None, 30.0))
+        with self.assertRaises(ValueError):
+            time_window(60.0, 30.0)
+
+        pcm = np.arange(32000, dtype=np.int16)
+        path = self.write_wav("ramp.wav", pcm, 16000)
+        np.testing.assert_array_equal(decode_to_array(path, start=0.5, duration=0.25), pcm[8000:12000])
+        silence = np.zeros(44100, dtype=np.int16)
+        stereo = self.write_wav("stereo44.wav", np.stack([silence, silence], axis=1), 44100)
+        window = decode_to_array(stereo, start=0.5, duration=0.25)
+        self.assertEqual(len(window), 4000)
+
+    def test_read_ahead(self):
+        """Decoding runs ahead into a bounded buffer and reads back unchanged"""
+        pcm = np.random.default_rng(2).integers(-3000, 3000, 16000 * 5).astype(np.int16)
+        path = self.write_wav("ahead.wav", pcm, 16000)
+        decoder = ReadAhead(open_decoder(path, backend="soundfile"), max_bytes=8 * 4096,
+                            chunk_size=4096)
+        decoder.thread.join(0.5)  # Nobody reads, so the decoder stops at the bound
+        self.assertTrue(decoder.thread.is_alive())
+        self.assertLessEqual(decoder.chunks.qsize(), 8)
+        self.assertEqual(decoder.read(4000) + decoder.read(), pcm.tobytes())
+        self.assertEqual(decoder.backend, "soundfile")
+        self.assertEqual(decoder.close(), 0)
+
+        # Closing before the end stops the decoder thread too
+        decoder = ReadAhead(open_decoder(path), max_bytes=4096, chunk_size=4096)
+        decoder.read(100)
+        self.assertEqual(decoder.close(), 0)
+        self.assertFalse(decoder.thread.is_alive())
+
+    def test_native_rate_passthrough(self):
+        """Higher rates pass through when asked, lower ones are always upsampled"""
+        self.assertEqual(choose_sample_rate(44100, 16000), 16000)
+        self.assertEqual(choose_sample_rate(44100, 16000, native=True), 44100)
+        self.assertEqual(choose_sample_rate(8000, 16000, native=True), 16000)
+        self.assertEqual(choose_sample_rate(8000, 8000, native=True), 8000)
+        self.assertEqual(choose_sample_rate(None, 16000, native=True), 16000)
+
+    def test_native_rate_wav_mapped(self):
+        """A mono WAV decoded at its own rate is mapped, not resampled"""
+        pcm = np.zeros(4410, dtype=np.int16)
+        path = self.write_wav("native.wav", pcm, 44100)
+        self.assertEqual(probe_sample_rate(path), 44100)
+        decoder = open_decoder(path, 44100)
+        self.assertEqual((decoder.backend, decoder.sample_rate), ("mmap", 44100))
+        self.assertEqual(len(decoder.read()), 2 * len(pcm))
+
+    def test_unreadable_format_left_to_ffmpeg(self):
+        """Files libsndfile cannot open are not claimed by the soundfile backend"""
+        path = os.path.join(self.tmp.name, "voice.m4a")
+        with open(path, "wb") as f:
+            f.write(b"\x00\x00\x00\x20ftypM4A " + bytes(64))
+        self.assertIsNone(open_soundfile(path))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Tests for silence skipping before the recognizer
+"""
+
+import unittest
+import sys
+import os
+
+import numpy as np
+
+# Add src directory to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from audio_vad import SilenceSkipper
+
+RATE = 16000
+
+
+def tone(seconds, amplitude=8000):
+    t = np.arange(int(seconds * RATE)) / RATE
+    return (amplitude * np.sin(2 * np.pi * 300 * t)).astype(np.int16)
+
+
+def noise(seconds, amplitude=30):
+    return (np.random.RandomState(0).randn(int(seconds * RATE)) * amplitude).astype(np.int16)
+
+
+def run_skipper(skipper, samples, chunk_bytes=4000):
+    data = samples.tobytes()
+    out = b"".join(skipper.process(data[i:i + chunk_bytes])
+                   for i in range(0, len(data), chunk_bytes))
+    return out + skipper.flush()
+
+
+class TestSilenceSkipper(unittest.TestCase):
+    """Test cases for SilenceSkipper"""
+
+    def test_long_silence_is_dropped(self):
+        """Most of a long silence is removed, speech is kept"""
+        skipper = SilenceSkipper(RATE)
+        out = run_skipper(skipper, np.concatenate([tone(1), noise(3), tone(1)]))
+        kept_seconds = len(out) / 2 / RATE
+        self.assertTrue(2.0 < kept_seconds < 3.0)
+        self.assertGreater(skipper.skipped_fraction(), 0.4)
+
+    def test_short_pause_is_kept(self):
+        """Pauses shorter than both pads pass through untouched"""
+        samples = np.concatenate([tone(1), noise(0.5), tone(1)])
+        skipper = SilenceSkipper(RATE)
+        out = run_skipper(skipper, samples)
+        self.assertEqual(len(out), len(samples.tobytes()))
+        self.assertEqual(skipper.skipped_samples, 0)
+
+    def test_restore_times(self):
+        """Word times after a skip map back to the original audio"""
+        skipper = SilenceSkipper(RATE)
+        out = run_skipper(skipper, np.concatenate([tone(1), noise(3), tone(1)]))
+        second_tone = len(out) / 2 / RATE - 1.0
+        result = skipper.restore_times({"result": [
+            {"word": "a", "start": 0.5, "end": 0.6},
+            {"word": "b", "start": second_tone + 0.1, "end": second_tone + 0.2}]})
+        self.assertAlmostEqual(result["result"][0]["start"], 0.5)
+        self.assertAlmostEqual(result["result"][1]["start"], 4.1, delta=0.05)
+
+
+if __name__ == "__main__":
+    unittest.main()
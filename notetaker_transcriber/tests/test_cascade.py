@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Tests for the confidence-gated model cascade
+"""
+
+import unittest
+import sys
+import os
+
+# Add src directory to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from cascade import weak_utterances, utterance_segment, splice_results
+
+RATE = 16000
+
+
+def utterance(*words):
+    """Build a Vosk result from (word, start, end, conf) tuples"""
+    result = [{"word": w, "start": s, "end": e, "conf": c} for w, s, e, c in words]
+    return {"result": result, "text": " ".join(w for w, _, _, _ in words)}
+
+
+class TestCascade(unittest.TestCase):
+    """Test cases for the cascade helpers"""
+
+    def setUp(self):
+        self.results = [
+            utterance(("hello", 0.5, 0.9, 1.0), ("there", 1.0, 1.4, 0.95)),
+            utterance(("pie", 3.0, 3.3, 0.4), ("spark", 3.4, 3.8, 0.6)),
+            {"text": ""},
+            utterance(("thanks", 6.0, 6.5, 0.9)),
+        ]
+
+    def test_weak_utterances(self):
+        """Only utterances with words and a low mean confidence are picked"""
+        self.assertEqual(weak_utterances(self.results, 0.8), [1])
+        self.assertEqual(weak_utterances(self.results, 0.95), [1, 3])
+
+    def test_utterance_segment(self):
+        """The decode range adds context, the keep range covers the words"""
+        start, end, keep_start, keep_end = utterance_segment(self.results[1], 10 * RATE, RATE, 0.5)
+        self.assertEqual((start, keep_start), (int(2.5 * RATE), int(3.0 * RATE)))
+        self.assertEqual((end, keep_end), (int(3.8 * RATE) + 1 + RATE // 2, int(3.8 * RATE) + 1))
+
+    def test_splice_by_index(self):
+        """Re-decoded words replace the weak utterance in place"""
+        redecoded = [utterance(("pyspark", 3.1, 3.8, 0.9))]
+        spliced = splice_results(self.results, {1: redecoded})
+        self.assertEqual([res["text"] for res in spliced], ["hello there", "pyspark", "thanks"])
+
+    def test_splice_drops_emptied(self):
+        """A weak utterance the large model hears as silence disappears"""
+        spliced = splice_results(self.results, {1: [{"result": [], "text": ""}]})
+        self.assertEqual([res["text"] for res in spliced], ["hello there", "thanks"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Tests for per-channel transcription
+"""
+
+import unittest
+import sys
+import os
+import tempfile
+
+import numpy as np
+import soundfile
+
+# Add src directory to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from audio_io import decode_to_array, probe_format
+from channels import channel_labels, merge_channels, channel_transcript
+
+
+def utterance(*words):
+    """A Vosk-style result from (word, start, end) tuples"""
+    return {"result": [{"word": w, "start": s, "end": e, "conf": 1.0} for w, s, e in words],
+            "text": " ".join(w for w, _, _ in words)}
+
+
+class TestChannels(unittest.TestCase):
+    """Test cases for channel decoding and merging"""
+
+    def test_channels_kept_apart(self):
+        """A stereo file decodes to one column per channel, resampled"""
+        with tempfile.TemporaryDirectory() as tmp:
+            t = np.arange(44100) / 44100
+            left, right = 0.25 * np.sin(2 * np.pi * 440 * t), np.zeros_like(t)
+            path = os.path.join(tmp, "call.wav")
+            soundfile.write(path, np.stack([left, right], axis=1), 44100, subtype="PCM_16")
+
+            self.assertEqual(probe_format(path), (44100, 2))
+            samples = decode_to_array(path, 16000, channels=2)
+            self.assertEqual(samples.shape, (16000, 2))
+            self.assertAlmostEqual(np.max(np.abs(samples[1000:-1000, 0])) / 32768, 0.25, delta=0.01)
+            self.assertEqual(np.max(np.abs(samples[:, 1])), 0)
+
+            # At the model rate the interleaved data chunk is mapped as is
+            pcm = np.arange(2000, dtype=np.int16).reshape(1000, 2)
+            soundfile.write(path, pcm, 16000, subtype="PCM_16")
+            samples = decode_to_array(path, 16000, channels=2)
+            self.assertIsInstance(samples, np.memmap)
+            np.testing.assert_array_equal(samples, pcm)
+
+    def test_merge_orders_by_time(self):
+        """Utterances from both channels interleave by their first word"""
+        agent = [utterance(("hello", 0.5, 0.8), ("there", 0.9, 1.2)), utterance(("sure", 4.0, 4.3))]
+        customer = [utterance(("hi", 1.5, 1.7)), {"result": [], "text": ""},
+                    utterance(("thanks", 4.5, 4.9))]
+        utterances = merge_channels([agent, customer], ["Agent", "Customer"])
+        self.assertEqual([(u["channel"], u["text"]) for u in utterances],
+                         [("Agent", "hello there"), ("Customer", "hi"),
+                          ("Agent", "sure"), ("Customer", "thanks")])
+
+    def test_transcript_groups_turns(self):
+        """Consecutive utterances of one channel form a single labelled line"""
+        utterances = merge_channels([[utterance(("one", 0.0, 0.3)), utterance(("two", 2.0, 2.3))],
+                                     [utterance(("three", 65.0, 65.4))]], channel_labels(2))
+        self.assertEqual(channel_transcript(utterances),
+                         "[00:00] Channel 1: one two\n[01:05] Channel 2: three")
+        self.assertEqual(channel_labels(3, ["Agent"]), ["Agent", "Channel 2", "Channel 3"])
+
+
+if __name__ == '__main__':
+    unittest.main()
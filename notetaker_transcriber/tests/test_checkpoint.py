@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Tests for checkpointed, resumable transcription
+"""
+
+import unittest
+import sys
+import os
+import json
+import tempfile
+
+import numpy as np
+import soundfile
+
+# Add src directory to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from audio_io import open_decoder
+from checkpoint import Checkpoint
+from recognition import recognize_stream
+
+RATE = 16000
+
+
+class SecondRecognizer:
+    """Stands in for KaldiRecognizer: one utterance per second of audio,
+    its word being the first sample value and its time the stream time"""
+
+    def __init__(self):
+        self.samples = []
+        self.fed = 0
+
+    def AcceptWaveform(self, data):
+        self.samples.append(np.frombuffer(data, dtype=np.int16))
+        return sum(len(s) for s in self.samples) >= RATE
+
+    def Result(self):
+        samples = np.concatenate(self.samples)
+        self.samples = [samples[RATE:]]
+        start = self.fed / RATE
+        self.fed += RATE
+        return json.dumps({"result": [{"word": str(samples[0]), "start": start, "end": start + 0.5}],
+                           "text": str(samples[0])})
+
+    def FinalResult(self):
+        return json.dumps({"text": ""})
+
+
+class CrashingStream:
+    """A decoder that dies after limit bytes"""
+
+    def __init__(self, decoder, limit):
+        self.decoder = decoder
+        self.limit = limit
+
+    def read(self, size):
+        if self.limit <= 0:
+            raise OSError("decoder crashed")
+        self.limit -= size
+        return self.decoder.read(size)
+
+
+class TestCheckpoint(unittest.TestCase):
+    """Test cases for Checkpoint and resuming recognize_stream"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        # Ten seconds whose sample values count tenths of a second
+        pcm = (np.arange(10 * RATE) // (RATE // 10)).astype(np.int16)
+        self.path = os.path.join(self.tmp.name, "long.wav")
+        soundfile.write(self.path, pcm, RATE, subtype="PCM_16")
+
+    def words(self, parts):
+        return [(w["word"], w["start"]) for part in parts for w in json.loads(part).get("result", [])]
+
+    def test_resume_matches_uninterrupted_run(self):
+        """A crash at 5.5s resumes from the 4s checkpoint with the same result"""
+        expected = self.words(recognize_stream(SecondRecognizer(), open_decoder(self.path)))
+        self.assertEqual(expected, [(str(10 * t), float(t)) for t in range(10)])
+
+        checkpoint = Checkpoint(self.path, RATE, interval=2.0)
+        self.assertEqual(checkpoint.load(), 0)
+        with self.assertRaises(OSError):
+            recognize_stream(SecondRecognizer(), CrashingStream(open_decoder(self.path), 11 * RATE),
+                             checkpoint=checkpoint)
+        self.assertEqual(checkpoint.saves, 2)
+
+        checkpoint = Checkpoint(self.path, RATE, interval=2.0)
+        self.assertEqual(checkpoint.load(), 4 * RATE)
+        earlier = list(checkpoint.results)
+        decoder = open_decoder(self.path, RATE, checkpoint.start_time)
+        parts = earlier + recognize_stream(SecondRecognizer(), decoder, checkpoint=checkpoint)
+        self.assertEqual(self.words(parts), expected)
+
+        checkpoint.remove()
+        self.assertFalse(os.path.exists(checkpoint.path))
+        self.assertFalse(os.path.exists(checkpoint.results_path))
+
+    def test_save_appends_new_results(self):
+        """Each save writes only the results since the last one"""
+        checkpoint = Checkpoint(self.path, RATE, interval=1.0)
+        for second in range(1, 4):
+            checkpoint.update(second * RATE, json.dumps({"text": str(second)}))
+        with open(checkpoint.results_path, encoding="utf-8") as f:
+            self.assertEqual([json.loads(line) for line in f], [json.dumps({"text": str(s)})
+                                                                for s in range(1, 4)])
+        with open(checkpoint.path, encoding="utf-8") as f:
+            self.assertNotIn("results", json.load(f))
+
+        # A save cut short after its append is not resumed, nor appended to
+        with open(checkpoint.results_path, "a", encoding="utf-8") as f:
+            f.write('"{\\"text\\": ')
+        checkpoint = Checkpoint(self.path, RATE, interval=1.0)
+        self.assertEqual(checkpoint.load(), 3 * RATE)
+        checkpoint.update(4 * RATE, json.dumps({"text": "4"}))
+        checkpoint = Checkpoint(self.path, RATE)
+        self.assertEqual(checkpoint.load(), 4 * RATE)
+        self.assertEqual([json.loads(part)["text"] for part in checkpoint.results], ["1", "2", "3", "4"])
+
+    def test_changed_source_not_resumed(self):
+        """A checkpoint of another version of the file or rate is ignored"""
+        checkpoint = Checkpoint(self.path, RATE)
+        checkpoint.update(RATE, json.dumps({"text": "one"}))
+        checkpoint.save()
+        self.assertEqual(Checkpoint(self.path, RATE).load(), RATE)
+        self.assertEqual(Checkpoint(self.path, 8000, path=checkpoint.path).load(), 0)
+
+        soundfile.write(self.path, np.zeros(RATE, dtype=np.int16), RATE, subtype="PCM_16")
+        self.assertEqual(Checkpoint(self.path, RATE).load(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Tests for the in-process filter chain
+"""
+
+import unittest
+import sys
+import os
+
+import numpy as np
+from scipy.signal import lfilter
+
+# Add src directory to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from dsp_filters import parse_chain
+
+RATE = 16000
+COMPAND = "compand=0.3|0.3:1|1:-90/-60/-40/-30/-20/-10/-3/0:6:0:-90:0.2"
+
+
+def noise(seconds, amplitude=3000, seed=0):
+    return (np.random.RandomState(seed).randn(int(seconds * RATE)) * amplitude).astype(np.int16)
+
+
+def run_chunked(chain, samples, chunk_bytes=4000):
+    data = samples.tobytes()
+    out = b"".join(chain.process(data[i:i + chunk_bytes]) for i in range(0, len(data), chunk_bytes))
+    return np.frombuffer(out + chain.flush(), dtype=np.int16)
+
+
+def rbj_highpass(frequency, q=0.707):
+    """ffmpeg's highpass biquad (Audio EQ Cookbook)"""
+    w0 = 2 * np.pi * frequency / RATE
+    alpha = np.sin(w0) / (2 * q)
+    b = [(1 + np.cos(w0)) / 2, -(1 + np.cos(w0)), (1 + np.cos(w0)) / 2]
+    a = [1 + alpha, -2 * np.cos(w0), 1 - alpha]
+    return b, a
+
+
+class TestDspFilters(unittest.TestCase):
+    """Test cases for parse_chain and its stages"""
+
+    def test_highpass_matches_ffmpeg_biquad(self):
+        """The Butterworth section equals ffmpeg's Q=0.707 cookbook biquad"""
+        samples = noise(1)
+        ours = run_chunked(parse_chain("highpass=f=200"), samples)
+        b, a = rbj_highpass(200)
+        reference = lfilter(b, a, samples / 32768.0)
+        reference = np.clip(np.round(reference * 32768), -32768, 32767)
+        self.assertLessEqual(np.max(np.abs(ours - reference)), 2)
+
+    def test_chunking_does_not_change_output(self):
+        """Filter state carries across chunks of any size"""
+        samples = noise(3)
+        chain = "highpass=f=150,lowpass=f=3500,volume=1.2," + COMPAND
+        whole = run_chunked(parse_chain(chain), samples, chunk_bytes=len(samples) * 2)
+        chunked = run_chunked(parse_chain(chain), samples, chunk_bytes=1000)
+        self.assertEqual(len(whole), len(samples))
+        np.testing.assert_array_equal(whole, chunked)
+
+    def test_volume_clips(self):
+        """Gain saturates at the int16 limits instead of wrapping"""
+        out = run_chunked(parse_chain("volume=1.5"), np.array([30000, -30000, 100], dtype=np.int16))
+        self.assertEqual(out.tolist(), [32767, -32768, 150])
+
+    def test_compand_raises_quiet_audio(self):
+        """-40 dB input maps to -30 dB on the transfer curve"""
+        samples = noise(3, amplitude=328)  # About -40 dBFS
+        out = run_chunked(parse_chain(COMPAND), samples)
+        gain_db = 20 * np.log10(np.std(out[RATE:].astype(float)) / np.std(samples[RATE:].astype(float)))
+        self.assertGreater(gain_db, 5)
+
+    def test_unsupported_filter(self):
+        """anlmdn has no in-process version"""
+        with self.assertRaises(ValueError):
+            parse_chain("highpass=f=200,anlmdn=s=7")
+
+
+if __name__ == "__main__":
+    unittest.main()
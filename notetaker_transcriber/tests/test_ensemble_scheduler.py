@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Tests for agreement-driven ensemble scheduling
+"""
+
+import unittest
+import sys
+import os
+import tempfile
+
+# Add src directory to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from ensemble_scheduler import word_agreement, run_until_agreement
+from ensemble_scheduler import plan_residency, model_footprint, parse_size, peak_rss
+
+
+class TestEnsembleScheduler(unittest.TestCase):
+    """Test cases for run_until_agreement"""
+
+    def test_word_agreement(self):
+        """Agreement is symmetric and tolerates an inserted word"""
+        self.assertEqual(word_agreement("a b c d", "A B C D"), 1.0)
+        self.assertAlmostEqual(word_agreement("a b c d", "a b x c d"), 8 / 9)
+        self.assertEqual(word_agreement("a b", "c d"), 0.0)
+
+    def test_stops_after_two_agreeing(self):
+        """Easy audio: the first two decodes agree and the rest never run"""
+        started = []
+
+        def run_job(job, stop_event):
+            started.append(job)
+            return "the same words every time"
+
+        finished, agreement = run_until_agreement(list(range(12)), run_job, 0.9, workers=1)
+        self.assertEqual(len(finished), 2)
+        self.assertEqual(started, [0, 1])
+        self.assertEqual(agreement, 1.0)
+
+    def test_disagreement_runs_everything(self):
+        """Hypotheses that never agree use every job"""
+        def run_job(job, stop_event):
+            return f"word{job} other{job}"
+
+        finished, agreement = run_until_agreement(list(range(6)), run_job, 0.9, workers=2)
+        self.assertEqual(len(finished), 6)
+        self.assertLess(agreement, 0.9)
+
+    def test_no_threshold_runs_everything(self):
+        """threshold None keeps the old run-all behaviour"""
+        finished, _ = run_until_agreement(list(range(4)), lambda job, stop: "same", None)
+        self.assertEqual(len(finished), 4)
+
+    def test_failed_jobs_are_skipped(self):
+        """Jobs without a hypothesis do not count towards agreement"""
+        texts = [None, "a b c", None, "a b c", "never"]
+        finished, _ = run_until_agreement(list(range(5)), lambda job, stop: texts[job], 0.9, workers=1)
+        self.assertEqual([job for job, _ in finished], [1, 3])
+
+    def test_earlier_hypotheses_count(self):
+        """A later wave stops as soon as it agrees with an earlier one"""
+        finished, agreement = run_until_agreement(["b", "c"], lambda job, stop: "a b c", 0.9,
+                                                  workers=1, earlier=[("a", "a b c")])
+        self.assertEqual(finished, [("b", "a b c")])
+        self.assertEqual(agreement, 1.0)
+
+
+class TestResidencyPlan(unittest.TestCase):
+    """Test cases for memory-budgeted model residency"""
+
+    def test_waves_fit_the_budget(self):
+        """Models share a wave only while their sum fits"""
+        footprints = {"0.22": 2500, "0.21": 2000, "0.15": 1000, "small": 100}
+        self.assertEqual(plan_residency(footprints, 8000), [["0.22", "0.21", "0.15", "small"]])
+        self.assertEqual(plan_residency(footprints, 4000), [["0.22"], ["0.21", "0.15", "small"]])
+        self.assertEqual(plan_residency(footprints, 2200), [["0.22"], ["0.21"], ["0.15", "small"]])
+        self.assertEqual(plan_residency(footprints, None), [["0.22"], ["0.21"], ["0.15"], ["small"]])
+
+    def test_unknown_size_runs_alone(self):
+        """A model not on disk yet never shares memory with another"""
+        footprints = {"a": 100, "b": None, "c": 100, "d": 100}
+        self.assertEqual(plan_residency(footprints, 1000), [["a"], ["b"], ["c", "d"]])
+
+    def test_footprint_and_sizes(self):
+        """Footprints come from the model files, budgets from human sizes"""
+        with tempfile.TemporaryDirectory() as model_dir:
+            with open(os.path.join(model_dir, "final.mdl"), "wb") as f:
+                f.write(bytes(1000))
+            self.assertEqual(model_footprint(model_dir, factor=1.5), 1500)
+            self.assertIsNone(model_footprint(os.path.join(model_dir, "missing")))
+        self.assertEqual(parse_size("4G"), 4 << 30)
+        self.assertEqual(parse_size("3500MB"), 3500 << 20)
+        self.assertEqual(parse_size("1024"), 1024)
+        self.assertGreater(peak_rss(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Tests for the decoupled live capture loop
+"""
+
+import unittest
+import sys
+import os
+import json
+import time
+
+import numpy as np
+
+# Add src directory to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from live_capture import RingBuffer, FileMicrophone, LiveSession
+
+RATE = 16000
+
+
+class CountingRecognizer:
+    """Stands in for KaldiRecognizer: one utterance per second of audio"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.samples = 0
+        self.utterances = 0
+
+    def AcceptWaveform(self, data):
+        time.sleep(self.delay)
+        self.samples += len(data) // 2
+        if self.samples >= (self.utterances + 1) * RATE:
+            self.utterances += 1
+            return True
+        return False
+
+    def Result(self):
+        return json.dumps({"text": f"utterance {self.utterances}"})
+
+    def FinalResult(self):
+        return json.dumps({"text": ""})
+
+
+class TestRingBuffer(unittest.TestCase):
+    """Test cases for RingBuffer"""
+
+    def test_wraparound(self):
+        """Samples come out in order across the end of the buffer"""
+        ring = RingBuffer(10)
+        ring.write(np.arange(8, dtype=np.int16))
+        samples, _ = ring.read(6)
+        self.assertEqual(samples.tolist(), list(range(6)))
+        ring.write(np.arange(8, 14, dtype=np.int16))
+        samples, _ = ring.read()
+        self.assertEqual(samples.tolist(), list(range(6, 14)))
+        self.assertEqual(ring.depth(), 0)
+
+    def test_overflow_drops_newest(self):
+        """A full buffer drops incoming samples and counts them"""
+        ring = RingBuffer(10)
+        self.assertEqual(ring.write(np.arange(15, dtype=np.int16)), 10)
+        self.assertEqual(ring.dropped, 5)
+        self.assertEqual(ring.max_depth, 10)
+        samples, _ = ring.read()
+        self.assertEqual(samples.tolist(), list(range(10)))
+
+    def test_capture_time_of_newest_sample(self):
+        """read() reports when the last sample it returns was captured"""
+        ring = RingBuffer(100)
+        ring.write(np.zeros(10, dtype=np.int16), capture_time=1.0)
+        ring.write(np.zeros(10, dtype=np.int16), capture_time=2.0)
+        self.assertEqual(ring.read(15)[1], 2.0)
+        self.assertEqual(ring.read()[1], 2.0)
+
+
+class TestLiveSession(unittest.TestCase):
+    """Test cases for LiveSession with a file-backed microphone"""
+
+    def run_session(self, seconds, rec, buffer_samples):
+        ring = RingBuffer(buffer_samples)
+        pcm = np.zeros(int(seconds * RATE), dtype=np.int16)
+        source = FileMicrophone(ring, pcm, RATE, chunk=1024, speed=20.0)
+        session = LiveSession(rec, ring, source, poll_interval=0.001)
+        session.start()
+        source.finished.wait(5)
+        return session, session.stop()
+
+    def test_all_audio_reaches_recognizer(self):
+        """Every captured sample is decoded once capture stops"""
+        rec = CountingRecognizer()
+        session, parts = self.run_session(3, rec, RATE * 10)
+        self.assertEqual(rec.samples, 3 * RATE)
+        self.assertEqual(parts, ["utterance 1", "utterance 2", "utterance 3"])
+        stats = session.stats()
+        self.assertEqual(stats["dropped_samples"], 0)
+        self.assertEqual(stats["queue_depth"], 0)
+        self.assertIsNotNone(stats["latency_mean"])
+
+    def test_slow_recognizer_grows_queue(self):
+        """A recognizer slower than capture backs up into the buffer"""
+        rec = CountingRecognizer(delay=0.05)
+        session, _ = self.run_session(2, rec, RATE * 10)
+        self.assertEqual(rec.samples, 2 * RATE)
+        self.assertGreater(session.stats()["max_queue_depth"], 1024)
+
+    def test_small_buffer_counts_drops(self):
+        """Samples that do not fit are dropped and counted, not blocked on"""
+        rec = CountingRecognizer(delay=0.05)
+        session, _ = self.run_session(2, rec, 4096)
+        self.assertGreater(session.stats()["dropped_samples"], 0)
+        self.assertEqual(rec.samples + session.stats()["dropped_samples"], 2 * RATE)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Tests for silence splitting and segment stitching in long file mode
+"""
+
+import unittest
+import sys
+import os
+
+import numpy as np
+
+# Add src directory to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from audio_vad import find_split_points
+from long_file import plan_segments, shift_result, stitch_results
+
+RATE = 16000
+
+
+def tone(seconds, amplitude=8000):
+    t = np.arange(int(seconds * RATE)) / RATE
+    return (amplitude * np.sin(2 * np.pi * 440 * t)).astype(np.int16)
+
+
+def silence(seconds):
+    return np.zeros(int(seconds * RATE), dtype=np.int16)
+
+
+class TestLongFile(unittest.TestCase):
+    """Test cases for long file segmentation"""
+
+    def test_split_lands_in_silence(self):
+        """Splits are placed inside the silence nearest the target"""
+        samples = np.concatenate([tone(9), silence(2), tone(9), silence(1), tone(9)])
+        points = find_split_points(samples, RATE, segment_seconds=10, search_seconds=3)
+        self.assertEqual(len(points), 2)
+        first, at_silence = points[0]
+        self.assertTrue(at_silence)
+        self.assertTrue(9 * RATE < first < 11 * RATE)
+
+    def test_forced_split_without_silence(self):
+        """Continuous speech is still split, flagged as a forced cut"""
+        points = find_split_points(tone(25), RATE, segment_seconds=10, search_seconds=2)
+        self.assertTrue(len(points) > 0)
+        self.assertFalse(points[0][1])
+
+    def test_plan_segments_overlap_only_forced_cuts(self):
+        """Overlap is added only on the sides of forced cuts"""
+        segments = plan_segments(30 * RATE, [(10 * RATE, True), (20 * RATE, False)], RATE)
+        self.assertEqual(segments[0], (0, 10 * RATE, 0, 10 * RATE))
+        self.assertEqual(segments[1], (10 * RATE, 21 * RATE, 10 * RATE, 20 * RATE))
+        self.assertEqual(segments[2], (19 * RATE, 30 * RATE, 20 * RATE, 30 * RATE))
+
+    def test_stitch_offsets_and_dedups(self):
+        """Word times move to file time and overlap words appear once"""
+        first = [shift_result({"result": [{"word": "hello", "start": 9.5, "end": 9.8, "conf": 1.0},
+                                          {"word": "there", "start": 10.2, "end": 10.6, "conf": 1.0}],
+                               "text": "hello there"}, 0.0, 0.0, 10.0)]
+        second = [shift_result({"result": [{"word": "there", "start": 0.2, "end": 0.6, "conf": 1.0},
+                                           {"word": "friend", "start": 1.0, "end": 1.4, "conf": 1.0}],
+                                "text": "there friend"}, 10.0, 10.0, 20.0)]
+        results = stitch_results([first, second])
+        words = [w["word"] for res in results for w in res["result"]]
+        self.assertEqual(words, ["hello", "there", "friend"])
+        self.assertAlmostEqual(results[1]["result"][1]["start"], 11.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Tests for the per-stage latency histograms
+"""
+
+import unittest
+import sys
+import os
+import io
+import json
+import tempfile
+
+# Add src directory to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from metrics import Metrics, Histogram, METRICS
+from recognition import recognize_stream
+
+
+class CountingRecognizer:
+    """Stand-in recognizer with a result every fourth chunk"""
+
+    def __init__(self):
+        self.chunks = 0
+
+    def AcceptWaveform(self, data):
+        self.chunks += 1
+        return self.chunks % 4 == 0
+
+    def Result(self):
+        return json.dumps({"text": f"chunk {self.chunks}"})
+
+    def FinalResult(self):
+        return json.dumps({"text": ""})
+
+
+class TestMetrics(unittest.TestCase):
+    """Test cases for histograms and their export"""
+
+    def test_buckets(self):
+        """Values land in the first bucket whose bound they do not exceed"""
+        hist = Histogram("h", "help", buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 5.0):
+            hist.observe(value)
+        self.assertEqual(list(hist.cumulative()), [(0.1, 2), (1.0, 3), (float("inf"), 4)])
+        self.assertEqual(hist.quantile(0.5), 0.1)
+        self.assertEqual(hist.quantile(1.0), float("inf"))
+
+    def test_disabled_records_nothing(self):
+        """A disabled registry ignores observations, timers and decorated calls"""
+        metrics = Metrics(enabled=False)
+        metrics.observe("accept_waveform", 0.01)
+        with metrics.time("write_output"):
+            pass
+        self.assertEqual(metrics.timed("postprocess")(str.upper)("a"), "A")
+        self.assertTrue(all(hist.count == 0 for hist in metrics.histograms.values()))
+
+    def test_export(self):
+        """Prometheus text and JSON snapshots carry the same counts"""
+        metrics = Metrics(enabled=True)
+        metrics.observe("accept_waveform", 0.002)
+        metrics.observe("decode_speed", 120.0)
+        self.assertEqual(metrics.timed("postprocess")(str.upper)("a"), "A")
+        text = metrics.prometheus()
+        self.assertIn("# TYPE notetaker_accept_waveform_seconds histogram", text)
+        self.assertIn('notetaker_accept_waveform_seconds_bucket{le="0.0025"} 1', text)
+        self.assertIn('notetaker_decode_speed_ratio_bucket{le="+Inf"} 1', text)
+        self.assertIn("notetaker_postprocess_seconds_count 1", text)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "metrics.json")
+            metrics.write(path)
+            with open(path) as f:
+                snapshot = json.load(f)
+            self.assertEqual(snapshot["notetaker_accept_waveform_seconds"]["count"], 1)
+            self.assertEqual(os.listdir(tmp), ["metrics.json"])
+
+    def test_recognize_stream_is_timed(self):
+        """Every AcceptWaveform call and every result is observed once enabled"""
+        METRICS.enabled = True
+        try:
+            before = {name: hist.count for name, hist in METRICS.histograms.items()}
+            parts = recognize_stream(CountingRecognizer(), io.BytesIO(bytes(8000 * 8)))
+            # 16 chunks of 4000 bytes, a result after every fourth plus the final one
+            self.assertEqual(len(parts), 5)
+            self.assertEqual(METRICS.histograms["accept_waveform"].count - before["accept_waveform"], 16)
+            self.assertEqual(METRICS.histograms["result"].count - before["result"], 5)
+        finally:
+            METRICS.enabled = False
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Tests for model prefetch and first-result latency reporting
+"""
+
+import unittest
+import sys
+import os
+import tempfile
+import time
+from unittest import mock
+
+# Add src directory to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from model_warmup import prefetch_model, model_directory, WarmupReport, FirstResultClock
+from model_warmup import ModelLoader, resolve_model, LazyModel
+
+
+class TestModelWarmup(unittest.TestCase):
+    """Test cases for prefetching and latency reports"""
+
+    def test_prefetch_reads_every_file(self):
+        """All files of the model tree are read, subdirectories included"""
+        with tempfile.TemporaryDirectory() as model_dir:
+            os.makedirs(os.path.join(model_dir, "graph"))
+            for name, size in (("am/final.mdl", 3 << 20), ("graph/HCLG.fst", 1000), ("README", 10)):
+                path = os.path.join(model_dir, name)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, "wb") as f:
+                    f.write(os.urandom(size))
+            total, seconds = prefetch_model(model_dir, block_size=1 << 16)
+            self.assertEqual(total, (3 << 20) + 1010)
+            self.assertGreaterEqual(seconds, 0.0)
+            self.assertEqual(model_directory(model_dir), model_dir)
+
+    def test_model_directory_searches_model_dirs(self):
+        """Names and languages resolve to a downloaded model without loading it"""
+        with tempfile.TemporaryDirectory() as root:
+            for name in ("vosk-model-small-de-0.15", "vosk-model-en-us-0.22"):
+                os.makedirs(os.path.join(root, name))
+            with mock.patch("model_warmup.MODEL_DIRS", [None, os.path.join(root, "missing"), root]):
+                self.assertEqual(model_directory(lang="de"),
+                                 os.path.join(root, "vosk-model-small-de-0.15"))
+                self.assertEqual(model_directory(model_name="vosk-model-en-us-0.22"),
+                                 os.path.join(root, "vosk-model-en-us-0.22"))
+                self.assertIsNone(model_directory(lang="fr"))
+
+    def test_reports(self):
+        """Cold and warm latency show up once measured"""
+        self.assertNotIn("cold", str(WarmupReport(2.5)))
+        report = str(WarmupReport(2.5, 50e6, 0.4, cold=0.180, warm=0.020))
+        self.assertIn("50 MB", report)
+        self.assertIn("cold 180 ms, warm 20 ms", report)
+
+        clock = FirstResultClock(warm=True)
+        self.assertIn("No result", clock.report())
+        clock.mark()
+        first = clock.first
+        clock.mark()
+        self.assertEqual(clock.first, first)
+        self.assertIn("warm model", clock.report())
+
+    def test_loader_runs_in_background(self):
+        """Work done while the model loads overlaps the load"""
+        def slow_load(name):
+            time.sleep(0.2)
+            return name
+
+        start_time = time.time()
+        loader = ModelLoader(slow_load, "model")
+        self.assertFalse(loader.ready())
+        time.sleep(0.2)  # Decoding meanwhile
+        self.assertEqual(resolve_model(loader), "model")
+        self.assertLess(time.time() - start_time, 0.35)
+        self.assertGreaterEqual(loader.ready_time, 0.2)
+        self.assertEqual(resolve_model("loaded"), "loaded")
+
+        def broken_load():
+            raise RuntimeError("no model")
+
+        with self.assertRaises(RuntimeError):
+            ModelLoader(broken_load).result()
+
+    def test_lazy_model(self):
+        """Nothing loads until first use, once, and release allows a reload"""
+        loads = []
+
+        def load():
+            loads.append(1)
+            return object()
+
+        handle = LazyModel("test-model", load)
+        self.assertFalse(handle.loaded)
+        self.assertEqual(loads, [])
+        model = handle.get()
+        self.assertIs(handle.get(), model)
+        self.assertEqual(len(loads), 1)
+        handle.release()
+        self.assertFalse(handle.loaded)
+        self.assertIsNot(handle.get(), model)
+        self.assertEqual(handle.loads, 2)
+
+        def broken_load():
+            raise RuntimeError("no model")
+
+        handle = LazyModel("missing", broken_load)
+        with self.assertRaises(RuntimeError):
+            handle.get()
+        self.assertFalse(handle.loaded)
+
+
+if __name__ == '__main__':
+    unittest.main()
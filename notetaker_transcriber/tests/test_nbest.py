@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Tests for N-best rescoring
+"""
+
+import unittest
+import sys
+import os
+
+# Add src directory to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from nbest import build_terms, term_pattern, rescore
+from compare_transcriptions import word_error_rate
+
+
+class TestNBest(unittest.TestCase):
+    """Test cases for N-best rescoring"""
+
+    def setUp(self):
+        self.pattern = term_pattern(build_terms({'py spark': 'PySpark', 'sql': 'SQL'}, ['tableau']))
+
+    def test_build_terms(self):
+        """Only corrections that change more than case become terms"""
+        self.assertEqual(build_terms({'py spark': 'PySpark', 'sql': 'SQL'}, ['tableau']),
+                         ['py spark', 'tableau'])
+
+    def test_term_outweighs_small_margin(self):
+        """A domain term wins over a slightly more confident hypothesis"""
+        result = {"alternatives": [
+            {"confidence": 210.0, "text": "i used pie spark"},
+            {"confidence": 208.5, "text": "i used py spark"}]}
+        best, changed = rescore(result, self.pattern, term_bonus=5.0)
+        self.assertEqual(best["text"], "i used py spark")
+        self.assertTrue(changed)
+
+    def test_confident_top_kept(self):
+        """Without terms the recognizer's top hypothesis stays"""
+        result = {"alternatives": [
+            {"confidence": 210.0, "text": "good morning"},
+            {"confidence": 180.0, "text": "could morning tableau"}]}
+        best, changed = rescore(result, self.pattern, term_bonus=5.0)
+        self.assertEqual(best["text"], "good morning")
+        self.assertFalse(changed)
+
+    def test_empty_utterance(self):
+        """Utterances without text are skipped"""
+        self.assertEqual(rescore({"alternatives": [{"confidence": 1.0, "text": ""}]}, self.pattern),
+                         (None, False))
+
+    def test_word_error_rate(self):
+        """One substitution in four reference words"""
+        self.assertAlmostEqual(word_error_rate("a b c d", "a x c d"), 0.25)
+        self.assertAlmostEqual(word_error_rate("a b", "a b c"), 0.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Tests for the staged file pipeline
+"""
+
+import unittest
+import sys
+import os
+import time
+
+# Add src directory to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from pipeline import Stage, Pipeline
+
+
+class TestPipeline(unittest.TestCase):
+    """Test cases for Stage and Pipeline"""
+
+    def test_every_item_reaches_the_last_stage(self):
+        """Items pass through all stages, None drops one"""
+        written = []
+        pipeline = Pipeline([
+            Stage("double", lambda x: 2 * x),
+            Stage("odd", lambda x: None if x == 6 else x, workers=3),
+            Stage("write", written.append),
+        ])
+        pipeline.run(range(10))
+        self.assertEqual(sorted(written), [0, 2, 4, 8, 10, 12, 14, 16, 18])
+        self.assertEqual([stage.items for stage in pipeline.stages], [10, 10, 9])
+
+    def test_failure_skips_only_that_item(self):
+        """An exception in a stage drops the item and is counted"""
+        written = []
+
+        def check(x):
+            if x == 3:
+                raise ValueError("bad file")
+            return x
+
+        pipeline = Pipeline([Stage("check", check), Stage("write", written.append)])
+        pipeline.run(range(5))
+        self.assertEqual(sorted(written), [0, 1, 2, 4])
+        self.assertEqual(pipeline.stages[0].failed, 1)
+
+    def test_exit_aborts_the_run(self):
+        """SystemExit in a worker ends the run instead of hanging it"""
+        written = []
+        discarded = []
+
+        def check(x):
+            if x == 3:
+                sys.exit(1)
+            return x
+
+        pipeline = Pipeline([
+            Stage("check", check),
+            Stage("write", written.append, discard=discarded.append),
+        ], depth=1)
+        with self.assertRaises(SystemExit):
+            pipeline.run(range(20))
+        self.assertNotIn(3, written)
+        self.assertLess(len(written) + len(discarded), 19)
+
+    def test_stages_overlap(self):
+        """Decoding and recognition of different items run at the same time"""
+        def decode(x):
+            time.sleep(0.02)
+            return x
+
+        def recognize(x):
+            time.sleep(0.02)
+            return x
+
+        pipeline = Pipeline([Stage("decode", decode), Stage("recognize", recognize)])
+        wall_time = pipeline.run(range(10))
+        # Serial would take 0.4s, overlapped about 0.22s
+        self.assertLess(wall_time, 0.35)
+        self.assertIn("recognize", pipeline.report())
+
+
+if __name__ == '__main__':
+    unittest.main()
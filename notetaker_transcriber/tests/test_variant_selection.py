@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Tests for sample-based variant selection
+"""
+
+import unittest
+import sys
+import os
+
+# Add src directory to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from variant_selection import sample_windows, mean_word_confidence
+from audio_io import ffmpeg_pcm_command
+
+
+class TestVariantSelection(unittest.TestCase):
+    """Test cases for the pre-scan helpers"""
+
+    def test_windows_spread_over_file(self):
+        """Windows are centred in equal thirds of the recording"""
+        self.assertEqual(sample_windows(600, 3, 20), [90.0, 290.0, 490.0])
+
+    def test_short_file_not_sampled(self):
+        """Sampling a short file would cost as much as decoding it"""
+        self.assertIsNone(sample_windows(100, 3, 20))
+        self.assertIsNone(sample_windows(None))
+
+    def test_mean_word_confidence(self):
+        """Confidence is averaged over words, not utterances"""
+        results = [{"result": [{"conf": 1.0}, {"conf": 0.5}, {"conf": 0.6}]},
+                   {"text": ""},
+                   {"result": [{"conf": 0.1}]}]
+        self.assertAlmostEqual(mean_word_confidence(results), 0.55)
+        self.assertEqual(mean_word_confidence([]), 0.0)
+
+    def test_window_seeks_on_input(self):
+        """-ss goes before -i so ffmpeg seeks instead of decoding up to start"""
+        cmd = ffmpeg_pcm_command("a.m4a", 16000, "-", 90, 20)
+        self.assertLess(cmd.index("-ss"), cmd.index("-i"))
+        self.assertGreater(cmd.index("-t"), cmd.index("-i"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Pick the preprocessing variant before the full decode.
+
+A few short windows spread over the recording are decoded under every
+filter variant and scored by mean word confidence; only the winning
+variant is then decoded in full.
+"""
+
+import io
+import json
+
+from vosk import KaldiRecognizer
+
+from audio_io import SAMPLE_RATE, decode_window
+from recognition import recognize_stream
+
+SAMPLE_WINDOWS = 3
+WINDOW_SECONDS = 20
+
+
+def sample_windows(duration, count=SAMPLE_WINDOWS, window=WINDOW_SECONDS):
+    """Start times of count windows centred in equal slices of the file
+
+    Returns None when the windows would cover most of the file anyway,
+    since sampling would then cost as much as decoding everything.
+    """
+    if duration is None or duration < 2 * count * window:
+        return None
+    step = duration / count
+    return [step * (k + 0.5) - window / 2 for k in range(count)]
+
+
+def mean_word_confidence(results):
+    """Mean conf over every word of a list of Vosk results, 0 without words"""
+    confs = [word["conf"] for res in results for word in res.get("result", [])]
+    return sum(confs) / len(confs) if confs else 0.0
+
+
+def score_variant(model, audio_file_path, starts, window=WINDOW_SECONDS, sample_rate=SAMPLE_RATE):
+    """Mean word confidence of one variant over the sampled windows"""
+    results = []
+    for start in starts:
+        rec = KaldiRecognizer(model, sample_rate)
+        rec.SetWords(True)
+        pcm = decode_window(audio_file_path, start, window, sample_rate)
+        results += [json.loads(part) for part in recognize_stream(rec, io.BytesIO(pcm))]
+    return mean_word_confidence(results)
+
+
+def select_variant(model, variations, duration, count=SAMPLE_WINDOWS, window=WINDOW_SECONDS):
+    """Return (best variation, {variation: score}), or (None, {}) when not worth sampling"""
+    starts = sample_windows(duration, count, window)
+    if starts is None or len(variations) < 2:
+        return None, {}
+    scores = {variation: score_variant(model, variation, starts, window) for variation in variations}
+    return max(variations, key=lambda variation: scores[variation]), scores
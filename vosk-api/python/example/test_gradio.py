@@ -1,32 +1,36 @@
 #!/usr/bin/env python3
 
-import json
 import gradio as gr
 
-from vosk import KaldiRecognizer, Model
+from vosk import KaldiRecognizer, Model, AsyncRecognizer, FinalEvent, PartialEvent
 
 model = Model(lang="en-us")
 
-def transcribe(stream, new_chunk):
+async def transcribe(stream, new_chunk):
 
     sample_rate, audio_data = new_chunk
     audio_data = audio_data.tobytes()
 
     if stream is None:
-        rec = KaldiRecognizer(model, sample_rate)
+        # Decoding runs on the recognizer's own thread, so other sessions
+        # served by the same event loop are not held up
+        rec = AsyncRecognizer(KaldiRecognizer(model, sample_rate))
         result = []
-    else:
-        rec, result = stream
-
-    if rec.AcceptWaveform(audio_data):
-        text_result = json.loads(rec.Result())["text"]
-        if text_result != "":
-            result.append(text_result)
         partial_result = ""
     else:
-        partial_result = json.loads(rec.PartialResult())["partial"] + " "
+        rec, result, partial_result = stream
+
+    await rec.accept_waveform(audio_data)
+
+    for event in rec.poll():
+        if isinstance(event, FinalEvent):
+            if event.text != "":
+                result.append(event.text)
+            partial_result = ""
+        elif isinstance(event, PartialEvent):
+            partial_result = event.text + " "
 
-    return (rec, result), "\n".join(result) + "\n" + partial_result
+    return (rec, result, partial_result), "\n".join(result) + "\n" + partial_result
 
 gr.Interface(
     fn=transcribe,
@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+
+import wave
+import sys
+
+from vosk import Model, KaldiRecognizer, SetLogLevel, PartialEvent, FinalEvent
+
+# You can set log level to -1 to disable debug messages
+SetLogLevel(0)
+
+wf = wave.open(sys.argv[1], "rb")
+if wf.getnchannels() != 1 or wf.getsampwidth() != 2 or wf.getcomptype() != "NONE":
+    print("Audio file must be WAV format mono PCM.")
+    sys.exit(1)
+
+model = Model(lang="en-us")
+
+rec = KaldiRecognizer(model, wf.getframerate())
+rec.SetWords(True)
+
+# Partials are reported only when they change, at most every 0.5 seconds of audio
+for event in rec.stream(iter(lambda: wf.readframes(4000), b""), partial_interval=0.5):
+    if isinstance(event, PartialEvent):
+        print("%.2f partial: %s" % (event.offset / wf.getframerate(), event.text))
+    elif isinstance(event, FinalEvent):
+        print("%.2f final: %s" % (event.offset / wf.getframerate(), event.text))
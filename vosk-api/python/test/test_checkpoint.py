@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from vosk.transcriber.checkpoint import Checkpoint
+
+RATE = 16000
+
+
+def result(i):
+    return {"text": "word{}".format(i), "result": [{"word": "word{}".format(i),
+            "start": float(i), "end": i + 0.5, "conf": 1.0}]}
+
+
+class TestCheckpoint(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.input_file = os.path.join(self.tmp.name, "a.wav")
+        self.output_file = os.path.join(self.tmp.name, "a.txt")
+        with open(self.input_file, "wb") as fh:
+            fh.write(bytes(100))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def checkpoint(self, rate=RATE):
+        return Checkpoint(self.input_file, self.output_file, rate, interval=2.0)
+
+    def test_saves_append_only_new_results(self):
+        checkpoint = self.checkpoint()
+        self.assertEqual(checkpoint.load(), 0)
+        sizes = []
+        for i in range(1, 7):
+            checkpoint.update(i * RATE, result(i))
+            if checkpoint.saves > len(sizes):
+                sizes.append(os.path.getsize(checkpoint.results_path))
+        self.assertEqual(checkpoint.saves, 3)
+        # Every save adds the two results since the one before
+        self.assertEqual(sizes, [sizes[0], 2 * sizes[0], 3 * sizes[0]])
+        with open(checkpoint.path, encoding="utf-8") as fh:
+            self.assertEqual(json.load(fh)["offset"], 6 * RATE)
+
+    def test_resume_ignores_unsaved_results(self):
+        checkpoint = self.checkpoint()
+        for i in range(1, 5):
+            checkpoint.update(i * RATE, result(i))
+        # A crash in the middle of appending the next save
+        with open(checkpoint.results_path, "a", encoding="utf-8") as fh:
+            fh.write(json.dumps(result(5)) + "\n{\"text\": ")
+
+        checkpoint = self.checkpoint()
+        self.assertEqual(checkpoint.load(), 4 * RATE)
+        self.assertEqual(checkpoint.start_time, 4.0)
+        self.assertEqual(checkpoint.results, [result(i) for i in range(1, 5)])
+
+        # Resumed words are shifted to file time and saved after the old ones
+        res = checkpoint.restore_times({"text": "late", "result": [{"word": "late",
+                "start": 1.0, "end": 1.5, "conf": 1.0}]})
+        self.assertEqual(res["result"][0]["start"], 5.0)
+        checkpoint.update(checkpoint.resumed_at + 2 * RATE, res)
+
+        checkpoint = self.checkpoint()
+        self.assertEqual(checkpoint.load(), 6 * RATE)
+        self.assertEqual([res["text"] for res in checkpoint.results],
+                ["word1", "word2", "word3", "word4", "late"])
+
+        checkpoint.remove()
+        self.assertEqual(os.listdir(self.tmp.name), ["a.wav"])
+
+    def test_other_source_is_not_resumed(self):
+        checkpoint = self.checkpoint()
+        checkpoint.update(RATE, result(1))
+        checkpoint.save()
+        self.assertEqual(self.checkpoint(8000).load(), 0)
+
+        with open(self.input_file, "ab") as fh:
+            fh.write(bytes(10))
+        self.assertEqual(self.checkpoint().load(), 0)
+
+        # A fresh run overwrites the stale results instead of appending to them
+        checkpoint = self.checkpoint()
+        checkpoint.update(RATE, result(7))
+        checkpoint.save()
+        checkpoint = self.checkpoint()
+        self.assertEqual(checkpoint.load(), RATE)
+        self.assertEqual(checkpoint.results, [result(7)])
+
+
+if __name__ == "__main__":
+    unittest.main()
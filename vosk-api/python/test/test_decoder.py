@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import tempfile
+import unittest
+import wave
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from vosk.transcriber import decoder
+from vosk.transcriber.decoder import (BufferReader, ReadAhead, choose_rate, ffmpeg_command,
+        is_conforming, open_decoder, parse_time, probe_rate, time_window, wav_layout)
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def write_wav(path, samples, rate=16000, channels=1):
+    with wave.open(path, "wb") as wf:
+        wf.setnchannels(channels)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes(samples)
+
+
+def ramp(n):
+    return b"".join((i % 32768).to_bytes(2, "little") for i in range(n))
+
+
+class TestDecoder(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_wav_layout(self):
+        path = os.path.join(self.dir, "a.wav")
+        write_wav(path, ramp(1000), 8000, 2)
+        layout = wav_layout(path)
+        self.assertEqual((layout.offset, layout.size, layout.sample_rate, layout.channels,
+                layout.bits), (44, 2000, 8000, 2, 16))
+        self.assertFalse(is_conforming(layout, 8000))
+        self.assertEqual(probe_rate(path), 8000)
+
+        other = os.path.join(self.dir, "a.txt")
+        with open(other, "wb") as fh:
+            fh.write(b"not a wav file")
+        self.assertIsNone(wav_layout(other))
+
+    def test_mapped_window(self):
+        path = os.path.join(self.dir, "a.wav")
+        samples = ramp(16000)
+        write_wav(path, samples)
+        reader = open_decoder(path, 16000, start=0.25, duration=0.5)
+        self.assertEqual(reader.backend, "mmap")
+        chunks = []
+        while True:
+            data = reader.read(3000)
+            if len(data) == 0:
+                break
+            chunks.append(bytes(data))
+        self.assertEqual(b"".join(chunks), samples[8000:24000])
+        del data
+        self.assertEqual(reader.close(), 0)
+
+    @unittest.skipIf(decoder.soundfile is None or decoder.upfirdn is None,
+            "requires soundfile and scipy")
+    def test_soundfile_downmix_and_resample(self):
+        path = os.path.join(self.dir, "a.wav")
+        write_wav(path, bytes(4 * 8000), 8000, 2)
+        reader = open_decoder(path, 16000)
+        self.assertEqual(reader.backend, "soundfile")
+        data = reader.read()
+        self.assertEqual(len(data), 2 * 16000)
+        self.assertEqual(reader.read(100), b"")
+        reader.close()
+
+    @unittest.skipIf(decoder.upfirdn is None, "requires scipy")
+    def test_resampler_blocks_match_whole(self):
+        x = np.sin(np.arange(5000) / 7.0)
+        whole = decoder.StreamingResampler(44100, 16000)
+        expected = np.concatenate((whole.process(x), whole.flush()))
+        blocks = decoder.StreamingResampler(44100, 16000)
+        parts = [blocks.process(x[i:i + 777]) for i in range(0, len(x), 777)]
+        result = np.concatenate(parts + [blocks.flush()])
+        self.assertEqual(len(result), -(-5000 * 16000 // 44100))
+        np.testing.assert_allclose(result, expected, atol=1e-12)
+
+    @unittest.skipIf(decoder.soundfile is None, "requires soundfile")
+    def test_read_ahead_is_bounded(self):
+        path = os.path.join(self.dir, "a.wav")
+        samples = ramp(20000)
+        write_wav(path, samples, 8000)
+        reader = ReadAhead(open_decoder(path, 8000, "soundfile"), max_bytes=4096, block_size=1024)
+        self.assertEqual(reader.backend, "soundfile")
+        chunks = []
+        while True:
+            self.assertLessEqual(reader.blocks.qsize(), 4)
+            data = reader.read(3000)
+            if len(data) == 0:
+                break
+            chunks.append(bytes(data))
+        self.assertEqual(b"".join(chunks), samples)
+        self.assertEqual(reader.close(), 0)
+        self.assertGreater(reader.decode_time, 0)
+
+    def test_read_ahead_raises_decoder_errors(self):
+        class Failing:
+            backend = "test"
+            sample_rate = 16000.0
+            decode_time = 0.0
+
+            def read(self, size):
+                raise RuntimeError("broken")
+
+            def close(self):
+                return 1
+
+        reader = ReadAhead(Failing())
+        self.assertRaises(RuntimeError, reader.read, 4000)
+        self.assertEqual(reader.close(), 1)
+
+    def test_buffer_reader(self):
+        reader = BufferReader(bytearray(b"abcdef"))
+        self.assertEqual(bytes(reader.read(4)), b"abcd")
+        self.assertEqual(bytes(reader.read()), b"ef")
+        self.assertEqual(len(reader.read(4)), 0)
+
+    def test_times_and_rates(self):
+        self.assertEqual(parse_time("1:02:03.5"), 3723.5)
+        self.assertEqual(parse_time("90"), 90.0)
+        self.assertRaises(ValueError, parse_time, "-1")
+        self.assertEqual(time_window(None, None), (0.0, None))
+        self.assertEqual(time_window(10.0, 25.0), (10.0, 15.0))
+        self.assertRaises(ValueError, time_window, 5.0, 5.0)
+        self.assertEqual(choose_rate(44100, 16000), 16000.0)
+        self.assertEqual(choose_rate(44100, 16000, native=True), 44100.0)
+        self.assertEqual(choose_rate(8000, 16000, native=True), 16000.0)
+        self.assertIn("-ss 1.5 -t 2.0 -i", ffmpeg_command("a.m4a", 16000, 1.5, 2.0))
+
+
+if __name__ == "__main__":
+    unittest.main()
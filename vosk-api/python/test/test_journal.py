@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import tempfile
+import unittest
+
+from argparse import Namespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from vosk.transcriber.journal import Journal, journal_options, write_atomic
+
+
+def make_args(**kwargs):
+    args = Namespace(model=None, model_name=None, lang="en-us", server=None,
+            output_type="txt")
+    for key, value in kwargs.items():
+        setattr(args, key, value)
+    return args
+
+
+class TestJournal(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = self.tmp.name
+        self.input_file = os.path.join(self.dir, "a.wav")
+        self.output_file = os.path.join(self.dir, "a.txt")
+        with open(self.input_file, "wb") as fh:
+            fh.write(b"RIFF")
+        write_atomic(self.output_file, "hello\n")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_options_record_output_settings(self):
+        plain = journal_options(make_args())
+        self.assertEqual(plain["output_type"], "txt")
+        self.assertNotEqual(journal_options(make_args(lang="de")), plain)
+        self.assertNotIn("window", plain)
+        for flag in ("skip_silence", "long_file", "native_rate"):
+            self.assertNotIn(flag, plain)
+            self.assertTrue(journal_options(make_args(**{flag: True}))[flag])
+        self.assertEqual(journal_options(make_args(start=1.0))["window"], [1.0, None])
+
+    def test_resume_skips_only_matching_options(self):
+        journal_file = os.path.join(self.dir, "journal")
+        plain = journal_options(make_args())
+        Journal(journal_file).record(self.input_file, self.output_file, plain)
+
+        journal = Journal(journal_file)
+        self.assertTrue(journal.is_done(self.input_file, self.output_file, plain))
+        other = journal_options(make_args(output_type="srt"))
+        self.assertFalse(journal.is_done(self.input_file, self.output_file, other))
+        self.assertEqual(journal.pending([(self.input_file, self.output_file)], other),
+                [(self.input_file, self.output_file)])
+
+    def test_changed_input_is_redone(self):
+        journal_file = os.path.join(self.dir, "journal")
+        options = journal_options(make_args())
+        Journal(journal_file).record(self.input_file, self.output_file, options)
+        with open(self.input_file, "ab") as fh:
+            fh.write(b"WAVE")
+        self.assertFalse(Journal(journal_file).is_done(self.input_file, self.output_file, options))
+
+    def test_truncated_line_is_ignored(self):
+        journal_file = os.path.join(self.dir, "journal")
+        options = journal_options(make_args())
+        Journal(journal_file).record(self.input_file, self.output_file, options)
+        with open(journal_file, "a", encoding="utf-8") as fh:
+            fh.write('{"input": ')
+        self.assertTrue(Journal(journal_file).is_done(self.input_file, self.output_file, options))
+
+    def test_write_atomic_leaves_no_temporary(self):
+        write_atomic(self.output_file, "replaced\n")
+        with open(self.output_file, encoding="utf-8") as fh:
+            self.assertEqual(fh.read(), "replaced\n")
+        self.assertEqual(sorted(os.listdir(self.dir)), ["a.txt", "a.wav"])
+
+
+if __name__ == "__main__":
+    unittest.main()
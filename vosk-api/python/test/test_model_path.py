@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import tempfile
+import unittest
+
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import vosk
+
+from vosk import Model
+
+
+class TestModelPath(unittest.TestCase):
+
+    def test_resolves_without_a_model(self):
+        with tempfile.TemporaryDirectory() as root:
+            for name in ("vosk-model-small-de-0.15", "vosk-model-en-us-0.22"):
+                os.makedirs(os.path.join(root, name))
+            with mock.patch.object(vosk, "MODEL_DIRS", [None, os.path.join(root, "missing"), root]), \
+                    mock.patch.object(Model, "__del__") as free:
+                self.assertEqual(Model.get_model_path(None, "de"),
+                        os.path.join(root, "vosk-model-small-de-0.15"))
+                self.assertEqual(Model.get_model_path("vosk-model-en-us-0.22", None),
+                        os.path.join(root, "vosk-model-en-us-0.22"))
+            free.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from vosk.transcriber.pipeline import Pipeline, Stage
+
+
+def fail_on(bad, error):
+    def func(x):
+        if x == bad:
+            raise error
+        return x
+    return func
+
+
+class TestPipeline(unittest.TestCase):
+
+    def test_failure_drops_only_that_item(self):
+        written = []
+        pipeline = Pipeline([Stage("check", fail_on(3, ValueError("bad file")), 2),
+                Stage("write", written.append)])
+        pipeline.run(range(6))
+        self.assertEqual(sorted(written), [0, 1, 2, 4, 5])
+
+    def test_exit_aborts_the_run(self):
+        written = []
+        discarded = []
+        pipeline = Pipeline([Stage("check", fail_on(3, SystemExit(1))),
+                Stage("write", written.append, discard=discarded.append)], depth=1)
+        with self.assertRaises(SystemExit):
+            pipeline.run(range(20))
+        self.assertNotIn(3, written)
+        self.assertLess(len(written) + len(discarded), 19)
+
+
+if __name__ == "__main__":
+    unittest.main()
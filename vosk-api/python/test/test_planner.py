@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import tempfile
+import unittest
+import wave
+
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from vosk.transcriber import planner
+from vosk.transcriber.planner import ProbeCache, plan_task_list, probe_audio
+
+
+def write_wav(path, seconds, rate=16000, channels=1):
+    with wave.open(path, "wb") as wf:
+        wf.setnchannels(channels)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes(bytes(2 * channels * int(seconds * rate)))
+
+
+class TestPlanner(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_wav_header_needs_no_subprocess(self):
+        path = os.path.join(self.dir, "a.wav")
+        write_wav(path, 1.5, 8000, 2)
+        with mock.patch.object(planner.subprocess, "run", side_effect=AssertionError("ffprobe ran")), \
+                mock.patch.object(planner, "soundfile", None):
+            info = probe_audio(path)
+        self.assertEqual(info, {"duration": 1.5, "sample_rate": 8000, "channels": 2})
+
+    def test_longest_first(self):
+        tasks = []
+        for name, seconds in (("short.wav", 1), ("long.wav", 3), ("mid.wav", 2)):
+            write_wav(os.path.join(self.dir, name), seconds)
+            tasks.append((os.path.join(self.dir, name), name + ".txt"))
+        tasks.append((os.path.join(self.dir, "notes.txt"), "notes.txt.txt"))
+        cache = ProbeCache(os.path.join(self.dir, "cache.json"))
+
+        planned = plan_task_list(tasks, cache)
+        self.assertEqual([os.path.basename(str(task[0])) for task in planned],
+                ["long.wav", "mid.wav", "short.wav"])
+        self.assertEqual([task[2] for task in planned], [3.0, 2.0, 1.0])
+        self.assertTrue(os.path.exists(os.path.join(self.dir, "cache.json")))
+
+    def test_cache_is_validated(self):
+        path = os.path.join(self.dir, "a.wav")
+        write_wav(path, 1)
+        cache = ProbeCache(os.path.join(self.dir, "cache.json"))
+        self.assertEqual(cache.probe(path)["duration"], 1.0)
+        cache.save()
+
+        # A rewritten file is probed again instead of served from the cache
+        write_wav(path, 2)
+        os.utime(path, ns=(0, 12345))
+        cache = ProbeCache(os.path.join(self.dir, "cache.json"))
+        self.assertEqual(cache.probe(path)["duration"], 2.0)
+
+    def test_save_prunes_stale_entries(self):
+        kept, removed = os.path.join(self.dir, "a.wav"), os.path.join(self.dir, "b.wav")
+        write_wav(kept, 1)
+        write_wav(removed, 1)
+        cache = ProbeCache(os.path.join(self.dir, "cache.json"))
+        cache.probe(kept)
+        cache.probe(removed)
+        os.remove(removed)
+        cache.save()
+
+        cache = ProbeCache(os.path.join(self.dir, "cache.json"))
+        self.assertEqual(list(cache.entries), [str(Path(kept).resolve())])
+        # No temporary file is left next to the cache
+        self.assertEqual(sorted(os.listdir(self.dir)), ["a.wav", "cache.json"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from vosk.transcriber.segmenter import (OVERLAP_SECONDS, SilenceSkipper, find_split_points,
+        plan_segments, shift_result)
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+RATE = 16000
+
+
+def noise(seconds, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.integers(-3000, 3000, int(seconds * RATE), dtype=np.int16)
+
+
+def silence(seconds):
+    return np.zeros(int(seconds * RATE), dtype=np.int16)
+
+
+@unittest.skipIf(np is None, "requires numpy")
+class TestSegmenter(unittest.TestCase):
+
+    def test_split_in_silence(self):
+        samples = np.concatenate((noise(9), silence(2), noise(9, 1)))
+        points = find_split_points(samples, RATE, segment_seconds=10, search_seconds=3)
+        self.assertEqual(len(points), 1)
+        point, clean = points[0]
+        self.assertTrue(clean)
+        self.assertTrue(9 * RATE < point < 11 * RATE)
+
+        points = find_split_points(noise(30), RATE, segment_seconds=10, search_seconds=3)
+        self.assertTrue(len(points) > 0 and not any(clean for _, clean in points))
+
+    def test_plan_segments_overlap_forced_cuts(self):
+        overlap = int(OVERLAP_SECONDS * RATE)
+        segments = plan_segments(100000, [(40000, True), (70000, False)], RATE)
+        self.assertEqual(segments, [(0, 40000, 0, 40000),
+                (40000, 70000 + overlap, 40000, 70000),
+                (70000 - overlap, 100000, 70000, 100000)])
+
+    def test_shift_result_keeps_words_by_midpoint(self):
+        res = {"result": [{"word": "a", "start": 0.0, "end": 0.4},
+                {"word": "b", "start": 0.9, "end": 1.3}]}
+        shifted = shift_result(res, 10.0, 10.0, 11.0)
+        self.assertEqual(shifted["text"], "a")
+        self.assertEqual(shifted["result"][0]["start"], 10.0)
+
+    def test_skipper_drops_long_silence(self):
+        samples = np.concatenate((noise(1), silence(5), noise(1, 1))).tobytes()
+        skipper = SilenceSkipper(RATE)
+        out = b"".join(skipper.process(samples[i:i + 4000]) for i in range(0, len(samples), 4000))
+        out += skipper.flush()
+
+        self.assertEqual(skipper.total_samples, len(samples) // 2)
+        self.assertEqual(skipper.emitted_samples, len(out) // 2)
+        self.assertEqual(skipper.emitted_samples + skipper.skipped_samples, skipper.total_samples)
+        # Everything but the padding on both sides of the silence goes
+        self.assertTrue(4 * RATE < skipper.skipped_samples < 4.3 * RATE)
+        self.assertEqual(out[-RATE * 2:], samples[-RATE * 2:])
+
+        skipped = skipper.skipped_samples / RATE
+        res = skipper.restore_times({"result": [{"word": "a", "start": 0.5, "end": 0.9},
+                {"word": "b", "start": 2.5, "end": 2.7}]})
+        self.assertEqual(res["result"][0]["start"], 0.5)
+        self.assertAlmostEqual(res["result"][1]["start"], 2.5 + skipped)
+        self.assertAlmostEqual(res["result"][1]["end"], 2.7 + skipped)
+
+
+if __name__ == "__main__":
+    unittest.main()
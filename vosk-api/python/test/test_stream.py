@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+
+import asyncio
+import io
+import json
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from vosk import AsyncRecognizer, EndEvent, FinalEvent, KaldiRecognizer, PartialEvent
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class FakeRecognizer(KaldiRecognizer):
+    """Recognizer without a native handle: a result every fourth chunk and
+    a partial naming the bytes fed since the last result"""
+
+    def __init__(self, sample_rate=8000):
+        self._sample_rate = sample_rate
+        self.chunks = []
+        self.pending = 0
+
+    def __del__(self):
+        pass
+
+    def AcceptWaveform(self, data):
+        self.chunks.append(memoryview(data).nbytes)
+        self.pending += memoryview(data).nbytes
+        if len(self.chunks) % 4 == 0:
+            self.text = "bytes {}".format(self.pending)
+            self.pending = 0
+            return True
+        return False
+
+    def Result(self):
+        return json.dumps({"text": self.text})
+
+    def PartialResult(self):
+        return json.dumps({"partial": "bytes {}".format(self.pending)})
+
+    def FinalResult(self):
+        return json.dumps({"text": "final {}".format(self.pending)})
+
+
+class Observer:
+
+    def __init__(self):
+        self.names = []
+
+    def observe(self, name, seconds):
+        self.names.append(name)
+
+
+class TestStream(unittest.TestCase):
+
+    def test_events_and_offsets(self):
+        rec = FakeRecognizer()
+        events = list(rec.stream(io.BytesIO(bytes(8000 * 5)), chunk_size=8000,
+                partial_interval=None))
+        self.assertEqual(rec.chunks, [8000] * 5)
+        self.assertEqual(events, [FinalEvent(16000, {"text": "bytes 32000"}),
+                FinalEvent(20000, {"text": "final 8000"}), EndEvent(20000)])
+
+    def test_partials_are_throttled_and_deduplicated(self):
+        rec = FakeRecognizer()
+        # 1000 samples per chunk, a partial at most every 2000 samples
+        events = list(rec.stream([bytes(2000)] * 3, partial_interval=0.25))
+        partials = [event for event in events if isinstance(event, PartialEvent)]
+        self.assertEqual([(event.offset, event.text) for event in partials],
+                [(1000, "bytes 2000"), (3000, "bytes 6000")])
+
+        rec = FakeRecognizer()
+        rec.PartialResult = lambda: json.dumps({"partial": "same"})
+        events = list(rec.stream([bytes(200)] * 3, partial_interval=0.0))
+        self.assertEqual(len([event for event in events if isinstance(event, PartialEvent)]), 1)
+
+    @unittest.skipIf(np is None, "requires numpy")
+    def test_offset_counts_samples_of_any_buffer(self):
+        rec = FakeRecognizer()
+        chunk = np.zeros(1000, dtype=np.int16)
+        events = list(rec.stream([chunk, bytearray(2000), memoryview(bytes(2000))],
+                partial_interval=None))
+        self.assertEqual(rec.chunks, [2000, 2000, 2000])
+        self.assertEqual(events[-1], EndEvent(3000))
+
+    def test_metrics_observe_every_call(self):
+        observer = Observer()
+        list(FakeRecognizer().stream([bytes(100)] * 8, partial_interval=None, metrics=observer))
+        self.assertEqual(observer.names.count("accept_waveform"), 8)
+        # Two results and the final one
+        self.assertEqual(observer.names.count("result"), 3)
+
+    def test_astream(self):
+        class Reader:
+            def __init__(self, data):
+                self.data = io.BytesIO(data)
+
+            async def read(self, size):
+                return self.data.read(size)
+
+        async def collect():
+            return [event async for event in FakeRecognizer().astream(Reader(bytes(4000 * 4)),
+                    partial_interval=None)]
+
+        events = asyncio.run(collect())
+        self.assertEqual(events, [FinalEvent(8000, {"text": "bytes 16000"}),
+                FinalEvent(8000, {"text": "final 0"}), EndEvent(8000)])
+
+    def test_async_recognizer(self):
+        async def chunks():
+            for _ in range(5):
+                yield bytes(1000)
+
+        async def collect():
+            async with AsyncRecognizer(FakeRecognizer(), partial_interval=None) as rec:
+                return [event async for event in rec.stream(chunks())]
+
+        events = asyncio.run(collect())
+        self.assertEqual([event.offset for event in events], [2000, 2500, 2500])
+        self.assertIsInstance(events[-1], EndEvent)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -6,19 +6,42 @@ import sys
 
 from multiprocessing.dummy import Pool
 from vosk import Model, KaldiRecognizer
+from vosk.transcriber.decoder import wav_layout, MappedWavDecoder
+
+CHUNK_SIZE = 2000
 
 model = Model("en-us")
 
-def recognize(line):
-    uid, fn = line.split()
-    wf = wave.open(fn, "rb")
-    rec = KaldiRecognizer(model, wf.getframerate())
+def chunks(fn):
+    # 16-bit mono WAV is fed as slices of a memory map, without copies;
+    # any other WAV is read with the wave module
+    layout = wav_layout(fn)
+    if layout is not None and layout.channels == 1 and layout.bits == 16:
+        decoder = MappedWavDecoder(fn, layout)
+        yield layout.sample_rate
+        while True:
+            data = decoder.read(CHUNK_SIZE)
+            if len(data) == 0:
+                break
+            yield data
+        decoder.close()
+        return
 
-    text = ""
+    wf = wave.open(fn, "rb")
+    yield wf.getframerate()
     while True:
-        data = wf.readframes(1000)
+        data = wf.readframes(CHUNK_SIZE // 2)
         if len(data) == 0:
             break
+        yield data
+
+def recognize(line):
+    uid, fn = line.split()
+    source = chunks(fn)
+    rec = KaldiRecognizer(model, next(source))
+
+    text = ""
+    for data in source:
         if rec.AcceptWaveform(data):
             jres = json.loads(rec.Result())
             text = text + " " + jres["text"]
@@ -28,7 +51,7 @@ def recognize(line):
 
 def main():
     p = Pool(8)
-    texts = p.map(recognize, open(sys.argv[1], encoding="uft-8").readlines())
+    texts = p.map(recognize, open(sys.argv[1], encoding="utf-8").readlines())
     print ("\n".join(texts))
 
 main()
@@ -1,9 +1,14 @@
 import os
 import sys
+import time
 import srt
 import datetime
 import json
 import enum
+import asyncio
+
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 
 import requests
 from urllib.request import urlretrieve
@@ -47,15 +52,79 @@ def list_languages():
     for lang in languages:
         print (lang)
 
+def prefetch_files(path, block_size=1 << 20):
+    """Read every file under path once so it is in the page cache
+
+    Returns the number of bytes read.
+    """
+    total = 0
+    buf = bytearray(block_size)
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                with open(os.path.join(root, name), "rb", buffering=0) as fh:
+                    if hasattr(os, "posix_fadvise"):
+                        os.posix_fadvise(fh.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+                    while True:
+                        n = fh.readinto(buf)
+                        if not n:
+                            break
+                        total += n
+            except OSError:
+                continue
+    return total
+
+def model_sample_rate(model_path):
+    """Rate a model directory was trained at, read without loading the model"""
+    for conf in ("conf/mfcc.conf", "mfcc.conf", "conf/fbank.conf"):
+        try:
+            with open(os.path.join(str(model_path), conf), encoding="utf-8") as fh:
+                for line in fh:
+                    m = match(r"\s*--sample-frequency=([0-9.]+)", line)
+                    if m:
+                        return float(m.group(1))
+        except OSError:
+            continue
+    return 16000.0
+
+
 class Model:
-    def __init__(self, model_path=None, model_name=None, lang=None):
-        if model_path is not None:
-            self._handle = _c.vosk_model_new(model_path.encode("utf-8"))
-        else:
+    def __init__(self, model_path=None, model_name=None, lang=None, prefetch=False):
+        """Load a model by path, name or language
+
+        With prefetch=True the model files are read through the page cache
+        first, so loading does not wait on lazily faulted pages.
+        """
+        if model_path is None:
             model_path = self.get_model_path(model_name, lang)
-            self._handle = _c.vosk_model_new(model_path.encode("utf-8"))
+        self.prefetched = prefetch_files(str(model_path)) if prefetch else 0
+        self._handle = _c.vosk_model_new(str(model_path).encode("utf-8"))
         if self._handle == _ffi.NULL:
             raise Exception("Failed to create a model")
+        self._path = str(model_path)
+
+    def warm_up(self, seconds=1.0):
+        """Decode a buffer of silence on a throwaway recognizer
+
+        Returns the seconds from creating the recognizer to its final
+        result. The first call after loading measures the cold start the
+        first real recognition would otherwise pay; later calls measure
+        the warm latency.
+        """
+        rate = self.sample_rate()
+        start = time.perf_counter()
+        rec = KaldiRecognizer(self, rate)
+        rec.AcceptWaveform(bytes(2 * int(rate * seconds)))
+        rec.FinalResult()
+        return time.perf_counter() - start
+
+    def sample_rate(self):
+        """Rate the acoustic model works at, from its feature config
+
+        Recognizers downsample higher rates to it themselves but cannot
+        upsample lower ones.
+        """
+        return model_sample_rate(self._path)
 
     def __del__(self):
         if _c is not None:
@@ -64,14 +133,18 @@ class Model:
     def vosk_model_find_word(self, word):
         return _c.vosk_model_find_word(self._handle, word.encode("utf-8"))
 
-    def get_model_path(self, model_name, lang):
+    # Path resolution needs no loaded model, callers resolve ahead of
+    # loading with Model.get_model_path(model_name, lang)
+    @staticmethod
+    def get_model_path(model_name, lang):
         if model_name is None:
-            model_path = self.get_model_by_lang(lang)
+            model_path = Model.get_model_by_lang(lang)
         else:
-            model_path = self.get_model_by_name(model_name)
+            model_path = Model.get_model_by_name(model_name)
         return str(model_path)
 
-    def get_model_by_name(self, model_name):
+    @staticmethod
+    def get_model_by_name(model_name):
         for directory in MODEL_DIRS:
             if directory is None or not Path(directory).exists():
                 continue
@@ -85,10 +158,11 @@ class Model:
             print("model name %s does not exist" % (model_name))
             sys.exit(1)
         else:
-            self.download_model(Path(directory, result_model[0]))
+            Model.download_model(Path(directory, result_model[0]))
             return Path(directory, result_model[0])
 
-    def get_model_by_lang(self, lang):
+    @staticmethod
+    def get_model_by_lang(lang):
         for directory in MODEL_DIRS:
             if directory is None or not Path(directory).exists():
                 continue
@@ -104,16 +178,17 @@ class Model:
             print("lang %s does not exist" % (lang))
             sys.exit(1)
         else:
-            self.download_model(Path(directory, result_model[0]))
+            Model.download_model(Path(directory, result_model[0]))
             return Path(directory, result_model[0])
 
-    def download_model(self, model_name):
+    @staticmethod
+    def download_model(model_name):
         if not (model_name.parent).exists():
             (model_name.parent).mkdir(parents=True)
         with tqdm(unit="B", unit_scale=True, unit_divisor=1024, miniters=1,
                 desc=(MODEL_PRE_URL + str(model_name.name) + ".zip").rsplit("/",
                     maxsplit=1)[-1]) as t:
-            reporthook = self.download_progress_hook(t)
+            reporthook = Model.download_progress_hook(t)
             urlretrieve(MODEL_PRE_URL + str(model_name.name) + ".zip",
                     str(model_name) + ".zip", reporthook=reporthook, data=None)
             t.total = t.n
@@ -121,7 +196,8 @@ class Model:
                 model_ref.extractall(model_name.parent)
             Path(str(model_name) + ".zip").unlink()
 
-    def download_progress_hook(self, t):
+    @staticmethod
+    def download_progress_hook(t):
         last_b = [0]
         def update_to(b=1, bsize=1, tsize=None):
             if tsize not in (None, -1):
@@ -148,9 +224,110 @@ class EndpointerMode(enum.Enum):
     LONG = 2
     VERY_LONG = 3
 
+class PartialEvent(namedtuple("PartialEvent", ["offset", "result"])):
+    """Changed partial hypothesis, offset is in samples fed so far"""
+    __slots__ = ()
+
+    @property
+    def text(self):
+        return self.result.get("partial", "")
+
+class FinalEvent(namedtuple("FinalEvent", ["offset", "result"])):
+    """Finished utterance, offset is in samples fed so far"""
+    __slots__ = ()
+
+    @property
+    def text(self):
+        return self.result.get("text", "")
+
+class EndEvent(namedtuple("EndEvent", ["offset"])):
+    """End of the stream, offset is the total number of samples fed"""
+    __slots__ = ()
+
+def _as_char_buffer(data):
+    # cffi takes bytes for a char * as is; other buffers are wrapped, not copied
+    if isinstance(data, bytes):
+        return data
+    return _ffi.from_buffer(data)
+
+def _iter_chunks(source, chunk_size):
+    if hasattr(source, "read"):
+        while True:
+            data = source.read(chunk_size)
+            if len(data) == 0:
+                return
+            yield data
+    else:
+        for data in source:
+            if len(data) > 0:
+                yield data
+
+async def _aiter_chunks(source, chunk_size):
+    if hasattr(source, "read"):
+        while True:
+            data = await source.read(chunk_size)
+            if len(data) == 0:
+                return
+            yield data
+    else:
+        async for data in source:
+            if len(data) > 0:
+                yield data
+
+class _StreamState:
+    """The AcceptWaveform/Result/PartialResult state machine behind stream()
+
+    metrics, when given, gets observe("accept_waveform", seconds) for every
+    AcceptWaveform call and observe("result", seconds) for every result
+    fetched and parsed.
+    """
+
+    def __init__(self, rec, partial_interval, metrics=None):
+        self.rec = rec
+        self.metrics = metrics
+        self.offset = 0
+        self.last_partial = ""
+        self.partial_samples = None
+        if partial_interval is not None:
+            self.partial_samples = int(partial_interval * rec._sample_rate)
+        self.next_partial = 0
+
+    def result(self, get):
+        if self.metrics is None:
+            return json.loads(get())
+        start = time.perf_counter()
+        res = json.loads(get())
+        self.metrics.observe("result", time.perf_counter() - start)
+        return res
+
+    def feed(self, data):
+        self.offset += memoryview(data).nbytes // 2
+        if self.metrics is None:
+            accepted = self.rec.AcceptWaveform(data)
+        else:
+            start = time.perf_counter()
+            accepted = self.rec.AcceptWaveform(data)
+            self.metrics.observe("accept_waveform", time.perf_counter() - start)
+        if accepted:
+            self.last_partial = ""
+            return [FinalEvent(self.offset, self.result(self.rec.Result))]
+        if self.partial_samples is None or self.offset < self.next_partial:
+            return []
+        self.next_partial = self.offset + self.partial_samples
+        event = PartialEvent(self.offset, self.result(self.rec.PartialResult))
+        if event.text == self.last_partial:
+            return []
+        self.last_partial = event.text
+        return [event]
+
+    def finish(self):
+        return [FinalEvent(self.offset, self.result(self.rec.FinalResult)),
+                EndEvent(self.offset)]
+
 class KaldiRecognizer:
 
     def __init__(self, *args):
+        self._sample_rate = args[1] if len(args) > 1 else None
         if len(args) == 2:
             self._handle = _c.vosk_recognizer_new(args[0]._handle, args[1])
         elif len(args) == 3 and isinstance(args[2], SpkModel):
@@ -193,6 +370,13 @@ class KaldiRecognizer:
         _c.vosk_recognizer_set_grm(self._handle, grammar.encode("utf-8"))
 
     def AcceptWaveform(self, data):
+        """Feed 16-bit mono audio, returns True at the end of an utterance
+
+        data may be bytes or any buffer such as a bytearray, a memoryview
+        of an mmap or a numpy int16 array; buffers are passed to the
+        recognizer in place, without a copy.
+        """
+        data = _as_char_buffer(data)
         res = _c.vosk_recognizer_accept_waveform(self._handle, data, len(data))
         if res < 0:
             raise Exception("Failed to process waveform")
@@ -210,6 +394,35 @@ class KaldiRecognizer:
     def Reset(self):
         return _c.vosk_recognizer_reset(self._handle)
 
+    def stream(self, source, chunk_size=4000, partial_interval=0.5, metrics=None):
+        """Feed 16-bit mono audio and yield PartialEvent, FinalEvent and EndEvent
+
+        source is a file-like object with read() or an iterable of byte
+        chunks. Partials are only reported when their text changes and at
+        most once per partial_interval seconds of audio; None turns them off.
+        metrics is an optional object whose observe(name, seconds) receives
+        the time of every AcceptWaveform call and result parse.
+        """
+        state = _StreamState(self, partial_interval, metrics)
+        for data in _iter_chunks(source, chunk_size):
+            yield from state.feed(data)
+        yield from state.finish()
+
+    async def astream(self, source, chunk_size=4000, partial_interval=0.5, executor=None,
+            metrics=None):
+        """Async version of stream() for asyncio readers and async iterables
+
+        Native calls run on executor (the loop default when None) so the
+        event loop is not blocked while a chunk is decoded.
+        """
+        loop = asyncio.get_running_loop()
+        state = _StreamState(self, partial_interval, metrics)
+        async for data in _aiter_chunks(source, chunk_size):
+            for event in await loop.run_in_executor(executor, state.feed, data):
+                yield event
+        for event in await loop.run_in_executor(executor, state.finish):
+            yield event
+
     def SrtResult(self, stream, words_per_line = 7):
         results = []
 
@@ -237,6 +450,113 @@ class KaldiRecognizer:
 
         return srt.compose(subs)
 
+class AsyncRecognizer:
+    """Drive a KaldiRecognizer from asyncio without blocking the event loop
+
+    Native calls run on a dedicated single-thread executor. Audio pushed
+    with accept_waveform() and events waiting to be read both sit in
+    bounded queues, so a producer faster than the decoder is made to wait
+    instead of buffering without limit. cancel() or aclose() abandon the
+    stream; a chunk already being decoded finishes on the executor.
+    """
+
+    def __init__(self, rec, partial_interval=0.5, max_pending=4, executor=None):
+        self._state = _StreamState(rec, partial_interval)
+        self._own_executor = executor is None
+        self._executor = executor or ThreadPoolExecutor(max_workers=1)
+        self._input = asyncio.Queue(max_pending)
+        self._output = asyncio.Queue(max_pending)
+        self._task = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+    def _start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                data = await self._input.get()
+                if data is None:
+                    events = await loop.run_in_executor(self._executor, self._state.finish)
+                else:
+                    events = await loop.run_in_executor(self._executor, self._state.feed, data)
+                for event in events:
+                    await self._output.put(event)
+                if data is None:
+                    return
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await self._output.put(e)
+
+    async def accept_waveform(self, data):
+        """Queue a chunk of audio, waiting while the decoder is behind"""
+        self._start()
+        await self._input.put(bytes(data))
+
+    async def finish(self):
+        """Mark the end of the audio, the final events follow"""
+        self._start()
+        await self._input.put(None)
+
+    def poll(self):
+        """Return the events that are ready without waiting"""
+        events = []
+        while not self._output.empty():
+            event = self._output.get_nowait()
+            if isinstance(event, Exception):
+                raise event
+            events.append(event)
+        return events
+
+    async def __aiter__(self):
+        while True:
+            event = await self._output.get()
+            if isinstance(event, Exception):
+                raise event
+            yield event
+            if isinstance(event, EndEvent):
+                return
+
+    async def stream(self, source, chunk_size=4000):
+        """Feed source (as for KaldiRecognizer.astream) and yield its events"""
+        async def produce():
+            try:
+                async for data in _aiter_chunks(source, chunk_size):
+                    await self.accept_waveform(data)
+            except Exception as e:
+                await self._output.put(e)
+            else:
+                await self.finish()
+
+        producer = asyncio.get_running_loop().create_task(produce())
+        try:
+            async for event in self:
+                yield event
+        finally:
+            producer.cancel()
+
+    def cancel(self):
+        if self._task is not None:
+            self._task.cancel()
+        if self._own_executor:
+            self._executor.shutdown(wait=False)
+
+    async def aclose(self):
+        self.cancel()
+        if self._task is not None:
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
 def SetLogLevel(level):
     return _c.vosk_set_log_level(level)
 
@@ -274,6 +594,7 @@ class BatchRecognizer:
         _c.vosk_batch_recognizer_free(self._handle)
 
     def AcceptWaveform(self, data):
+        data = _as_char_buffer(data)
         res = _c.vosk_batch_recognizer_accept_waveform(self._handle, data, len(data))
 
     def Result(self):
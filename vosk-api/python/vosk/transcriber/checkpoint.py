@@ -0,0 +1,113 @@
+import json
+import logging
+import os
+
+from timeit import default_timer as timer
+from vosk.transcriber.journal import write_atomic
+
+CHECKPOINT_SUFFIX = ".checkpoint"
+RESULTS_SUFFIX = ".results"
+CHECKPOINT_INTERVAL = 60.0
+
+
+class Checkpoint:
+    """Progress of one long transcription, kept in a sidecar next to its output
+
+    At utterance boundaries, at most every interval seconds of audio, the
+    results finished since the last save are appended to a JSON lines
+    file, then the sample offset reached and the length of that file are
+    written atomically. A save costs the new results only, and a rerun
+    after a crash seeks the decoder to that offset and continues.
+    The input size, mtime, decode rate and window are recorded too, so a
+    sidecar left over from a different input is never resumed. Offsets
+    and word times count from the start of the window.
+    """
+
+    def __init__(self, input_file, output_file, sample_rate, window=(0.0, None),
+            interval=CHECKPOINT_INTERVAL):
+        self.path = str(output_file) + CHECKPOINT_SUFFIX
+        self.results_path = self.path + RESULTS_SUFFIX
+        self.sample_rate = sample_rate
+        st = os.stat(input_file)
+        self.source = {"input": str(input_file), "size": st.st_size,
+                "mtime": st.st_mtime_ns, "sample_rate": sample_rate, "window": list(window)}
+        self.interval = int(interval * sample_rate)
+        self.offset = 0
+        self.resumed_at = 0
+        self.saved_offset = 0
+        self.results = []
+        # Results and bytes of the results file the saved offset accounts for
+        self.saved_results = 0
+        self.results_size = 0
+        self.saves = 0
+        self.save_time = 0.0
+
+    def load(self):
+        try:
+            with open(self.path, encoding="utf-8") as fh:
+                state = json.load(fh)
+        except (OSError, ValueError):
+            return 0
+        if state.get("source") != self.source or "results_size" not in state:
+            return 0
+        try:
+            with open(self.results_path, "rb") as fh:
+                data = fh.read(state["results_size"])
+            # Anything past the recorded size was appended after the last save
+            results = [json.loads(line) for line in data.splitlines()]
+        except (OSError, ValueError):
+            return 0
+        if len(data) != state["results_size"]:
+            return 0
+        self.offset = self.saved_offset = self.resumed_at = state["offset"]
+        self.results = results
+        self.saved_results = len(results)
+        self.results_size = len(data)
+        logging.info("Resuming {} at {:.1f} sec".format(self.source["input"], self.start_time))
+        return self.offset
+
+    @property
+    def start_time(self):
+        return self.resumed_at / self.sample_rate
+
+    def restore_times(self, res):
+        # The resumed stream starts at zero, shift its words to file time
+        if self.resumed_at:
+            for word in res.get("result", []):
+                word["start"] += self.start_time
+                word["end"] += self.start_time
+        return res
+
+    def update(self, offset, res):
+        self.results.append(res)
+        self.offset = offset
+        if self.offset - self.saved_offset >= self.interval:
+            self.save()
+
+    def save(self):
+        start_time = timer()
+        lines = "".join(json.dumps(res) + "\n" for res in self.results[self.saved_results:])
+        with open(self.results_path, "ab") as fh:
+            # Drop what a crashed run appended after its last save
+            fh.truncate(self.results_size)
+            fh.write(lines.encode("utf-8"))
+            fh.flush()
+            os.fsync(fh.fileno())
+            self.results_size = fh.tell()
+        write_atomic(self.path, json.dumps({"source": self.source,
+                "offset": self.offset, "results_size": self.results_size}))
+        self.saved_offset = self.offset
+        self.saved_results = len(self.results)
+        self.saves += 1
+        self.save_time += timer() - start_time
+
+    def remove(self):
+        for path in (self.path, self.results_path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def log_summary(self, elapsed):
+        logging.info("Wrote {} checkpoints in {:.3f} sec ({:.2%} of {:.3f} sec)".format(
+            self.saves, self.save_time, self.save_time / max(elapsed, 1e-9), elapsed))
@@ -8,6 +8,9 @@ import os
 from pathlib import Path
 from vosk import list_models, list_languages
 from vosk.transcriber.transcriber import Transcriber
+from vosk.transcriber.planner import plan_task_list
+from vosk.transcriber.journal import journal_options, open_journal
+from vosk.transcriber.decoder import parse_time, time_window
 
 parser = argparse.ArgumentParser(
         description = "Transcribe audio file and save result in selected format")
@@ -41,6 +44,48 @@ parser.add_argument(
 parser.add_argument(
         "--tasks", "-ts", default=10, type=int,
         help="number of parallel recognition tasks")
+parser.add_argument(
+        "--long-file", default=False, action="store_true",
+        help="split each file at silences and recognize the parts in parallel, uses --tasks workers")
+parser.add_argument(
+        "--skip-silence", default=False, action="store_true",
+        help="drop long silences before recognition, word times stay in file time")
+parser.add_argument(
+        "--resume", default=False, action="store_true",
+        help="skip inputs the journal records as already transcribed")
+parser.add_argument(
+        "--resumable", default=False, action="store_true",
+        help="checkpoint progress next to each output every minute of audio, a rerun after a "\
+                "crash continues from the last checkpoint instead of the start of the file")
+parser.add_argument(
+        "--journal", type=str,
+        help="completion journal path, defaults to a file in the output directory")
+parser.add_argument(
+        "--no-pipeline", default=False, action="store_true",
+        help="decode, recognize and write each file on one worker instead of in overlapping stages")
+parser.add_argument(
+        "--native-rate", default=False, action="store_true",
+        help="keep the source sample rate when it is at or above the model rate, the recognizer "\
+                "downsamples it; otherwise audio is decoded at the model rate")
+parser.add_argument(
+        "--decoder", default="auto", choices=["auto", "soundfile", "ffmpeg"],
+        help="audio decoder: auto maps 16 kHz mono WAV, decodes WAV/FLAC/OGG in-process "\
+                "with soundfile and uses ffmpeg for the rest; soundfile or ffmpeg force one")
+parser.add_argument(
+        "--start", type=parse_time,
+        help="transcribe from this time on, in seconds, MM:SS or HH:MM:SS; "\
+                "word times stay in file time")
+parser.add_argument(
+        "--end", type=parse_time,
+        help="stop transcribing at this time, in seconds, MM:SS or HH:MM:SS")
+parser.add_argument(
+        "--warm-up", default=False, action="store_true",
+        help="prefetch the model files into the page cache and decode silence once before "\
+                "the first input, logging cold and warm first-result latency")
+parser.add_argument(
+        "--metrics", type=str,
+        help="write per-stage latency histograms to this file at the end of the run, "\
+                "as JSON when it ends in .json and in Prometheus text format otherwise")
 parser.add_argument(
         "--log-level", default="INFO",
         help="logging level")
@@ -59,6 +104,12 @@ def main():
         list_languages()
         return
 
+    try:
+        time_window(args.start, args.end)
+    except ValueError as e:
+        logging.info(e)
+        sys.exit(1)
+
     if not args.input:
         logging.info("Please specify input file or directory")
         sys.exit(1)
@@ -68,8 +119,6 @@ def main():
             "please specify an existing file/directory")
         sys.exit(1)
 
-    transcriber = Transcriber(args)
-
     if Path(args.input).is_dir():
         task_list = [(Path(args.input, fn),
             Path(args.output,
@@ -83,6 +132,17 @@ def main():
         logging.info("Wrong arguments")
         sys.exit(1)
 
+    journal = open_journal(args)
+    if args.resume is True and journal is not None:
+        task_list = journal.pending(task_list, journal_options(args))
+        if len(task_list) == 0:
+            logging.info("All files are already transcribed")
+            return
+
+    # Starts loading the model, which then overlaps probing the inputs
+    transcriber = Transcriber(args, journal)
+    if Path(args.input).is_dir():
+        task_list = plan_task_list(task_list)
     transcriber.process_task_list(task_list)
 
 if __name__ == "__main__":
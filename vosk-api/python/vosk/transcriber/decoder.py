@@ -0,0 +1,411 @@
+import logging
+import mmap
+import os
+import shlex
+import struct
+import subprocess
+import threading
+
+from collections import namedtuple
+from math import gcd
+from queue import Queue, Full
+from timeit import default_timer as timer
+
+try:
+    import numpy as np
+    import soundfile
+except ImportError:
+    soundfile = None
+
+try:
+    from scipy.signal import firwin, upfirdn
+except ImportError:
+    upfirdn = None
+
+BLOCK_FRAMES = 8192
+# PCM decoded ahead of the recognizer at most, about two minutes at 16 kHz
+READ_AHEAD_BYTES = 1 << 22
+WAVE_FORMAT_PCM = 1
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+WavLayout = namedtuple("WavLayout", ["offset", "size", "sample_rate", "channels", "bits"])
+
+
+def wav_layout(infile):
+    """Where the samples of a PCM WAV file are, None if it is not one
+
+    Only the header is read. A data size left at 0 or 0xFFFFFFFF by a
+    streaming writer, or one past the end of the file, is taken to mean
+    the rest of the file.
+    """
+    with open(infile, "rb") as fh:
+        header = fh.read(12)
+        if len(header) < 12 or header[:4] != b"RIFF" or header[8:12] != b"WAVE":
+            return None
+        file_size = os.fstat(fh.fileno()).st_size
+        fmt = None
+        while True:
+            chunk = fh.read(8)
+            if len(chunk) < 8:
+                return None
+            chunk_id, size = struct.unpack("<4sI", chunk)
+            if chunk_id == b"data":
+                break
+            body = fh.read(size + size % 2)
+            if chunk_id == b"fmt " and len(body) >= 16:
+                tag, channels, rate, _, _, bits = struct.unpack("<HHIIHH", body[:16])
+                if tag == WAVE_FORMAT_EXTENSIBLE and len(body) >= 26:
+                    tag = struct.unpack("<H", body[24:26])[0]
+                fmt = (tag, channels, rate, bits)
+
+        if fmt is None or fmt[0] != WAVE_FORMAT_PCM:
+            return None
+        offset = fh.tell()
+        rest = file_size - offset
+        if size == 0 or size > rest:
+            size = rest
+        block = fmt[1] * fmt[3] // 8
+        return WavLayout(offset, size - size % max(block, 1), fmt[2], fmt[1], fmt[3])
+
+
+def is_conforming(layout, sample_rate):
+    """True when the data chunk is already what the recognizer takes"""
+    return (layout is not None and layout.channels == 1 and layout.bits == 16
+            and layout.sample_rate == int(sample_rate))
+
+
+class StreamingResampler:
+    """Polyphase resampler that keeps its history between blocks
+
+    Same filter as scipy.signal.resample_poly, so resampling block by
+    block gives the same samples as resampling the whole file.
+    """
+
+    def __init__(self, in_rate, out_rate):
+        common = gcd(int(in_rate), int(out_rate))
+        self.up = int(out_rate) // common
+        self.down = int(in_rate) // common
+
+        max_rate = max(self.up, self.down)
+        half_len = 10 * max_rate
+        self.h = firwin(2 * half_len + 1, 1.0 / max_rate, window=("kaiser", 5.0)) * self.up
+        self.n_taps = -(-len(self.h) // self.up)
+        self.delay = half_len
+
+        self.history = np.zeros(self.n_taps - 1)
+        self.n_in = 0
+        self.n_out = 0
+
+    def process(self, x, limit=None):
+        buf = np.concatenate((self.history, x))
+        base = self.n_in - len(self.history)
+        self.n_in += len(x)
+        self.history = buf[len(buf) - (self.n_taps - 1):]
+
+        # Output k sits at k * down + delay on the upsampled grid
+        n_ready = max(0, (self.n_in * self.up - 1 - self.delay) // self.down + 1)
+        if limit is not None:
+            n_ready = min(n_ready, limit)
+        if n_ready <= self.n_out:
+            return np.zeros(0)
+
+        first = self.n_out * self.down + self.delay - base * self.up
+        shift = -first % self.down
+        y = upfirdn(np.concatenate((np.zeros(shift), self.h)), buf, self.up, self.down)
+        start = (first + shift) // self.down
+        out = y[start:start + n_ready - self.n_out]
+        self.n_out = n_ready
+        return out
+
+    def flush(self):
+        expected = -(-self.n_in * self.up // self.down)
+        return self.process(np.zeros(self.n_taps), limit=expected)
+
+
+def probe_rate(infile):
+    """Sample rate of infile from its header, ffprobe as the last resort, None if unknown"""
+    try:
+        layout = wav_layout(infile)
+    except OSError:
+        return None
+    if layout is not None:
+        return layout.sample_rate
+    if soundfile is not None:
+        try:
+            return soundfile.info(str(infile)).samplerate
+        except RuntimeError:
+            pass
+    from vosk.transcriber.planner import probe_audio
+    try:
+        info = probe_audio(infile)
+    except FileNotFoundError:
+        return None
+    return info["sample_rate"] if info and info["sample_rate"] > 0 else None
+
+
+def choose_rate(source_rate, model_rate, native=False):
+    """Rate to decode at
+
+    The model rate by default. With native, a source at or above the
+    model rate is passed through as is, since the recognizer downsamples
+    by itself; lower rates still have to be upsampled to the model rate.
+    """
+    if native and source_rate is not None and source_rate >= model_rate:
+        return float(source_rate)
+    return float(model_rate)
+
+
+def parse_time(value):
+    """Seconds from "SS", "MM:SS" or "HH:MM:SS", fractions allowed"""
+    seconds = 0.0
+    for part in str(value).split(":"):
+        seconds = 60 * seconds + float(part)
+    if seconds < 0:
+        raise ValueError("negative time {}".format(value))
+    return seconds
+
+
+def time_window(start=None, end=None):
+    """(start, duration) in seconds for the decoders, from start and end times"""
+    start = start or 0.0
+    if end is None:
+        return start, None
+    if end <= start:
+        raise ValueError("end {} sec is not after start {} sec".format(end, start))
+    return start, end - start
+
+
+class BufferReader:
+    """File-like reads over PCM already in memory, as memoryview slices"""
+
+    def __init__(self, data):
+        self.view = memoryview(data).cast("B")
+        self.pos = 0
+
+    def read(self, size=-1):
+        end = len(self.view) if size < 0 else min(self.pos + size, len(self.view))
+        data = self.view[self.pos:end]
+        self.pos = end
+        return data
+
+
+class MappedWavDecoder(BufferReader):
+    """16-bit mono WAV at the model rate, read straight from a memory map
+
+    read() returns memoryview slices of the mapping, which
+    KaldiRecognizer.AcceptWaveform takes without copying, so there is no
+    decoding and no per-chunk copy at all.
+    """
+
+    backend = "mmap"
+
+    def __init__(self, infile, layout, start=0.0, duration=None):
+        with open(infile, "rb") as fh:
+            self.map = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        first = min(2 * round(start * layout.sample_rate), layout.size)
+        last = layout.size
+        if duration is not None:
+            last = min(first + 2 * int(duration * layout.sample_rate), layout.size)
+        super().__init__(memoryview(self.map)[layout.offset + first:layout.offset + last])
+        self.sample_rate = float(layout.sample_rate)
+        self.decode_time = 0.0
+
+    def close(self):
+        self.view.release()
+        try:
+            self.map.close()
+        except BufferError:
+            # A caller still holds a slice, the mapping goes with it
+            pass
+        return 0
+
+
+def open_mapped(infile, sample_rate, start=0.0, duration=None):
+    """MappedWavDecoder when infile is conforming PCM WAV, else None"""
+    try:
+        layout = wav_layout(infile)
+    except OSError:
+        return None
+    if not is_conforming(layout, sample_rate) or layout.size == 0:
+        return None
+    return MappedWavDecoder(infile, layout, start, duration)
+
+
+class SoundFileDecoder:
+    """In-process decoder for the formats libsndfile reads
+
+    read() returns mono s16le at sample_rate like the ffmpeg pipe does,
+    for duration seconds (to the end when None) from start seconds into
+    the file.
+    """
+
+    backend = "soundfile"
+
+    def __init__(self, infile, sample_rate, start=0.0, duration=None):
+        self.file = soundfile.SoundFile(str(infile))
+        if start:
+            self.file.seek(min(round(start * self.file.samplerate), self.file.frames))
+        self.remaining = None if duration is None else int(duration * self.file.samplerate)
+        self.resampler = None
+        if self.file.samplerate != int(sample_rate):
+            if upfirdn is None:
+                self.file.close()
+                raise RuntimeError("scipy is needed to resample {}".format(infile))
+            self.resampler = StreamingResampler(self.file.samplerate, int(sample_rate))
+        self.sample_rate = float(sample_rate)
+        self.buf = bytearray()
+        self.done = False
+        self.decode_time = 0.0
+
+    def decode_block(self):
+        plain = self.resampler is None and self.file.channels == 1
+        frames = BLOCK_FRAMES if self.remaining is None else min(BLOCK_FRAMES, self.remaining)
+        x = self.file.read(frames, dtype="int16" if plain else "float64", always_2d=True)
+        if self.remaining is not None:
+            self.remaining -= len(x)
+        if len(x) == 0:
+            self.done = True
+            if self.resampler is None:
+                return b""
+            y = self.resampler.flush()
+        elif plain:
+            return x.tobytes()
+        else:
+            y = x.mean(axis=1)
+            if self.resampler is not None:
+                y = self.resampler.process(y)
+        return np.clip(np.round(y * 32768.0), -32768, 32767).astype(np.int16).tobytes()
+
+    def read(self, size=-1):
+        start_time = timer()
+        while (size < 0 or len(self.buf) < size) and not self.done:
+            self.buf += self.decode_block()
+        if size < 0:
+            size = len(self.buf)
+        data = bytes(self.buf[:size])
+        del self.buf[:size]
+        self.decode_time += timer() - start_time
+        return data
+
+    def close(self):
+        self.file.close()
+        return 0
+
+
+def ffmpeg_command(infile, sample_rate, start=0.0, duration=None):
+    # -ss and -t before -i seek in the input instead of decoding up to start
+    window = "-ss {} ".format(start)
+    if duration is not None:
+        window += "-t {} ".format(duration)
+    return "ffmpeg -nostdin -loglevel quiet {}-i \'{}\' -ar {} -ac 1 -f s16le -".format(
+            window, str(infile), int(sample_rate))
+
+
+class FfmpegDecoder:
+    """ffmpeg subprocess for containers libsndfile cannot open, such as m4a"""
+
+    backend = "ffmpeg"
+
+    def __init__(self, infile, sample_rate, start=0.0, duration=None):
+        cmd = shlex.split(ffmpeg_command(infile, sample_rate, start, duration))
+        self.proc = subprocess.Popen(cmd, stdout=subprocess.PIPE)
+        self.sample_rate = float(sample_rate)
+        self.decode_time = 0.0
+
+    def read(self, size=-1):
+        start_time = timer()
+        data = self.proc.stdout.read(size)
+        self.decode_time += timer() - start_time
+        return data
+
+    def close(self):
+        self.proc.stdout.close()
+        return self.proc.wait()
+
+
+class ReadAhead:
+    """Run a decoder on a background thread, at most max_bytes ahead of read()
+
+    Decoding the rest of a file then overlaps recognizing the start of
+    it without the whole file ever being held in memory. backend,
+    sample_rate and decode_time are those of the wrapped decoder.
+    """
+
+    def __init__(self, decoder, max_bytes=READ_AHEAD_BYTES, block_size=2 * BLOCK_FRAMES):
+        self.decoder = decoder
+        self.backend = decoder.backend
+        self.sample_rate = decoder.sample_rate
+        self.blocks = Queue(maxsize=max(1, max_bytes // block_size))
+        self.block_size = block_size
+        self.view = memoryview(b"")
+        self.eof = False
+        self.error = None
+        self.stopped = False
+        self.thread = threading.Thread(target=self.fill, name="read-ahead", daemon=True)
+        self.thread.start()
+
+    @property
+    def decode_time(self):
+        return self.decoder.decode_time
+
+    def fill(self):
+        try:
+            while not self.stopped:
+                data = self.decoder.read(self.block_size)
+                self.put(data)
+                if len(data) == 0:
+                    return
+        except Exception as e:
+            self.error = e
+            self.put(b"")
+
+    def put(self, data):
+        # Time out now and then so close() is not stuck behind a full queue
+        while not self.stopped:
+            try:
+                self.blocks.put(data, timeout=0.1)
+                return
+            except Full:
+                continue
+
+    def read(self, size=-1):
+        if size < 0:
+            return b"".join(iter(lambda: bytes(self.read(self.block_size)), b""))
+        if len(self.view) == 0 and not self.eof:
+            data = self.blocks.get()
+            if len(data) == 0:
+                self.eof = True
+                if self.error is not None:
+                    raise self.error
+            self.view = memoryview(data).cast("B")
+        data, self.view = self.view[:size], self.view[size:]
+        return data
+
+    def close(self):
+        self.stopped = True
+        self.thread.join()
+        return self.decoder.close()
+
+
+def open_soundfile(infile, sample_rate, start=0.0, duration=None):
+    """SoundFileDecoder for infile, None if soundfile is missing or cannot read it"""
+    if soundfile is None:
+        return None
+    try:
+        return SoundFileDecoder(infile, sample_rate, start, duration)
+    except RuntimeError as e:
+        logging.debug("Decoding {} with ffmpeg: {}".format(infile, e))
+        return None
+
+
+def open_decoder(infile, sample_rate, backend="auto", start=0.0, duration=None):
+    if backend == "soundfile":
+        if soundfile is None:
+            raise RuntimeError("soundfile is not installed")
+        return SoundFileDecoder(infile, sample_rate, start, duration)
+    if backend == "auto":
+        decoder = open_mapped(infile, sample_rate, start, duration) \
+                or open_soundfile(infile, sample_rate, start, duration)
+        if decoder is not None:
+            return decoder
+    return FfmpegDecoder(infile, sample_rate, start, duration)
@@ -0,0 +1,136 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+
+from pathlib import Path
+
+JOURNAL_NAME = ".vosk-transcriber.journal"
+
+# mkstemp creates files as 0600, outputs should get the usual permissions
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def file_digest(infile, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(infile, "rb") as fh:
+        while True:
+            block = fh.read(block_size)
+            if len(block) == 0:
+                break
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def write_atomic(output_file, text):
+    # Write next to the target and rename over it, so a crash never leaves
+    # a truncated file that looks finished
+    output_file = Path(output_file)
+    fd, tmp_name = tempfile.mkstemp(dir=output_file.parent,
+            prefix="." + output_file.name + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            fh.write(text)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.chmod(tmp_name, 0o666 & ~_UMASK)
+        os.replace(tmp_name, output_file)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+
+def journal_options(args):
+    # Everything that changes the content of an output file
+    options = {"model": args.model, "model_name": args.model_name,
+            "lang": args.lang, "server": args.server,
+            "output_type": args.output_type}
+    window = [getattr(args, "start", None), getattr(args, "end", None)]
+    if window != [None, None]:
+        options["window"] = window
+    # Recorded only when set, so journals written without them still match
+    for flag in ("skip_silence", "long_file", "native_rate"):
+        if getattr(args, flag, False) is True:
+            options[flag] = True
+    return options
+
+
+def open_journal(args):
+    if args.journal is not None:
+        return Journal(args.journal)
+    if args.output == "":
+        return None
+    if Path(args.input).is_dir():
+        return Journal(Path(args.output, JOURNAL_NAME))
+    return Journal(Path(args.output).parent / JOURNAL_NAME)
+
+
+class Journal:
+    """Append-only JSONL record of completed inputs
+
+    Each line holds the input path, its size, mtime and sha256, the
+    options that shaped the output and the output path. A file counts as
+    done when all of them still match, so a resumed run only has to stat
+    the inputs it already finished.
+    """
+
+    def __init__(self, journal_file):
+        self.journal_file = Path(journal_file)
+        self.entries = {}
+        self.lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.journal_file, encoding="utf-8") as fh:
+                for line in fh:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # Last line may be cut short by a crash
+                        continue
+                    self.entries[entry["input"]] = entry
+        except OSError:
+            pass
+
+    def is_done(self, input_file, output_file, options):
+        entry = self.entries.get(str(Path(input_file).resolve()))
+        if entry is None or entry["options"] != options:
+            return False
+        if entry["output"] != str(output_file) or not Path(output_file).exists():
+            return False
+
+        st = os.stat(input_file)
+        if entry["size"] != st.st_size:
+            return False
+        if entry["mtime"] == st.st_mtime_ns:
+            return True
+        # Touched but maybe unchanged, fall back to the content hash
+        return entry["sha256"] == file_digest(input_file)
+
+    def record(self, input_file, output_file, options):
+        st = os.stat(input_file)
+        entry = {"input": str(Path(input_file).resolve()),
+                "size": st.st_size,
+                "mtime": st.st_mtime_ns,
+                "sha256": file_digest(input_file),
+                "options": options,
+                "output": str(output_file)}
+        line = json.dumps(entry) + "\n"
+        with self.lock:
+            with open(self.journal_file, "a", encoding="utf-8") as fh:
+                fh.write(line)
+                fh.flush()
+                os.fsync(fh.fileno())
+            self.entries[entry["input"]] = entry
+
+    def pending(self, task_list, options):
+        remaining = [task for task in task_list
+                if not self.is_done(task[0], task[1], options)]
+        skipped = len(task_list) - len(remaining)
+        if skipped > 0:
+            logging.info("Resuming, skipping {} completed files".format(skipped))
+        return remaining
@@ -0,0 +1,136 @@
+import json
+import logging
+import threading
+
+from bisect import bisect_left
+from contextlib import contextmanager
+from timeit import default_timer as timer
+from vosk.transcriber.journal import write_atomic
+
+# Upper bounds in seconds, from one AcceptWaveform chunk up to a whole file
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+        0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+# Upper bounds for seconds of audio decoded per second
+THROUGHPUT_BUCKETS = (1.0, 10.0, 25.0, 50.0, 100.0, 250.0, 500.0, 1000.0, 2500.0, 5000.0)
+
+# Stages timed on the hot path; the name becomes vosk_transcriber_<name>
+STAGES = {
+    "decoder_open": "Seconds to open a decoder, spawning ffmpeg included",
+    "accept_waveform": "Seconds per AcceptWaveform call",
+    "result": "Seconds per Result, FinalResult or PartialResult call including the JSON parse",
+    "format": "Seconds to format the results of one file",
+    "write_output": "Seconds to write one output file",
+    "server_chunk": "Seconds from sending a chunk to the server until its reply",
+    "file": "Seconds from opening a file to its written output",
+}
+THROUGHPUT = {
+    "decode_speed": "Seconds of audio decoded per second of decoder time",
+}
+PREFIX = "vosk_transcriber_"
+
+
+class Histogram:
+    """Fixed-bucket histogram in the Prometheus sense: cumulative counts per upper bound"""
+
+    def __init__(self, name, help_text, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def cumulative(self):
+        with self.lock:
+            counts = list(self.counts)
+        total = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            total += count
+            yield bound, total
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile, None when empty"""
+        if self.count == 0:
+            return None
+        for bound, total in self.cumulative():
+            if total >= q * self.count:
+                return bound
+        return float("inf")
+
+
+class Metrics:
+    """Per-stage histograms of one transcriber run
+
+    Hot paths call observe() with a duration they measured, or use
+    time(); both return at once when the metrics are disabled, and call
+    sites check enabled before reading the clock themselves.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.histograms = {}
+        for name, help_text in STAGES.items():
+            self.histograms[name] = Histogram(PREFIX + name + "_seconds", help_text)
+        for name, help_text in THROUGHPUT.items():
+            self.histograms[name] = Histogram(PREFIX + name + "_ratio", help_text, THROUGHPUT_BUCKETS)
+
+    def observe(self, name, value):
+        if self.enabled:
+            self.histograms[name].observe(value)
+
+    @contextmanager
+    def time(self, name):
+        if not self.enabled:
+            yield
+            return
+        start_time = timer()
+        try:
+            yield
+        finally:
+            self.histograms[name].observe(timer() - start_time)
+
+    def prometheus(self):
+        """Histograms in the Prometheus text exposition format"""
+        lines = []
+        for hist in self.histograms.values():
+            lines.append("# HELP {} {}".format(hist.name, hist.help))
+            lines.append("# TYPE {} histogram".format(hist.name))
+            for bound, total in hist.cumulative():
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append('{}_bucket{{le="{}"}} {}'.format(hist.name, le, total))
+            lines.append("{}_sum {!r}".format(hist.name, hist.sum))
+            lines.append("{}_count {}".format(hist.name, hist.count))
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        """Histograms as a JSON-serializable dict"""
+        return {hist.name: {"help": hist.help, "buckets": list(hist.buckets),
+                "counts": [total for _, total in hist.cumulative()],
+                "sum": hist.sum, "count": hist.count}
+                for hist in self.histograms.values()}
+
+    def write(self, path):
+        """Export to path: a JSON snapshot for .json, Prometheus text otherwise"""
+        if str(path).endswith(".json"):
+            write_atomic(path, json.dumps(self.snapshot(), indent=1))
+        else:
+            write_atomic(path, self.prometheus())
+        logging.info("Metrics written to {}".format(path))
+
+    def log_summary(self):
+        for name, hist in self.histograms.items():
+            if hist.count > 0:
+                logging.info("{}: {} observations, mean {:.6f}, p50 <= {}, p99 <= {}".format(
+                        name, hist.count, hist.sum / hist.count, hist.quantile(0.5), hist.quantile(0.99)))
+
+
+# Shared instance for runs without --metrics
+DISABLED = Metrics(enabled=False)
@@ -0,0 +1,117 @@
+import logging
+import threading
+
+from queue import Queue
+from timeit import default_timer as timer
+
+_DONE = object()
+
+
+class Stage:
+    """One step of a Pipeline, run on its own pool of threads
+
+    func(item) returns the item for the next stage, or None to drop it.
+    discard(item), if given, releases an item that an aborted run drops
+    before func has seen it.
+    """
+
+    def __init__(self, name, func, workers=1, discard=None):
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.discard = discard
+        self.items = 0
+        self.busy = 0.0
+        self.starved = 0.0  # Waiting for input from the stage before
+        self.blocked = 0.0  # Waiting for room in the queue after
+        self.lock = threading.Lock()
+
+    def account(self, busy, starved, blocked, items):
+        with self.lock:
+            self.busy += busy
+            self.starved += starved
+            self.blocked += blocked
+            self.items += items
+
+
+class Pipeline:
+    """Stages connected by bounded queues, each stage on its own threads
+
+    With depth items of room between stages, decoding the next file and
+    writing the previous one overlap recognition of the current one, while
+    memory stays bounded to a few files in flight. An exception from a
+    stage drops only that item; anything else, such as SystemExit or
+    KeyboardInterrupt, aborts the run and is re-raised by run().
+    """
+
+    def __init__(self, stages, depth=2):
+        self.stages = stages
+        self.depth = depth
+        self.error = None
+
+    def worker(self, stage, inbox, outbox):
+        busy = starved = blocked = 0.0
+        items = 0
+        while True:
+            wait_start = timer()
+            item = inbox.get()
+            starved += timer() - wait_start
+            if item is _DONE:
+                break
+            if self.error is not None:
+                # Keep draining, so nothing upstream blocks on a full queue
+                if stage.discard is not None:
+                    stage.discard(item)
+                continue
+            start_time = timer()
+            try:
+                item = stage.func(item)
+            except Exception as e:
+                logging.info("Stage {} failed: {}".format(stage.name, e))
+                item = None
+            except BaseException as e:
+                # A dead worker would leave the stages around it waiting forever
+                self.error = e
+                item = None
+            busy += timer() - start_time
+            items += 1
+            if item is not None and outbox is not None:
+                put_start = timer()
+                outbox.put(item)
+                blocked += timer() - put_start
+        stage.account(busy, starved, blocked, items)
+
+    def run(self, items):
+        self.error = None
+        queues = [Queue(maxsize=self.depth) for _ in self.stages]
+        groups = []
+        for k, stage in enumerate(self.stages):
+            outbox = queues[k + 1] if k + 1 < len(queues) else None
+            threads = [threading.Thread(target=self.worker, args=(stage, queues[k], outbox),
+                    name="{}-{}".format(stage.name, i), daemon=True) for i in range(stage.workers)]
+            for thread in threads:
+                thread.start()
+            groups.append(threads)
+
+        start_time = timer()
+        for item in items:
+            if self.error is not None:
+                break
+            queues[0].put(item)
+        # Close the stages in order, so every item has left a stage
+        # before the next one is told to stop
+        for stage, inbox, threads in zip(self.stages, queues, groups):
+            for _ in threads:
+                inbox.put(_DONE)
+            for thread in threads:
+                thread.join()
+        if self.error is not None:
+            raise self.error
+        return timer() - start_time
+
+    def log_summary(self, wall_time):
+        for stage in self.stages:
+            capacity = stage.workers * max(wall_time, 1e-9)
+            logging.info("Stage {}: {} items, {} workers, utilization {:.1%}, "\
+                    "starved {:.1f} sec, blocked {:.1f} sec".format(stage.name, stage.items,
+                    stage.workers, stage.busy / capacity, stage.starved, stage.blocked))
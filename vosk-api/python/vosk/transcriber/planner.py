@@ -0,0 +1,198 @@
+import json
+import logging
+import os
+import shlex
+import subprocess
+import tempfile
+import threading
+
+from pathlib import Path
+from vosk.transcriber.decoder import wav_layout
+
+try:
+    import soundfile
+except ImportError:
+    soundfile = None
+
+# Extensions ffmpeg can decode audio from, used to skip obvious non-audio
+# files before spending a probe on them
+AUDIO_EXTENSIONS = {".wav", ".mp3", ".m4a", ".aac", ".flac", ".ogg", ".oga",
+        ".opus", ".wma", ".amr", ".aiff", ".aif", ".au", ".webm", ".mp4",
+        ".mkv", ".mov", ".avi", ".3gp"}
+
+DURATION_CACHE = Path.home() / ".cache/vosk/durations.json"
+
+
+def probe_audio(infile):
+    """Duration, sample rate and channels of infile, None if it has no audio
+
+    PCM WAV is read from its header and anything libsndfile opens from
+    soundfile.info; only the rest costs an ffprobe subprocess.
+    """
+    try:
+        layout = wav_layout(infile)
+    except OSError:
+        layout = None
+    if layout is not None and layout.sample_rate > 0 and layout.channels > 0 and layout.bits >= 8:
+        frames = layout.size // (layout.channels * layout.bits // 8)
+        return {"duration": frames / layout.sample_rate,
+                "sample_rate": layout.sample_rate,
+                "channels": layout.channels}
+
+    if soundfile is not None:
+        try:
+            info = soundfile.info(str(infile))
+            return {"duration": info.frames / info.samplerate,
+                    "sample_rate": info.samplerate,
+                    "channels": info.channels}
+        except RuntimeError:
+            pass
+
+    cmd = shlex.split("ffprobe -v quiet -select_streams a:0 "
+            "-show_entries stream=sample_rate,channels,duration:format=duration "
+            "-of json \'{}\'".format(str(infile)))
+    proc = subprocess.run(cmd, stdout=subprocess.PIPE, check=False)
+    if proc.returncode != 0:
+        return None
+
+    info = json.loads(proc.stdout or b"{}")
+    streams = info.get("streams", [])
+    if len(streams) == 0:
+        return None
+
+    stream = streams[0]
+    duration = stream.get("duration", info.get("format", {}).get("duration"))
+    try:
+        duration = float(duration)
+    except (TypeError, ValueError):
+        duration = 0.0
+    return {"duration": duration,
+            "sample_rate": int(stream.get("sample_rate", 0)),
+            "channels": int(stream.get("channels", 0))}
+
+
+class ProbeCache:
+    """Persistent probe results keyed by path and validated by size/mtime"""
+
+    def __init__(self, cache_file=DURATION_CACHE):
+        self.cache_file = Path(cache_file)
+        self.entries = {}
+        self.dirty = False
+        try:
+            with open(self.cache_file, encoding="utf-8") as fh:
+                self.entries = json.load(fh)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def probe(self, infile):
+        key = str(Path(infile).resolve())
+        st = os.stat(key)
+        entry = self.entries.get(key)
+        if entry is not None and entry["size"] == st.st_size and entry["mtime"] == st.st_mtime_ns:
+            return entry["info"]
+
+        try:
+            info = probe_audio(infile)
+        except FileNotFoundError:
+            # Without ffprobe keep the file and let ffmpeg decide later
+            logging.info("Missing ffprobe, duration of {} is unknown".format(infile))
+            return {"duration": 0.0, "sample_rate": 0, "channels": 0}
+        self.entries[key] = {"size": st.st_size, "mtime": st.st_mtime_ns, "info": info}
+        self.dirty = True
+        return info
+
+    def prune(self):
+        # Entries for deleted or rewritten files would never be hit again
+        for key, entry in list(self.entries.items()):
+            try:
+                st = os.stat(key)
+            except OSError:
+                del self.entries[key]
+                continue
+            if entry["size"] != st.st_size or entry["mtime"] != st.st_mtime_ns:
+                del self.entries[key]
+
+    def save(self):
+        if not self.dirty:
+            return
+        self.prune()
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            # A private temporary name, the cache is shared by concurrent runs
+            fd, tmp_name = tempfile.mkstemp(dir=self.cache_file.parent,
+                    prefix="." + self.cache_file.name + ".", suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as fh:
+                    json.dump(self.entries, fh)
+                os.replace(tmp_name, self.cache_file)
+            except BaseException:
+                Path(tmp_name).unlink(missing_ok=True)
+                raise
+            self.dirty = False
+        except OSError as e:
+            logging.info("Failed to save probe cache: {}".format(e))
+
+
+def plan_task_list(task_list, cache=None):
+    """Drop non-audio inputs and order the rest longest-first
+
+    Returns a list of (input, output, duration) tuples. Handing the longest
+    files out first keeps a single long recording from being picked up
+    last and setting the tail of the whole batch.
+    """
+    if cache is None:
+        cache = ProbeCache()
+
+    planned = []
+    for input_file, output_file in task_list:
+        if Path(input_file).suffix.lower() not in AUDIO_EXTENSIONS:
+            logging.info("Skipping {}, not an audio file".format(input_file))
+            continue
+        info = cache.probe(input_file)
+        if info is None:
+            logging.info("Skipping {}, no audio stream found".format(input_file))
+            continue
+        planned.append((input_file, output_file, info["duration"]))
+    cache.save()
+
+    planned.sort(key=lambda task: task[2], reverse=True)
+    total = sum(task[2] for task in planned)
+    logging.info("Planned {} files, {:.2f} hours of audio".format(len(planned), total / 3600))
+    return planned
+
+
+class BatchStats:
+
+    def __init__(self):
+        self.files = 0
+        self.audio_seconds = 0.0
+        self.busy = {}
+        self.decoders = {}
+        self.lock = threading.Lock()
+
+    def add(self, worker, audio_seconds, elapsed):
+        with self.lock:
+            self.files += 1
+            self.audio_seconds += audio_seconds
+            self.busy[worker] = self.busy.get(worker, 0.0) + elapsed
+
+    def add_decode(self, backend, decode_time, nbytes=0):
+        with self.lock:
+            files, seconds, total = self.decoders.get(backend, (0, 0.0, 0))
+            self.decoders[backend] = (files + 1, seconds + decode_time, total + nbytes)
+
+    def log_summary(self, wall_time, workers=None):
+        if self.files == 0 or wall_time <= 0:
+            return
+        logging.info("Batch complete: {} files, {:.2f} hours of audio in {:.1f} sec; "\
+                "aggregate xRT {:.3f}".format(self.files, self.audio_seconds / 3600,
+                wall_time, wall_time / max(self.audio_seconds, 1e-9)))
+        for worker, busy in sorted(self.busy.items()):
+            logging.info("Worker {}: busy {:.1f} sec, utilization {:.1%}".format(
+                worker, busy, busy / wall_time))
+        for backend, (files, seconds, total) in sorted(self.decoders.items()):
+            logging.info("Decoder {}: {} files, {:.1f} sec decoding, {:.1f} MB of PCM".format(
+                backend, files, seconds, total / 1e6))
+        if workers is not None:
+            logging.info("Mean utilization over {} workers {:.1%}".format(workers,
+                sum(self.busy.values()) / (workers * wall_time)))
@@ -0,0 +1,246 @@
+import json
+import logging
+
+from bisect import bisect_right
+from collections import deque
+from multiprocessing.dummy import Pool
+from vosk import KaldiRecognizer
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+FRAME_MS = 30
+BLOCK_FRAMES = 2000
+CHUNK_SAMPLES = 2000
+OVERLAP_SECONDS = 1.0
+
+
+def frame_energy_db(samples, sample_rate, frame_ms=FRAME_MS):
+    frame_len = int(sample_rate * frame_ms / 1000)
+    n_frames = len(samples) // frame_len
+    energy = np.empty(n_frames, dtype=np.float32)
+
+    # Convert a block of frames at a time to keep memory flat on long files
+    for start in range(0, n_frames, BLOCK_FRAMES):
+        stop = min(start + BLOCK_FRAMES, n_frames)
+        block = samples[start * frame_len:stop * frame_len].astype(np.float32)
+        block = block.reshape(-1, frame_len) / 32768.0
+        energy[start:stop] = 10 * np.log10(np.mean(block * block, axis=1) + 1e-10)
+    return energy
+
+
+def find_split_points(samples, sample_rate, segment_seconds=300, search_seconds=30,
+        min_silence_ms=300, margin_db=10.0):
+    """Pick sample offsets roughly every segment_seconds to cut the audio at
+
+    Each cut goes in the middle of the longest silence near the target
+    position; (offset, False) marks a forced cut inside speech.
+    """
+    frame_len = int(sample_rate * FRAME_MS / 1000)
+    energy = frame_energy_db(samples, sample_rate)
+    if len(energy) == 0:
+        return []
+
+    # Noise floor plus a margin, but never above the median minus the margin
+    threshold = min(np.percentile(energy, 5) + margin_db, np.median(energy) - margin_db)
+    silent = energy < threshold
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], silent.astype(np.int8), [0]))))
+    runs = edges.reshape(-1, 2)
+    runs = runs[(runs[:, 1] - runs[:, 0]) >= max(1, min_silence_ms // FRAME_MS)]
+    centers = (runs[:, 0] + runs[:, 1]) // 2
+
+    segment_frames = int(segment_seconds * 1000 / FRAME_MS)
+    search_frames = int(search_seconds * 1000 / FRAME_MS)
+    points = []
+    for target in range(segment_frames, len(energy) - search_frames, segment_frames):
+        nearby = runs[np.abs(centers - target) <= search_frames]
+        if len(nearby) > 0:
+            longest = nearby[np.argmax(nearby[:, 1] - nearby[:, 0])]
+            point = (int((longest[0] + longest[1]) // 2) * frame_len, True)
+        else:
+            point = (target * frame_len, False)
+        if len(points) == 0 or point[0] > points[-1][0]:
+            points.append(point)
+    return points
+
+
+def plan_segments(n_samples, points, sample_rate):
+    # Forced cuts get some overlap, words are later kept only if their
+    # midpoint falls inside [keep_start, keep_end)
+    overlap = int(OVERLAP_SECONDS * sample_rate)
+    bounds = [(0, True)] + list(points) + [(n_samples, True)]
+    segments = []
+    for (start, start_clean), (end, end_clean) in zip(bounds, bounds[1:]):
+        segments.append((start if start_clean else max(0, start - overlap),
+                end if end_clean else min(n_samples, end + overlap), start, end))
+    return segments
+
+
+def shift_result(res, offset, keep_from, keep_to):
+    words = []
+    for word in res.get("result", []):
+        word = dict(word, start=word["start"] + offset, end=word["end"] + offset)
+        if keep_from <= (word["start"] + word["end"]) / 2 < keep_to:
+            words.append(word)
+    return {"result": words, "text": " ".join(w["word"] for w in words)}
+
+
+def recognize_segment(model, samples, segment, sample_rate, skip_silence=False):
+    decode_start, decode_end, keep_start, keep_end = segment
+    rec = KaldiRecognizer(model, sample_rate)
+    rec.SetWords(True)
+    skipper = SilenceSkipper(sample_rate) if skip_silence else None
+
+    result = []
+    for pos in range(decode_start, decode_end, CHUNK_SAMPLES):
+        data = samples[pos:min(pos + CHUNK_SAMPLES, decode_end)].tobytes()
+        if skipper is not None:
+            data = skipper.process(data)
+        if len(data) > 0 and rec.AcceptWaveform(data):
+            result.append(json.loads(rec.Result()))
+    if skipper is not None:
+        data = skipper.flush()
+        if len(data) > 0 and rec.AcceptWaveform(data):
+            result.append(json.loads(rec.Result()))
+    result.append(json.loads(rec.FinalResult()))
+    if skipper is not None:
+        result = [skipper.restore_times(res) for res in result]
+
+    return [shift_result(res, decode_start / sample_rate,
+            keep_start / sample_rate, keep_end / sample_rate) for res in result]
+
+
+def recognize_long(model, data, sample_rate, tasks, segment_seconds=300, skip_silence=False):
+    """Recognize s16le mono PCM split at silences on parallel recognizers
+
+    Returns results in the same form as Transcriber.recognize_stream with
+    word timestamps in file time.
+    """
+    if np is None:
+        raise ImportError("Long file mode requires numpy")
+
+    samples = np.frombuffer(data[:len(data) // 2 * 2], dtype=np.int16)
+    segments = plan_segments(len(samples),
+            find_split_points(samples, sample_rate, segment_seconds), sample_rate)
+
+    with Pool(tasks) as pool:
+        parts = pool.map(lambda segment: recognize_segment(model, samples,
+                segment, sample_rate, skip_silence), segments, chunksize=1)
+    return [res for part in parts for res in part if res["text"] != ""]
+
+
+class SilenceSkipper:
+    """Drop the middle of long silences from a s16le stream
+
+    Frames are classified by energy and zero-crossing rate against a
+    running noise floor. Every silence keeps pad_ms on both sides so the
+    endpointer still sees it, and the number of dropped samples is
+    recorded at each point of the output so word times can be restored.
+    """
+
+    def __init__(self, sample_rate, pad_ms=400, threshold_db=-45.0, margin_db=12.0,
+            zcr_threshold=0.25):
+        if np is None:
+            raise ImportError("Silence skipping requires numpy")
+        self.frame_len = int(sample_rate * FRAME_MS / 1000)
+        self.sample_rate = sample_rate
+        self.pad_frames = max(1, pad_ms // FRAME_MS)
+        self.threshold_db = threshold_db
+        self.margin_db = margin_db
+        self.zcr_threshold = zcr_threshold
+        self.noise_floor = threshold_db - margin_db
+        self.pending = b""
+        self.silent_run = 0
+        self.lead_in = deque(maxlen=self.pad_frames)
+        self.total_samples = 0
+        self.emitted_samples = 0
+        self.skipped_samples = 0
+        self.skip_points = []
+
+    def is_speech(self, energy, zcr):
+        threshold = max(self.threshold_db, self.noise_floor + self.margin_db)
+        speech = energy > threshold or (zcr > self.zcr_threshold
+                and energy > threshold - self.margin_db / 2)
+        if energy < self.noise_floor:
+            self.noise_floor = energy
+        else:
+            self.noise_floor += (0.002 if speech else 0.05) * (energy - self.noise_floor)
+        return speech
+
+    def process(self, data):
+        data = self.pending + data
+        frame_bytes = 2 * self.frame_len
+        usable = len(data) // frame_bytes * frame_bytes
+        self.pending = data[usable:]
+        if usable == 0:
+            return b""
+
+        frames = np.frombuffer(data[:usable], dtype=np.int16).reshape(-1, self.frame_len)
+        scaled = frames.astype(np.float32) / 32768.0
+        energy = 10 * np.log10(np.mean(scaled * scaled, axis=1) + 1e-10)
+        signs = np.signbit(frames)
+        zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (self.frame_len - 1)
+        self.total_samples += frames.size
+
+        out = []
+        for i in range(len(frames)):
+            frame = data[i * frame_bytes:(i + 1) * frame_bytes]
+            if self.is_speech(energy[i], zcr[i]):
+                out.extend(self.lead_in)
+                self.emitted_samples += len(self.lead_in) * self.frame_len
+                self.lead_in.clear()
+                out.append(frame)
+                self.emitted_samples += self.frame_len
+                self.silent_run = 0
+                continue
+            self.silent_run += 1
+            if self.silent_run <= self.pad_frames:
+                out.append(frame)
+                self.emitted_samples += self.frame_len
+                continue
+            if len(self.lead_in) == self.lead_in.maxlen:
+                self.lead_in.popleft()
+                self.skipped_samples += self.frame_len
+                if self.skip_points and self.skip_points[-1][0] == self.emitted_samples:
+                    self.skip_points[-1] = (self.emitted_samples, self.skipped_samples)
+                else:
+                    self.skip_points.append((self.emitted_samples, self.skipped_samples))
+            self.lead_in.append(frame)
+        return b"".join(out)
+
+    def flush(self):
+        self.total_samples += len(self.pending) // 2
+        self.skipped_samples += len(self.lead_in) * self.frame_len
+        self.lead_in.clear()
+        out, self.pending = self.pending, b""
+        self.emitted_samples += len(out) // 2
+        return out
+
+    def covered_samples(self):
+        # Input samples the output so far accounts for; held-back silence
+        # and the pending partial frame are not covered yet
+        return self.total_samples - len(self.lead_in) * self.frame_len
+
+    def source_time(self, seconds):
+        index = bisect_right([p[0] for p in self.skip_points], seconds * self.sample_rate)
+        if index == 0:
+            return seconds
+        return seconds + self.skip_points[index - 1][1] / self.sample_rate
+
+    def restore_times(self, res):
+        for word in res.get("result", []):
+            word["start"] = self.source_time(word["start"])
+            word["end"] = self.source_time(word["end"])
+        return res
+
+    def log_summary(self, decode_time):
+        if self.total_samples == 0:
+            return
+        skipped = self.skipped_samples / self.sample_rate
+        fed = self.emitted_samples / self.sample_rate
+        saved = decode_time / fed * skipped if fed > 0 else 0.0
+        logging.info("Skipped {:.1%} of the audio as silence ({:.1f} sec), "\
+                "saved ~{:.1f} sec of decoding".format(self.skipped_samples / self.total_samples,
+                skipped, saved))
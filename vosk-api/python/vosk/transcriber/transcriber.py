@@ -1,73 +1,200 @@
 import json
+import os
 import logging
 import asyncio
 import websockets
 import srt
 import datetime
-import shlex
 import subprocess
-
-from vosk import KaldiRecognizer, Model
+import threading
+
+from vosk import KaldiRecognizer, Model, FinalEvent, PartialEvent, model_sample_rate
+from vosk.transcriber.planner import BatchStats
+from vosk.transcriber.journal import journal_options, write_atomic
+from vosk.transcriber.segmenter import SilenceSkipper, recognize_long
+from vosk.transcriber.decoder import open_decoder, open_mapped, open_soundfile, ReadAhead
+from vosk.transcriber.decoder import probe_rate, choose_rate, time_window, ffmpeg_command
+from vosk.transcriber.pipeline import Stage, Pipeline
+from vosk.transcriber.checkpoint import Checkpoint
+from vosk.transcriber.metrics import Metrics, DISABLED
 from queue import Queue
 from timeit import default_timer as timer
 from multiprocessing.dummy import Pool
 
 CHUNK_SIZE = 4000
+PARTIAL_INTERVAL = 0.5
 SAMPLE_RATE = 16000.0
 
 class Transcriber:
 
-    def __init__(self, args):
-        self.model = Model(model_path=args.model, model_name=args.model_name, lang=args.lang)
+    def __init__(self, args, journal=None):
+        self.start_time = timer()
+        warm_up = getattr(args, "warm_up", False) is True and args.server is None
+        # Until something has been recognized, the first result pays the cold start
+        self.warm = False
+        self.first_result = None
+        # Resolving the path may download the model; loading it runs in the
+        # background while the first inputs are probed and decoded
+        model_path = args.model
+        if model_path is None:
+            model_path = Model.get_model_path(args.model_name, args.lang)
+        self.model_ready = None
+        self._model = None
+        self._model_error = None
+        self._loader = threading.Thread(target=self.load_model, args=(model_path, warm_up),
+                name="model-loader", daemon=True)
+        self._loader.start()
         self.args = args
         self.queue = Queue()
-
-    def recognize_stream(self, rec, stream):
+        self.stats = BatchStats()
+        self.journal = journal
+        # Per-stage histograms, exported at the end of the run with --metrics
+        self.metrics = Metrics() if getattr(args, "metrics", None) else DISABLED
+        # A server gets 16 kHz, a local model the rate it was trained at
+        self.model_rate = SAMPLE_RATE if args.server is not None else model_sample_rate(model_path)
+        # Part of each file to transcribe, as (start, duration) in seconds
+        self.window = time_window(getattr(args, "start", None), getattr(args, "end", None))
+
+    def load_model(self, model_path, warm_up):
+        load_start = timer()
+        try:
+            self._model = Model(model_path=model_path, prefetch=warm_up)
+            load_time = timer() - load_start
+            if warm_up:
+                cold, warm = self._model.warm_up(), self._model.warm_up()
+                self.warm = True
+                logging.info("Model loaded in {:.3f} sec, {:.0f} MB prefetched; first-result latency "\
+                        "cold {:.0f} ms, warm {:.0f} ms".format(load_time, self._model.prefetched / 1e6,
+                        1000 * cold, 1000 * warm))
+            else:
+                logging.info("Model loaded in {:.3f} sec".format(load_time))
+        except Exception as e:
+            self._model_error = e
+        finally:
+            self.model_ready = timer() - self.start_time
+
+    @property
+    def model(self):
+        # Waits for the background load; decoding has gone ahead meanwhile
+        self._loader.join()
+        if self._model_error is not None:
+            raise self._model_error
+        return self._model
+
+    def write_result(self, input_file, output_file, processed_result):
+        if output_file == "":
+            print(processed_result)
+            return
+        with self.metrics.time("write_output"):
+            write_atomic(output_file, processed_result)
+        logging.info("File {} processing complete".format(output_file))
+        if self.journal is not None:
+            self.journal.record(input_file, output_file, journal_options(self.args))
+
+    def silence_skipper(self, sample_rate=SAMPLE_RATE):
+        if self.args.skip_silence is True:
+            return SilenceSkipper(sample_rate)
+        return None
+
+    def recognize_stream(self, rec, stream, skipper=None, checkpoint=None):
         tot_samples = 0
+        read_time = 0.0
         result = []
 
-        while True:
-            data = stream.stdout.read(CHUNK_SIZE)
-
-            if len(data) == 0:
-                break
-
-            tot_samples += len(data)
-            if rec.AcceptWaveform(data):
-                jres = json.loads(rec.Result())
-                logging.info(jres)
-                result.append(jres)
-            else:
-                jres = json.loads(rec.PartialResult())
-                if jres["partial"] != "":
-                    logging.info(jres)
-
-        jres = json.loads(rec.FinalResult())
-        result.append(jres)
+        def chunks():
+            nonlocal tot_samples, read_time
+            while True:
+                read_start = timer()
+                data = stream.read(CHUNK_SIZE)
+                tot_samples += len(data)
+                if len(data) == 0:
+                    break
+                if skipper is not None:
+                    data = skipper.process(data)
+                read_time += timer() - read_start
+                yield data
+            if skipper is not None:
+                yield skipper.flush()
+
+        # Partials are only fetched when someone will see them
+        partial_interval = PARTIAL_INTERVAL if logging.getLogger().isEnabledFor(logging.INFO) else None
+        start_time = timer()
+        first_result = None
+        metrics = self.metrics if self.metrics.enabled else None
+        for event in rec.stream(chunks(), CHUNK_SIZE, partial_interval, metrics):
+            if isinstance(event, FinalEvent):
+                if first_result is None:
+                    first_result = timer() - start_time
+                    self.log_first_result(first_result)
+                logging.info(event.result)
+                res = event.result
+                if skipper is not None:
+                    # Word times count only the audio the recognizer saw
+                    res = skipper.restore_times(res)
+                if checkpoint is not None:
+                    # An utterance boundary, everything read so far is final
+                    res = checkpoint.restore_times(res)
+                    covered = skipper.covered_samples() if skipper is not None else tot_samples // 2
+                    checkpoint.update(checkpoint.resumed_at + covered, res)
+                result.append(res)
+            elif isinstance(event, PartialEvent):
+                logging.info(event.result)
+
+        if skipper is not None:
+            skipper.log_summary(timer() - start_time - read_time)
 
         return result, tot_samples
 
-    async def recognize_stream_server(self, proc):
+    def log_first_result(self, latency):
+        logging.info("First result after {:.3f} sec ({} model)".format(latency,
+                "warm" if self.warm else "cold"))
+        self.warm = True
+        if self.first_result is None:
+            self.first_result = timer() - self.start_time
+            if self.model_ready is not None:
+                logging.info("First result {:.3f} sec after startup, model ready after {:.3f} sec".format(
+                        self.first_result, self.model_ready))
+
+    async def recognize_stream_server(self, read, skipper=None, sample_rate=SAMPLE_RATE):
         async with websockets.connect(self.args.server) as websocket:
             tot_samples = 0
+            decode_time = 0.0
             result = []
+            start_time = timer()
 
-            await websocket.send('{ "config" : { "sample_rate" : %f } }' % (SAMPLE_RATE))
+            await websocket.send('{ "config" : { "sample_rate" : %f } }' % (sample_rate))
             while True:
-                data = await proc.stdout.read(CHUNK_SIZE)
+                data = await read(CHUNK_SIZE)
                 tot_samples += len(data)
                 if len(data) == 0:
-                    break
+                    if skipper is None:
+                        break
+                    data = skipper.flush()
+                    if len(data) == 0:
+                        break
+                elif skipper is not None:
+                    data = skipper.process(data)
+                    if len(data) == 0:
+                        continue
+                decode_start = timer()
                 await websocket.send(data)
                 jres = json.loads(await websocket.recv())
+                decode_time += timer() - decode_start
+                self.metrics.observe("server_chunk", timer() - decode_start)
                 logging.info(jres)
                 if not "partial" in jres:
+                    if len(result) == 0:
+                        self.log_first_result(timer() - start_time)
                     result.append(jres)
             await websocket.send('{"eof" : 1}')
             jres = json.loads(await websocket.recv())
             logging.info(jres)
             result.append(jres)
 
+            if skipper is not None:
+                result = [skipper.restore_times(res) for res in result]
+                skipper.log_summary(decode_time)
+
             return result, tot_samples
 
 
@@ -111,46 +238,92 @@ class Transcriber:
             processed_result = json.dumps(monologues)
         return processed_result
 
-    def resample_ffmpeg(self, infile):
-        cmd = shlex.split("ffmpeg -nostdin -loglevel quiet "
-                "-i \'{}\' -ar {} -ac 1 -f s16le -".format(str(infile), SAMPLE_RATE))
-        stream = subprocess.Popen(cmd, stdout=subprocess.PIPE)
-        return stream
-
-    async def resample_ffmpeg_async(self, infile):
-        cmd = "ffmpeg -nostdin -loglevel quiet "\
-        "-i \'{}\' -ar {} -ac 1 -f s16le -".format(str(infile), SAMPLE_RATE)
-        return await asyncio.create_subprocess_shell(cmd, stdout=subprocess.PIPE)
-
-    async def server_worker(self):
+    def timed_format(self, result):
+        with self.metrics.time("format"):
+            return self.format_result(result)
+
+    def decode_rate(self, infile):
+        native = getattr(self.args, "native_rate", False)
+        return choose_rate(probe_rate(infile) if native else None, self.model_rate, native)
+
+    def open_input(self, infile, start=0.0):
+        """Decoder for infile from start seconds into the window: mapped
+        when it is mono 16-bit WAV at the decode rate, in-process when
+        libsndfile reads it, else ffmpeg"""
+        window_start, duration = self.window
+        if duration is not None:
+            duration -= start
+        with self.metrics.time("decoder_open"):
+            return open_decoder(infile, self.decode_rate(infile), getattr(self.args, "decoder", "auto"),
+                    window_start + start, duration)
+
+    def file_time(self, result):
+        # Word times count from the start of the window, report them in file time
+        if self.window[0] > 0:
+            for res in result:
+                for word in res.get("result", []):
+                    word["start"] += self.window[0]
+                    word["end"] += self.window[0]
+        return result
+
+    def log_decoder(self, infile, decoder, elapsed, nbytes):
+        logging.info("Decoded {} with {} at {:.0f} Hz, {} bytes in {:.3f} sec ({:.1%} of {:.3f} sec)".format(
+            infile, decoder.backend, decoder.sample_rate, nbytes, decoder.decode_time,
+            decoder.decode_time / max(elapsed, 1e-9), elapsed))
+        self.stats.add_decode(decoder.backend, decoder.decode_time, nbytes)
+        if decoder.decode_time > 0:
+            self.metrics.observe("decode_speed", nbytes / (2 * decoder.sample_rate) / decoder.decode_time)
+
+    async def resample_ffmpeg_async(self, infile, sample_rate=SAMPLE_RATE):
+        cmd = ffmpeg_command(infile, sample_rate, *self.window)
+        with self.metrics.time("decoder_open"):
+            return await asyncio.create_subprocess_shell(cmd, stdout=subprocess.PIPE)
+
+    async def server_worker(self, worker_id):
         while True:
             try:
-                input_file, output_file = self.queue.get_nowait()
+                task = self.queue.get_nowait()
             except Exception:
                 break
+            input_file, output_file = task[0], task[1]
 
             logging.info("Recognizing {}".format(input_file))
             start_time = timer()
-            proc = await self.resample_ffmpeg_async(input_file)
-            result, tot_samples = await self.recognize_stream_server(proc)
-            await proc.wait()
+            loop = asyncio.get_running_loop()
+            rate = self.decode_rate(input_file)
+            decoder = None
+            if getattr(self.args, "decoder", "auto") != "ffmpeg":
+                decoder = open_mapped(input_file, rate, *self.window) \
+                        or open_soundfile(input_file, rate, *self.window)
+            if decoder is not None:
+                # In-process decoding blocks, keep it off the loop
+                read = lambda size: loop.run_in_executor(None, decoder.read, size)
+                result, tot_samples = await self.recognize_stream_server(read,
+                        self.silence_skipper(rate), rate)
+                decoder.close()
+                self.log_decoder(input_file, decoder, timer() - start_time, tot_samples)
+            else:
+                proc = await self.resample_ffmpeg_async(input_file, rate)
+                result, tot_samples = await self.recognize_stream_server(proc.stdout.read,
+                        self.silence_skipper(rate), rate)
+                await proc.wait()
 
             # Bad input, continue
             if tot_samples == 0:
                  self.queue.task_done()
                  continue
+            result = self.file_time(result)
 
-            processed_result = self.format_result(result)
-            if output_file != "":
-                logging.info("File {} processing complete".format(output_file))
-                with open(output_file, "w", encoding="utf-8") as fh:
-                    fh.write(processed_result)
-            else:
-                print(processed_result)
+            # Formatting and the fsync'd write block, keep them off the loop
+            # so the other workers keep streaming meanwhile
+            processed_result = await loop.run_in_executor(None, self.timed_format, result)
+            await loop.run_in_executor(None, self.write_result, input_file, output_file, processed_result)
 
             elapsed = timer() - start_time
+            self.metrics.observe("file", elapsed)
             logging.info("Execution time: {:.3f} sec; "\
-                    "xRT {:.3f}".format(elapsed, float(elapsed) * (2 * SAMPLE_RATE) / tot_samples))
+                    "xRT {:.3f}".format(elapsed, float(elapsed) * (2 * rate) / tot_samples))
+            self.stats.add("task-{}".format(worker_id), tot_samples / (2 * rate), elapsed)
             self.queue.task_done()
 
     def pool_worker(self, inputdata):
@@ -158,7 +331,7 @@ class Transcriber:
         start_time = timer()
 
         try:
-            stream = self.resample_ffmpeg(inputdata[0])
+            stream = self.open_input(inputdata[0])
         except FileNotFoundError as e:
             print(e, "Missing FFMPEG, please install and try again")
             return
@@ -166,36 +339,129 @@ class Transcriber:
             logging.info(e)
             return
 
-        rec = KaldiRecognizer(self.model, SAMPLE_RATE)
-        rec.SetWords(True)
-        result, tot_samples = self.recognize_stream(rec, stream)
+        rate = stream.sample_rate
+        checkpoint = None
+        if self.args.long_file is True:
+            data = stream.read()
+            tot_samples = len(data)
+            result = recognize_long(self.model, data, rate, self.args.tasks,
+                    skip_silence=self.args.skip_silence)
+        else:
+            if getattr(self.args, "resumable", False) is True and inputdata[1] != "":
+                checkpoint = Checkpoint(inputdata[0], inputdata[1], rate, self.window)
+                if checkpoint.load() > 0:
+                    stream.close()
+                    stream = self.open_input(inputdata[0], checkpoint.start_time)
+            rec = KaldiRecognizer(self.model, rate)
+            rec.SetWords(True)
+            result, tot_samples = self.recognize_stream(rec, stream, self.silence_skipper(rate),
+                    checkpoint)
+            if checkpoint is not None:
+                result = checkpoint.results
+                checkpoint.log_summary(timer() - start_time)
+        stream.close()
+        self.log_decoder(inputdata[0], stream, timer() - start_time, tot_samples)
         if tot_samples == 0:
             return
 
-        processed_result = self.format_result(result)
-        if inputdata[1] != "":
-            logging.info("File {} processing complete".format(inputdata[1]))
-            with open(inputdata[1], "w", encoding="utf-8") as fh:
-                fh.write(processed_result)
-        else:
-            print(processed_result)
+        processed_result = self.timed_format(self.file_time(result))
+        self.write_result(inputdata[0], inputdata[1], processed_result)
+        if checkpoint is not None:
+            checkpoint.remove()
 
         elapsed = timer() - start_time
+        self.metrics.observe("file", elapsed)
+        logging.info("Execution time: {:.3f} sec; "\
+                "xRT {:.3f}".format(elapsed, float(elapsed) * (2 * rate) / tot_samples))
+        self.stats.add(threading.current_thread().name, tot_samples / (2 * rate), elapsed)
+
+    def probe_stage(self, task):
+        start_time = timer()
+        try:
+            decoder = self.open_input(task[0])
+        except FileNotFoundError as e:
+            print(e, "Missing FFMPEG, please install and try again")
+            return None
+        if decoder.backend != "mmap":
+            # Decode ahead on its own thread, holding a bounded amount of PCM
+            decoder = ReadAhead(decoder)
+        return {"input": task[0], "output": task[1], "start": start_time, "decoder": decoder}
+
+    def recognize_stage(self, item):
+        decoder = item.pop("decoder")
+        start_time = timer()
+        rate = decoder.sample_rate
+        try:
+            rec = KaldiRecognizer(self.model, rate)
+            rec.SetWords(True)
+            result, tot_samples = self.recognize_stream(rec, decoder, self.silence_skipper(rate))
+        finally:
+            decoder.close()
+        self.log_decoder(item["input"], decoder, timer() - item["start"], tot_samples)
+        if tot_samples == 0:
+            return None
+
+        item["samples"] = tot_samples
+        item["rate"] = rate
+        item["result"] = self.file_time(result)
+        item["worker"] = threading.current_thread().name
+        item["recognize_time"] = timer() - start_time
+        return item
+
+    def format_stage(self, item):
+        item["text"] = self.timed_format(item.pop("result"))
+        return item
+
+    def write_stage(self, item):
+        self.write_result(item["input"], item["output"], item["text"])
+        elapsed = timer() - item["start"]
+        self.metrics.observe("file", elapsed)
+        audio_seconds = item["samples"] / (2 * item["rate"])
         logging.info("Execution time: {:.3f} sec; "\
-                "xRT {:.3f}".format(elapsed, float(elapsed) * (2 * SAMPLE_RATE) / tot_samples))
+                "xRT {:.3f}".format(elapsed, elapsed / audio_seconds))
+        # Worker utilization counts recognition only, the other stages overlap it
+        self.stats.add(item["worker"], audio_seconds, item["recognize_time"])
+
+    def process_task_list_pipeline(self, task_list):
+        # Each file streams from its decoder into a recognizer while the
+        # next ones decode ahead and the finished ones are written behind
+        workers = os.cpu_count() or 1
+        pipeline = Pipeline([
+                Stage("probe", self.probe_stage),
+                Stage("recognize", self.recognize_stage, workers,
+                        discard=lambda item: item["decoder"].close()),
+                Stage("format", self.format_stage),
+                Stage("write", self.write_stage)], depth=workers)
+        pipeline.log_summary(pipeline.run(task_list))
+        return workers
 
     async def process_task_list_server(self, task_list):
         for x in task_list:
             self.queue.put(x)
-        workers = [asyncio.create_task(self.server_worker()) for i in range(self.args.tasks)]
+        workers = [asyncio.create_task(self.server_worker(i)) for i in range(self.args.tasks)]
         await asyncio.gather(*workers)
 
     def process_task_list_pool(self, task_list):
-        with Pool() as pool:
-            pool.map(self.pool_worker, task_list)
+        # imap_unordered with chunksize 1 hands out one file at a time, so
+        # an idle worker always picks up the next longest remaining file
+        workers = os.cpu_count() or 1
+        with Pool(workers) as pool:
+            for _ in pool.imap_unordered(self.pool_worker, task_list, chunksize=1):
+                pass
+        return workers
 
     def process_task_list(self, task_list):
-        if self.args.server is None:
-            self.process_task_list_pool(task_list)
-        else:
+        start_time = timer()
+        if self.args.server is not None:
+            workers = self.args.tasks
             asyncio.run(self.process_task_list_server(task_list))
+        elif self.args.long_file is True or getattr(self.args, "no_pipeline", False) is True \
+                or getattr(self.args, "resumable", False) is True:
+            # Checkpoints reopen the decoder at the resume point, only the pool does that
+            workers = self.process_task_list_pool(task_list)
+        else:
+            workers = self.process_task_list_pipeline(task_list)
+        self.stats.log_summary(timer() - start_time, workers)
+        if self.metrics.enabled:
+            self.metrics.log_summary()
+            self.metrics.write(self.args.metrics)